@@ -3,14 +3,20 @@ Configuração do agente de análise exploratória de dados.
 """
 
 import logging
+import time
 import streamlit as st
-from langchain_openai import ChatOpenAI
 from langchain.agents import create_tool_calling_agent, AgentExecutor
-from langchain_core.messages import SystemMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import RunnablePassthrough
 
+from agents.parallel_executor import ParallelAgentExecutor
 from config.settings import settings
 from tools import ALL_TOOLS
+from tools.context import current_data_context
+from tools.data_analysis import get_schema_digest
+from utils.async_runner import with_async_support
+from utils.speculation import with_speculation
+from utils.llm_pool import llm_client_pool
 from utils.memory import create_memory
 
 logger = logging.getLogger(__name__)
@@ -24,26 +30,29 @@ Você DEVE SEMPRE usar as ferramentas disponíveis para acessar e analisar os da
 NUNCA responda baseado em suposições ou conhecimento geral - SEMPRE consulte os dados primeiro usando as ferramentas.
 
 📋 FLUXO OBRIGATÓRIO PARA QUALQUER PERGUNTA:
-1. PRIMEIRO: Use get_data_description() para entender o dataset
+1. PRIMEIRO: Consulte o ESQUEMA DO DATASET no final destas instruções (colunas, tipos, nulos e faixas);
+   use get_data_description() apenas se o esquema não estiver disponível ou se precisar de mais detalhes
 2. SEGUNDO: Use as ferramentas apropriadas para analisar os dados específicos da pergunta
 3. TERCEIRO: Baseie sua resposta APENAS nos resultados obtidos das ferramentas
 4. NUNCA responda sem ter usado pelo menos uma ferramenta
 
 FERRAMENTAS DISPONÍVEIS (USE-AS!):
-- get_data_description: Visão geral completa do dataset (USE PRIMEIRO!)
+- get_data_description: Visão geral completa do dataset (use se o esquema abaixo não bastar)
 - get_descriptive_statistics: Estatísticas descritivas detalhadas de colunas
 - plot_histogram: Visualização de distribuições de uma coluna
+- plot_histograms_grid: Histogramas (ou ECDFs) de VÁRIAS/TODAS as colunas numéricas em uma única chamada
 - plot_boxplot: Identificação de outliers para UMA coluna específica
 - plot_multiple_boxplots: Boxplots de TODAS as colunas numéricas de uma vez
-- plot_correlation_heatmap: Análise de correlações entre variáveis
+- plot_correlation_heatmap: Análise de correlações entre variáveis (com muitas colunas, mostra blocos; use block_row/block_col para detalhar um bloco)
 - plot_scatter: Investigação de relações entre duas variáveis
 - generate_insights_and_conclusions: Sintetiza todas as análises em conclusões
+- get_previous_answer: Texto completo de uma resposta anterior resumida no histórico (reference=N)
 
 EXEMPLOS DE COMO PROCEDER:
 
 Pergunta: "Quais os principais feedbacks?"
 ✅ CORRETO:
-1. Usar get_data_description() para ver as colunas disponíveis
+1. Identificar as colunas de feedback no esquema do dataset
 2. Usar get_descriptive_statistics() nas colunas de feedback
 3. Responder baseado nos dados reais
 
@@ -52,7 +61,7 @@ Pergunta: "Quais os principais feedbacks?"
 
 Pergunta: "Monte um plano de ação"
 ✅ CORRETO:
-1. Usar get_data_description() para entender os dados
+1. Usar o esquema do dataset para entender os dados
 2. Usar get_descriptive_statistics() em colunas relevantes
 3. Analisar padrões nos dados reais
 4. Criar plano baseado nos insights dos dados
@@ -62,24 +71,63 @@ Pergunta: "Monte um plano de ação"
 
 REGRAS IMPORTANTES:
 - Cada análise deve contribuir para um entendimento maior dos dados REAIS
-- Você tem memória das últimas {window_size} interações para manter contexto
+- Você tem memória das interações recentes e um resumo das mais antigas para manter contexto
 - Quando perguntado sobre conclusões, use generate_insights_and_conclusions
 - Quando solicitado boxplots de TODAS as colunas, use plot_multiple_boxplots
 - Quando solicitado boxplot de UMA coluna específica, use plot_boxplot
+- Quando solicitados histogramas de várias ou de TODAS as colunas, use plot_histograms_grid (uma única chamada, não uma por coluna)
 - Seja proativo em identificar próximas análises relevantes baseadas em descobertas anteriores
 - Sempre forneça interpretações contextualizadas dos resultados REAIS dos dados
-- SE NÃO SOUBER QUAIS COLUNAS EXISTEM, use get_data_description() PRIMEIRO!
-""".format(window_size=settings.MEMORY_CONFIG["window_size"])
+- SE O ESQUEMA NÃO ESTIVER DISPONÍVEL E NÃO SOUBER QUAIS COLUNAS EXISTEM, use get_data_description() PRIMEIRO!
+"""
+
+# Mensagem quando não há resumo do esquema (ex.: desabilitado)
+NO_SCHEMA_DIGEST = "ESQUEMA DO DATASET: não disponível; use get_data_description() primeiro."
+
+
+# Ferramentas com versão assíncrona (usada pelo ainvoke do executor), que
+# consultam os resultados especulados antes de executar
+EXECUTOR_TOOLS = with_async_support(with_speculation(ALL_TOOLS))
+
+# Prompt do agente: não depende da sessão, construído uma única vez; o esquema
+# do dataset da sessão entra pela variável schema_digest
+AGENT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", SYSTEM_PROMPT.replace("{", "{{").replace("}", "}}") + "\n{schema_digest}"),
+    MessagesPlaceholder(variable_name="chat_history"),
+    ("human", "{input}"),
+    MessagesPlaceholder(variable_name="agent_scratchpad")
+])
+
+
+def _build_agent(llm):
+    """Constrói o agente (LLM + ferramentas + prompt), compartilhado entre sessões."""
+    return create_tool_calling_agent(llm, ALL_TOOLS, AGENT_PROMPT)
 
 
-def create_eda_agent() -> AgentExecutor:
+def _get_session_schema_digest() -> str:
+    """Resumo do esquema do DataFrame da sessão (pré-calculado no carregamento)."""
+    df = current_data_context().df
+    if df is None or not settings.SCHEMA_DIGEST_CONFIG["enabled"]:
+        return NO_SCHEMA_DIGEST
+    try:
+        return get_schema_digest(df)
+    except Exception as e:
+        logger.warning(f"Could not build schema digest: {e}")
+        return NO_SCHEMA_DIGEST
+
+
+def create_eda_agent(memory=None) -> AgentExecutor:
     """
     Cria o agente LangChain para análise exploratória de dados com memória.
     
+    Args:
+        memory: Memória existente da sessão a reaproveitar (ex.: ao trocar de provider)
+    
     Returns:
         AgentExecutor: Executor do agente configurado
     """
     logger.info("Creating EDA agent with memory...")
+    started = time.perf_counter()
     
     # Configurar o LLM com sistema de fallback
     try:
@@ -100,7 +148,7 @@ def create_eda_agent() -> AgentExecutor:
         try:
             from config.settings import get_llm_config
             llm_config = get_llm_config()
-            llm = ChatOpenAI(**llm_config)
+            llm = llm_client_pool.get_llm("Default", llm_config)
             logger.info("LLM configured with default settings")
         except Exception as e2:
             logger.error(f"Error configuring LLM: {e2}")
@@ -108,19 +156,15 @@ def create_eda_agent() -> AgentExecutor:
             raise ValueError(f"LLM indisponível: {e2}")
     
     # Configurar memória de conversação
-    memory = create_memory(llm)
-    
-    # Criar o prompt template para o agente
-    prompt = ChatPromptTemplate.from_messages([
-        SystemMessage(content=SYSTEM_PROMPT),
-        MessagesPlaceholder(variable_name="chat_history"),
-        ("human", "{input}"),
-        MessagesPlaceholder(variable_name="agent_scratchpad")
-    ])
+    if memory is None:
+        memory = create_memory(llm)
     
-    # Criar o agente
+    # Obter o agente do pool (construído uma vez por cliente LLM)
     try:
-        agent = create_tool_calling_agent(llm, ALL_TOOLS, prompt)
+        agent = llm_client_pool.get_agent(llm, _build_agent)
+        # Esquema do dataset da sessão no prompt: dispensa a chamada inicial a get_data_description
+        schema_digest = _get_session_schema_digest()
+        agent = RunnablePassthrough.assign(schema_digest=lambda _: schema_digest) | agent
         logger.info("Agent created successfully")
     except Exception as e:
         logger.error(f"Error creating agent: {e}")
@@ -128,9 +172,11 @@ def create_eda_agent() -> AgentExecutor:
     
     # Criar o executor do agente com memória
     try:
-        agent_executor = AgentExecutor(
+        # Com PARALLEL_TOOLS_CONFIG desativado, o executor roda as ações em sequência
+        # (inclusive no caminho assíncrono, em que o LangChain as executaria com gather)
+        agent_executor = ParallelAgentExecutor(
             agent=agent,
-            tools=ALL_TOOLS,
+            tools=EXECUTOR_TOOLS,
             memory=memory if memory else None,
             **settings.AGENT_CONFIG
         )
@@ -143,5 +189,5 @@ def create_eda_agent() -> AgentExecutor:
         logger.error(f"Error creating agent executor: {e}")
         raise
     
-    logger.info("EDA agent setup completed")
+    logger.info(f"EDA agent setup completed in {(time.perf_counter() - started) * 1000:.0f} ms")
     return agent_executor
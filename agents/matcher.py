@@ -0,0 +1,189 @@
+"""
+Casamento de palavras-chave e nomes de colunas em uma única passada (Aho–Corasick).
+
+O agente offline e o roteador procuram, em cada pergunta, dezenas de palavras-
+chave e todos os nomes de colunas do dataset. Em vez de testar cada padrão
+com `in`, os padrões são compilados uma vez por dataset em um autômato de
+Aho–Corasick, que devolve todas as ocorrências (com posições) percorrendo a
+pergunta uma única vez, independentemente do número de colunas.
+"""
+
+import logging
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from utils.dataset_cache import dataset_cache
+
+logger = logging.getLogger(__name__)
+
+KEYWORD = "keyword"
+COLUMN = "column"
+
+
+class AhoCorasick:
+    """Autômato de Aho–Corasick sobre strings; cada padrão carrega uma lista de payloads."""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[Tuple[int, Any]]] = [[]]  # (tamanho do padrão, payload)
+        self._built = False
+
+    def add(self, pattern: str, payload: Any) -> None:
+        if not pattern:
+            return
+        node = 0
+        for char in pattern:
+            child = self._goto[node].get(char)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][char] = child
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            node = child
+        self._outputs[node].append((len(pattern), payload))
+        self._built = False
+
+    def build(self) -> "AhoCorasick":
+        """Calcula os links de falha (busca em largura) e propaga as saídas."""
+        queue = deque(self._goto[0].values())
+        for child in queue:
+            self._fail[child] = 0
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._outputs[child] = self._outputs[child] + self._outputs[self._fail[child]]
+        self._built = True
+        return self
+
+    def find_all(self, text: str) -> List[Tuple[int, int, Any]]:
+        """Todas as ocorrências como (início, fim, payload), em ordem de fim."""
+        if not self._built:
+            self.build()
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        matches = []
+        node = 0
+        for i, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length, payload in outputs[node]:
+                matches.append((i - length + 1, i + 1, payload))
+        return matches
+
+    @property
+    def size(self) -> int:
+        return len(self._goto)
+
+
+def normalize_column_name(column: str) -> List[str]:
+    """Formas de um nome de coluna procuradas na pergunta (minúsculas e com `_`/`-` como espaço)."""
+    lowered = str(column).lower()
+    variants = [lowered]
+    spaced = lowered.replace('_', ' ').replace('-', ' ')
+    if spaced != lowered:
+        variants.append(spaced)
+    return variants
+
+
+def _is_whole_word(text: str, start: int, end: int) -> bool:
+    before = text[start - 1] if start > 0 else ' '
+    after = text[end] if end < len(text) else ' '
+    return not (before.isalnum() or before == '_') and not (after.isalnum() or after == '_')
+
+
+class QueryMatches:
+    """Resultado de uma passada sobre a pergunta: palavras-chave e colunas encontradas."""
+
+    def __init__(self, text: str, raw: List[Tuple[int, int, Any]]):
+        self.text = text
+        self.keywords: Set[str] = set()
+        self.column_spans: List[Tuple[int, int, Any, bool]] = []
+        for start, end, (kind, value) in raw:
+            if kind == KEYWORD:
+                self.keywords.add(value)
+            else:
+                self.column_spans.append((start, end, value, _is_whole_word(text, start, end)))
+        self.column_spans.sort(key=lambda span: (span[0], -(span[1] - span[0])))
+
+    def has_any(self, keywords: Iterable[str]) -> bool:
+        return any(keyword in self.keywords for keyword in keywords)
+
+    def columns(self, whole_words: bool = False) -> List[Any]:
+        """
+        Colunas citadas, na ordem do texto. Ocorrências como palavra inteira têm
+        prioridade (ou exclusividade, com `whole_words`), e uma ocorrência contida
+        em outra mais longa é descartada (ex.: `V1` dentro de `V10`).
+        """
+        spans = [span for span in self.column_spans if span[3]]
+        if not spans and not whole_words:
+            spans = self.column_spans
+        selected: List[Tuple[int, int, Any, bool]] = []
+        for span in sorted(spans, key=lambda s: -(s[1] - s[0])):
+            if not any(other[0] <= span[0] and span[1] <= other[1] for other in selected):
+                selected.append(span)
+        ordered = []
+        for _, _, column, _ in sorted(selected, key=lambda s: s[0]):
+            if column not in ordered:
+                ordered.append(column)
+        return ordered
+
+    def best_column(self) -> Optional[Any]:
+        """Coluna mais provável: palavra inteira e mais longa, depois a primeira no texto."""
+        spans = [span for span in self.column_spans if span[3]] or self.column_spans
+        if not spans:
+            return None
+        return min(spans, key=lambda s: (-(s[1] - s[0]), s[0]))[2]
+
+
+class QueryMatcher:
+    """Autômato com as palavras-chave do agente e os nomes de colunas de um dataset."""
+
+    def __init__(self, keywords: Iterable[str], columns: Iterable[Any] = ()):
+        started = time.perf_counter()
+        self._automaton = AhoCorasick()
+        for keyword in set(keywords):
+            self._automaton.add(keyword.lower(), (KEYWORD, keyword))
+        n_columns = 0
+        for column in columns:
+            n_columns += 1
+            for variant in normalize_column_name(column):
+                self._automaton.add(variant, (COLUMN, column))
+        self._automaton.build()
+        self.build_seconds = time.perf_counter() - started
+        if n_columns:
+            logger.info(f"Built query matcher over {n_columns} columns "
+                        f"({self._automaton.size} states) in {self.build_seconds * 1000:.0f} ms")
+
+    def scan(self, query: str) -> QueryMatches:
+        text = query.lower()
+        return QueryMatches(text, self._automaton.find_all(text))
+
+
+_keyword_matchers: Dict[frozenset, QueryMatcher] = {}
+
+
+def get_query_matcher(df: Optional[pd.DataFrame], keywords: Iterable[str]) -> QueryMatcher:
+    """
+    Retorna o matcher do dataset (em cache por dataset), ou apenas das
+    palavras-chave quando não há dataset carregado.
+    """
+    keywords = frozenset(keywords)
+    if df is None:
+        matcher = _keyword_matchers.get(keywords)
+        if matcher is None:
+            matcher = _keyword_matchers[keywords] = QueryMatcher(keywords)
+        return matcher
+    return dataset_cache.get_or_compute(
+        df, ('query_matcher', hash(keywords)), lambda: QueryMatcher(keywords, df.columns)
+    )
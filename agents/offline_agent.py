@@ -4,17 +4,58 @@ Agente offline para quando LLMs não estão disponíveis.
 
 import logging
 import streamlit as st
+import re
 from typing import Dict, Any
+from agents.matcher import QueryMatches, get_query_matcher
 from tools import ALL_TOOLS
+from config.settings import settings
+from tools.context import current_data_context
+from tools.formatting import full_detail
+from utils.column_index import get_column_index
+from utils.dataset_cache import dataset_cache
+from utils.speculation import with_speculation
 
 logger = logging.getLogger(__name__)
 
+# Palavras-chave de cada intenção, na ordem de prioridade de `identify_tool`
+INTENT_KEYWORDS = {
+    # Palavras que indicam análise de TODAS as colunas
+    'all_columns': ('todas', 'todos', 'all', 'cada', 'completo', 'completa',
+                    'geral', 'overview', 'múltiplos', 'múltiplas', 'conjunto'),
+    'description': ('visão geral', 'overview', 'descrição', 'descrever',
+                    'tipos de dados', 'info', 'informações'),
+    'statistics': ('estatística', 'statistics', 'média', 'mediana',
+                   'desvio', 'variância', 'mínimo', 'máximo',
+                   'tendência central', 'variabilidade', 'intervalo'),
+    'distribution': ('histograma', 'histogram', 'distribuição',
+                     'distribution', 'frequência', 'ecdf'),
+    'histogram_grid': ('histogramas', 'ecdf'),
+    'outliers': ('boxplot', 'box plot', 'outlier', 'outliers',
+                 'atípicos', 'anomalias'),
+    'correlation': ('correlação', 'correlation', 'heatmap',
+                    'relacionadas', 'relacionamento', 'influência'),
+    'scatter': ('scatter', 'dispersão', 'versus', 'vs',
+                'relação entre', 'comparar'),
+    'insights': ('conclusão', 'conclusões', 'insights', 'resumo',
+                 'padrões', 'tendências', 'descobertas',
+                 'recomendações', 'análise completa', 'sintetizar'),
+    'missing_values': ('valores únicos', 'nulos', 'missing', 'faltantes'),
+    'clusters': ('clusters', 'agrupamentos', 'grupos'),
+    'generic': ('analisar', 'análise', 'mostrar', 'exibir'),
+    'distribution_hint': ('distribui',),
+    'ecdf': ('ecdf', 'acumulada'),
+}
+
+# Separadores de um par de colunas ("A versus B", "entre A e B")
+PAIR_SEPARATOR_RE = re.compile(r'\s+(?:versus|vs\.?|x|e|and|contra)\s+|\b(?:entre|between)\s+')
+
 class OfflineAgent:
     """Agente que funciona sem LLM, usando regras pré-definidas."""
     
     def __init__(self):
         """Inicializa o agente offline."""
-        self.tools = {tool.name: tool for tool in ALL_TOOLS}
+        # Ferramentas que consultam os resultados especulados antes de executar
+        self.tools = {tool.name: tool for tool in with_speculation(ALL_TOOLS)}
         self.keyword_tool_mapping = {
             # Mapeamento de palavras-chave para ferramentas
             
@@ -26,6 +67,10 @@ class OfflineAgent:
             'tipos de dados': 'get_data_description',
             'numéricos': 'get_data_description',
             'categóricos': 'get_data_description',
+            'nulos': 'get_data_description',
+            'faltantes': 'get_data_description',
+            'missing': 'get_data_description',
+            'valores únicos': 'get_data_description',
             
             # Estatísticas
             'estatística': 'get_descriptive_statistics',
@@ -43,6 +88,8 @@ class OfflineAgent:
             # Distribuições
             'histograma': 'plot_histogram',
             'histogram': 'plot_histogram',
+            'histogramas': 'plot_histograms_grid',
+            'ecdf': 'plot_histograms_grid',
             'distribuição': 'plot_histogram',
             'distribution': 'plot_histogram',
             'frequentes': 'plot_histogram',
@@ -82,6 +129,10 @@ class OfflineAgent:
             'descobertas': 'generate_insights_and_conclusions',
             'recomendações': 'generate_insights_and_conclusions'
         }
+        
+        # Todas as palavras-chave procuradas pelo matcher (intenções e mapeamento)
+        self.match_keywords = frozenset(self.keyword_tool_mapping).union(
+            *INTENT_KEYWORDS.values())
     
     def invoke(self, inputs: Dict[str, Any], callbacks=None) -> Dict[str, Any]:
         """
@@ -97,29 +148,18 @@ class OfflineAgent:
         query = inputs.get('input', '').lower()
         logger.info(f"Offline agent processing: {query}")
         
+        # Uma única passada sobre a pergunta serve à intenção e aos parâmetros
+        matches = self.scan(query)
+        
         # Tentar identificar a ferramenta apropriada
-        tool_name = self._identify_tool(query)
+        tool_name = self.identify_tool(query, matches)
         
         if tool_name:
-            # Executar a ferramenta
-            tool = self.tools[tool_name]
-            
             # Extrair parâmetros se necessário
-            params = self._extract_parameters(query, tool_name)
+            params = self.extract_parameters(query, tool_name, matches)
             
             try:
-                # Executar ferramenta
-                logger.info(f"Executing tool: {tool_name} with params: {params}")
-                result = tool.func(**params)
-                
-                # Formatar a resposta de forma amigável
-                formatted_output = self._format_response(tool_name, result, params)
-                
-                # Preparar resposta
-                response = {
-                    'output': formatted_output,
-                    'intermediate_steps': [(MockAction(tool_name), result)]
-                }
+                response = self.run_tool(tool_name, params)
                 
                 # Adicionar mensagem explicativa
                 if hasattr(st, 'warning'):
@@ -137,93 +177,112 @@ class OfflineAgent:
             # Não conseguiu identificar ferramenta
             return self._suggest_options()
     
-    def _identify_tool(self, query: str) -> str:
+    def run_tool(self, tool_name: str, params: Dict[str, Any], footer: str = None) -> Dict[str, Any]:
+        """
+        Executa a ferramenta e formata a resposta para exibição.
+        
+        Args:
+            tool_name: Nome da ferramenta
+            params: Parâmetros da ferramenta
+            footer: Rodapé das respostas em texto (padrão: aviso de modo offline)
+            
+        Returns:
+            Dicionário com 'output' e 'intermediate_steps'
+        """
+        tool = self.tools[tool_name]
+        logger.info(f"Executing tool: {tool_name} with params: {params}")
+        # A resposta é exibida diretamente: usar a renderização completa
+        with full_detail():
+            result = tool.func(**params)
+        
+        return {
+            'output': self._format_response(tool_name, result, params, footer),
+            'intermediate_steps': [(MockAction(tool_name, params), result)]
+        }
+    
+    def scan(self, query: str, df=None) -> QueryMatches:
+        """
+        Procura, em uma única passada, todas as palavras-chave e colunas do dataset na pergunta.
+        
+        O matcher é compilado uma vez por dataset (no carregamento) e reutilizado.
+        """
+        if df is None:
+            df = current_data_context().df
+        return get_query_matcher(df, self.match_keywords).scan(query)
+    
+    def _numeric_columns(self, df) -> frozenset:
+        return dataset_cache.get_or_compute(
+            df, 'numeric_columns', lambda: frozenset(df.select_dtypes(include=['number']).columns))
+    
+    def fuzzy_columns(self, text: str, df=None) -> list:
+        """Colunas numéricas citadas de forma aproximada (ex.: "valor da transação" → transaction_amount)."""
+        if df is None:
+            df = current_data_context().df
+        if df is None or not settings.COLUMN_INDEX_CONFIG["enabled"]:
+            return []
+        return [m.column for m in get_column_index(df).search(text, self._numeric_columns(df))]
+    
+    def identify_tool(self, query: str, matches: QueryMatches = None) -> str:
         """Identifica qual ferramenta usar baseado em palavras-chave e contexto."""
-        query_lower = query.lower()
+        matches = matches or self.scan(query)
         
-        # Palavras que indicam análise de TODAS as colunas
-        all_indicators = ['todas', 'todos', 'all', 'cada', 'completo', 'completa', 
-                          'geral', 'overview', 'múltiplos', 'múltiplas', 'conjunto']
+        def mentions(intent: str) -> bool:
+            return matches.has_any(INTENT_KEYWORDS[intent])
         
-        # Verifica se há coluna específica mencionada
-        specific_column = None
-        if 'df' in st.session_state and st.session_state.df is not None:
-            df = st.session_state.df
-            for col in df.columns:
-                if col.lower() in query_lower:
-                    specific_column = col
-                    break
+        # Verifica se há coluna específica mencionada (nome exato ou aproximado)
+        specific_column = matches.best_column()
+        if specific_column is None:
+            specific_column = next(iter(self.fuzzy_columns(query)), None)
+        all_columns = mentions('all_columns')
         
         # 1. VISÃO GERAL / DESCRIÇÃO
-        if any(word in query_lower for word in ['visão geral', 'overview', 'descrição', 'descrever', 
-                                                 'tipos de dados', 'info', 'informações']):
+        if mentions('description'):
             return 'get_data_description'
         
-        # 2. ESTATÍSTICAS DESCRITIVAS
-        if any(word in query_lower for word in ['estatística', 'statistics', 'média', 'mediana', 
-                                                 'desvio', 'variância', 'mínimo', 'máximo', 
-                                                 'tendência central', 'variabilidade', 'intervalo']):
-            # Se menciona "todas" ou não especifica coluna, analisar todas
-            if any(word in query_lower for word in all_indicators) or not specific_column:
-                return 'get_descriptive_statistics'
-            # Se menciona coluna específica
-            elif specific_column:
-                return 'get_descriptive_statistics'
-            else:
-                return 'get_descriptive_statistics'
+        # 2. ESTATÍSTICAS DESCRITIVAS (com ou sem coluna específica)
+        if mentions('statistics'):
+            return 'get_descriptive_statistics'
         
         # 3. HISTOGRAMA / DISTRIBUIÇÃO
-        if any(word in query_lower for word in ['histograma', 'histogram', 'distribuição', 
-                                                 'distribution', 'frequência']):
-            # Histograma sempre precisa de coluna específica
-            if specific_column:
-                return 'plot_histogram'
-            # Se não há coluna, sugerir estatísticas descritivas
-            return 'get_descriptive_statistics'
+        if mentions('distribution'):
+            # Várias colunas (ou nenhuma específica): grid de histogramas em uma chamada
+            if mentions('histogram_grid') or all_columns or not specific_column:
+                return 'plot_histograms_grid'
+            return 'plot_histogram'
         
         # 4. BOXPLOT / OUTLIERS
-        if any(word in query_lower for word in ['boxplot', 'box plot', 'outlier', 'outliers', 
-                                                 'atípicos', 'anomalias']):
-            # Se menciona "todas" ou não especifica coluna
-            if any(word in query_lower for word in all_indicators) or not specific_column:
-                return 'plot_multiple_boxplots'
-            # Se menciona coluna específica
-            elif specific_column:
-                return 'plot_boxplot'
-            else:
-                # Por padrão, mostrar todas para análise de outliers
+        if mentions('outliers'):
+            # Se menciona "todas" ou não especifica coluna, mostrar todas
+            if all_columns or not specific_column:
                 return 'plot_multiple_boxplots'
+            return 'plot_boxplot'
         
         # 5. CORRELAÇÃO / RELACIONAMENTO
-        if any(word in query_lower for word in ['correlação', 'correlation', 'heatmap', 
-                                                 'relacionadas', 'relacionamento', 'influência']):
+        if mentions('correlation'):
             return 'plot_correlation_heatmap'
         
         # 6. SCATTER / DISPERSÃO
-        if any(word in query_lower for word in ['scatter', 'dispersão', 'versus', 'vs', 
-                                                 'relação entre', 'comparar']):
+        if mentions('scatter'):
             # Scatter precisa de duas colunas
             return 'plot_scatter'
         
         # 7. INSIGHTS / CONCLUSÕES
-        if any(word in query_lower for word in ['conclusão', 'conclusões', 'insights', 'resumo',
-                                                 'padrões', 'tendências', 'descobertas', 
-                                                 'recomendações', 'análise completa', 'sintetizar']):
+        if mentions('insights'):
             return 'generate_insights_and_conclusions'
         
         # 8. PALAVRAS-CHAVE ESPECÍFICAS DE ANÁLISE
-        if any(word in query_lower for word in ['valores únicos', 'nulos', 'missing', 'faltantes']):
+        if mentions('missing_values'):
             return 'get_data_description'
         
-        if any(word in query_lower for word in ['clusters', 'agrupamentos', 'grupos']):
+        if mentions('clusters'):
             return 'generate_insights_and_conclusions'
         
         # 9. FALLBACK: Tentar identificar baseado em contexto geral
-        if any(word in query_lower for word in ['analisar', 'análise', 'mostrar', 'exibir']):
+        if mentions('generic'):
             # Se tem coluna específica
             if specific_column:
                 # Decidir baseado em outras palavras
-                if 'distribui' in query_lower:
+                if mentions('distribution_hint'):
                     return 'plot_histogram'
                 else:
                     return 'get_descriptive_statistics'
@@ -233,7 +292,7 @@ class OfflineAgent:
         
         return None
     
-    def _extract_parameters(self, query: str, tool_name: str) -> Dict[str, Any]:
+    def extract_parameters(self, query: str, tool_name: str, matches: QueryMatches = None) -> Dict[str, Any]:
         """Extrai parâmetros da query para a ferramenta com inteligência contextual."""
         params = {}
         query_lower = query.lower()
@@ -243,25 +302,30 @@ class OfflineAgent:
                          'get_data_description', 'generate_insights_and_conclusions']:
             return params
         
+        matches = matches or self.scan(query)
+        
+        # Grid de histogramas: colunas citadas (ou todas as numéricas), ECDF se pedido
+        if tool_name == 'plot_histograms_grid':
+            if matches.has_any(INTENT_KEYWORDS['ecdf']):
+                params['kind'] = 'ecdf'
+            mentioned = [str(col) for col in matches.columns()]
+            if len(mentioned) >= 2:
+                params['columns'] = ",".join(mentioned)
+            return params
+        
         # Obter DataFrame se disponível
-        df = None
-        if 'df' in st.session_state and st.session_state.df is not None:
-            df = st.session_state.df
+        df = current_data_context().df
         
         # 1. FERRAMENTAS QUE PRECISAM DE UMA COLUNA
         if tool_name in ['plot_histogram', 'plot_boxplot']:
             if df is not None:
-                # Procurar nome de coluna na query
-                for col in df.columns:
-                    # Verificação exata (case insensitive)
-                    if col.lower() in query_lower:
-                        params['column'] = col
-                        return params
-                    # Verificação parcial para colunas com underscore ou hífen
-                    col_parts = col.replace('_', ' ').replace('-', ' ').lower()
-                    if col_parts in query_lower:
-                        params['column'] = col
-                        return params
+                # Coluna citada na query (nome exato, com underscore/hífen como espaço ou aproximado)
+                column = matches.best_column()
+                if column is None:
+                    column = next(iter(self.fuzzy_columns(query, df)), None)
+                if column is not None:
+                    params['column'] = column
+                    return params
                 
                 # Se não encontrou coluna mas é histograma/boxplot, pegar primeira numérica
                 numeric_cols = df.select_dtypes(include=['number']).columns
@@ -272,51 +336,37 @@ class OfflineAgent:
         elif tool_name == 'get_descriptive_statistics':
             if df is not None:
                 # Verificar se menciona coluna específica
-                for col in df.columns:
-                    if col.lower() in query_lower:
-                        params['column'] = col
-                        return params
+                column = matches.best_column()
+                if column is None:
+                    column = next(iter(self.fuzzy_columns(query, df)), None)
+                if column is not None:
+                    params['column'] = column
                 # Se não especifica, retorna sem parâmetro (analisará todas)
                 return params
         
         # 3. SCATTER PLOT (precisa de 2 colunas)
         elif tool_name == 'plot_scatter':
             if df is not None:
-                cols_found = []
                 numeric_cols = df.select_dtypes(include=['number']).columns
+                numeric_set = self._numeric_columns(df)
                 
-                # Procurar colunas mencionadas
-                for col in numeric_cols:
-                    if col.lower() in query_lower:
-                        cols_found.append(col)
+                # Colunas numéricas mencionadas, na ordem do texto
+                cols_found = [col for col in matches.columns() if col in numeric_set]
                 
-                # Procurar palavras-chave especiais
-                if 'versus' in query_lower or ' vs ' in query_lower or ' x ' in query_lower:
-                    # Tentar extrair padrão "A versus B" ou "A vs B"
-                    import re
-                    patterns = [
-                        r'(\w+)\s+versus\s+(\w+)',
-                        r'(\w+)\s+vs\s+(\w+)',
-                        r'(\w+)\s+x\s+(\w+)',
-                        r'entre\s+(\w+)\s+e\s+(\w+)'
-                    ]
-                    
-                    for pattern in patterns:
-                        match = re.search(pattern, query_lower)
-                        if match:
-                            col1, col2 = match.groups()
-                            # Verificar se são colunas válidas
-                            valid_cols = []
-                            for col_name in [col1, col2]:
-                                for actual_col in numeric_cols:
-                                    if col_name in actual_col.lower():
-                                        valid_cols.append(actual_col)
-                                        break
-                            
-                            if len(valid_cols) == 2:
-                                params['x_column'] = valid_cols[0]
-                                params['y_column'] = valid_cols[1]
-                                return params
+                # Nomes aproximados: uma coluna por trecho entre separadores
+                # ("valor da transação versus idade do cliente"), ou as duas melhores da pergunta
+                if len(cols_found) < 2:
+                    fuzzy = []
+                    for segment in PAIR_SEPARATOR_RE.split(query_lower):
+                        for col in self.fuzzy_columns(segment, df)[:1]:
+                            if col not in fuzzy:
+                                fuzzy.append(col)
+                    if len(fuzzy) < 2:
+                        ranked = get_column_index(df).search(query_lower, numeric_set)[:2]
+                        if len(ranked) == 2:
+                            fuzzy = [m.column for m in sorted(ranked, key=lambda m: m.position)]
+                    if len(fuzzy) >= 2 or not cols_found:
+                        cols_found = fuzzy
                 
                 # Se encontrou 2+ colunas, usar as primeiras duas
                 if len(cols_found) >= 2:
@@ -338,7 +388,7 @@ class OfflineAgent:
         
         return params
     
-    def _format_response(self, tool_name: str, result, params: Dict[str, Any]) -> str:
+    def _format_response(self, tool_name: str, result, params: Dict[str, Any], footer: str = None) -> str:
         """
         Formata a resposta da ferramenta de forma amigável.
         
@@ -346,6 +396,7 @@ class OfflineAgent:
             tool_name: Nome da ferramenta executada
             result: Resultado da ferramenta
             params: Parâmetros usados
+            footer: Rodapé (padrão: aviso de modo offline)
             
         Returns:
             Resposta formatada em string
@@ -402,7 +453,7 @@ class OfflineAgent:
         elif tool_name == 'generate_insights_and_conclusions':
             formatted = str(result)  # Já vem bem formatado
             
-        elif tool_name in ['plot_histogram', 'plot_boxplot', 'plot_multiple_boxplots', 
+        elif tool_name in ['plot_histogram', 'plot_histograms_grid', 'plot_boxplot', 'plot_multiple_boxplots', 
                           'plot_correlation_heatmap', 'plot_scatter']:
             # Para visualizações, adicionar contexto
             formatted += f"### Visualização: {tool_name.replace('plot_', '').replace('_', ' ').title()}\n\n"
@@ -422,8 +473,8 @@ class OfflineAgent:
         
         # Adicionar rodapé informativo
         formatted += "\n\n---\n"
-        formatted += "*📝 Análise realizada em modo offline (sem IA). "
-        formatted += "Para análises mais sofisticadas, configure um modelo de linguagem.*"
+        formatted += footer or ("*📝 Análise realizada em modo offline (sem IA). "
+                                "Para análises mais sofisticadas, configure um modelo de linguagem.*")
         
         return formatted
     
@@ -447,6 +498,7 @@ Não consegui identificar qual análise você deseja. Por favor, seja mais espec
 
 **Visualizações:**
 - `"histograma da coluna [nome]"` - Distribuição de uma variável
+- `"histogramas de todas as colunas"` - Distribuições de todas as variáveis numéricas
 - `"boxplot da coluna [nome]"` - Análise de outliers de uma coluna
 - `"boxplot de todas as colunas"` - Outliers de todas as variáveis
 - `"matriz de correlação"` - Correlações entre variáveis
@@ -474,8 +526,9 @@ Mencione o nome exato das colunas do seu dataset para melhores resultados.
 
 class MockAction:
     """Classe mock para simular ação do agente."""
-    def __init__(self, tool_name):
+    def __init__(self, tool_name, tool_input=None):
         self.tool = tool_name
+        self.tool_input = tool_input or {}
 
 # Instância global
 offline_agent = OfflineAgent()
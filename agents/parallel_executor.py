@@ -0,0 +1,207 @@
+"""
+Executor do agente que roda em paralelo as ferramentas pedidas em um mesmo passo.
+
+Modelos com tool calling frequentemente pedem várias ferramentas de uma vez
+(ex.: estatísticas, heatmap e boxplots). Como as ferramentas apenas leem o
+DataFrame da sessão, elas são executadas concorrentemente em um pool de threads
+compartilhado (numpy/pandas liberam o GIL nas varreduras), e os resultados são
+devolvidos na ordem em que o modelo os pediu.
+
+No caminho assíncrono (`ainvoke`), o LangChain já executa as ações do passo
+com `asyncio.gather`; o executor apenas garante que as ferramentas de
+`sequential_tools` esperem as demais do passo terminarem e rodem sozinhas. O
+mesmo vale no caminho síncrono.
+
+O executor estende os passos internos do `AgentExecutor` (`_iter_next_step`,
+`_aiter_next_step` e `_perform_agent_action`/`_aperform_agent_action`), que não
+fazem parte da API pública: é suportado apenas nas versões do LangChain em
+`SUPPORTED_LANGCHAIN_VERSIONS`. Em outras versões, o executor se comporta como
+o `AgentExecutor` original (ações em sequência no caminho síncrono) e registra
+um aviso.
+"""
+
+import asyncio
+import contextvars
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Iterator, List, Optional, Union
+
+import langchain
+from langchain.agents import AgentExecutor
+from langchain_core.agents import AgentAction, AgentFinish, AgentStep
+
+from config.settings import settings
+from utils.async_runner import run_with_script_context
+
+logger = logging.getLogger(__name__)
+
+# Versões (prefixos) cujo formato dos passos internos do AgentExecutor foi verificado
+SUPPORTED_LANGCHAIN_VERSIONS = ("0.3.",)
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+# Passo em andamento: no caminho síncrono, as ações pendentes; no assíncrono, o plano
+# do passo (copiado para as tarefas criadas pelo gather)
+_sync_step: contextvars.ContextVar = contextvars.ContextVar('agent_sync_step', default=None)
+_async_step: contextvars.ContextVar = contextvars.ContextVar('agent_async_step', default=None)
+
+
+def parallel_steps_supported() -> bool:
+    """Verifica se a versão instalada do LangChain tem os passos internos esperados."""
+    return (langchain.__version__.startswith(SUPPORTED_LANGCHAIN_VERSIONS)
+            and all(hasattr(AgentExecutor, name) for name in (
+                '_iter_next_step', '_aiter_next_step', '_perform_agent_action', '_aperform_agent_action')))
+
+
+# Calculado uma vez: fora das versões suportadas, o executor apenas delega ao AgentExecutor
+_STEPS_SUPPORTED = parallel_steps_supported()
+if not _STEPS_SUPPORTED:
+    logger.warning(f"LangChain {langchain.__version__} is not in SUPPORTED_LANGCHAIN_VERSIONS "
+                   f"{SUPPORTED_LANGCHAIN_VERSIONS}; ParallelAgentExecutor runs tool calls "
+                   f"like the original AgentExecutor")
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=settings.PARALLEL_TOOLS_CONFIG["max_workers"],
+                thread_name_prefix="agent-tool"
+            )
+        return _pool
+
+
+def _is_sequential(tool_name: str) -> bool:
+    config = settings.PARALLEL_TOOLS_CONFIG
+    return not config["enabled"] or tool_name in config["sequential_tools"]
+
+
+class _PendingStep:
+    """Resultado futuro de uma ação: submetida ao pool ou adiada até as concorrentes terminarem."""
+
+    def __init__(self, future: Future = None, run: Callable[[], AgentStep] = None,
+                 after: List["_PendingStep"] = None):
+        self.future = future
+        self.run = run
+        self.after = after
+
+    def result(self) -> AgentStep:
+        if self.future is None:
+            for step in self.after:
+                step.result()
+            self.future = Future()
+            self.future.set_result(self.run())
+        return self.future.result()
+
+
+class _AsyncStep:
+    """Ações de um passo assíncrono: as sequenciais esperam as concorrentes terminarem."""
+
+    def __init__(self):
+        self.concurrent = 0
+        self.finished = 0
+        self.others_done = asyncio.Event()
+        self.others_done.set()
+        self.sequential = asyncio.Lock()
+
+    def plan(self, action: AgentAction) -> None:
+        if not _is_sequential(action.tool):
+            self.concurrent += 1
+            self.others_done.clear()
+
+    def finish(self) -> None:
+        self.finished += 1
+        if self.finished >= self.concurrent:
+            self.others_done.set()
+
+
+class ParallelAgentExecutor(AgentExecutor):
+    """AgentExecutor que executa concorrentemente as ações independentes de um passo."""
+
+    def _iter_next_step(self, name_to_tool_map, color_mapping, inputs, intermediate_steps,
+                        run_manager=None) -> Iterator[Union[AgentFinish, AgentAction, AgentStep]]:
+        if not _STEPS_SUPPORTED or not settings.PARALLEL_TOOLS_CONFIG["enabled"]:
+            yield from super()._iter_next_step(name_to_tool_map, color_mapping, inputs,
+                                               intermediate_steps, run_manager)
+            return
+
+        # O passo original chama _perform_agent_action para cada ação em sequência;
+        # durante o passo, cada chamada apenas submete a ação ao pool (ou a adia)
+        pending: List[_PendingStep] = []
+        token = _sync_step.set(pending)
+        try:
+            for output in super()._iter_next_step(name_to_tool_map, color_mapping, inputs,
+                                                  intermediate_steps, run_manager):
+                if not isinstance(output, _PendingStep):
+                    yield output
+        finally:
+            _sync_step.reset(token)
+
+        if len(pending) > 1:
+            logger.info(f"Running {len(pending)} tool calls concurrently")
+        for step in pending:
+            yield step.result()
+
+    def _perform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None):
+        pending = _sync_step.get() if _STEPS_SUPPORTED else None
+        perform = super()._perform_agent_action
+        if pending is None:
+            return perform(name_to_tool_map, color_mapping, agent_action, run_manager)
+
+        if _is_sequential(agent_action.tool):
+            # Ferramentas que alteram o estado da sessão rodam sozinhas, após as concorrentes do passo
+            concurrent = [step for step in pending if step.run is None]
+            step = _PendingStep(run=lambda: perform(name_to_tool_map, color_mapping, agent_action, run_manager),
+                                after=concurrent)
+        else:
+            from streamlit.runtime.scriptrunner import get_script_run_ctx
+            context = contextvars.copy_context()
+            step = _PendingStep(_get_pool().submit(
+                context.run, run_with_script_context, get_script_run_ctx(suppress_warning=True),
+                perform, name_to_tool_map, color_mapping, agent_action, run_manager
+            ))
+            # Ações sequenciais já adiadas também esperam esta
+            for other in pending:
+                if other.run is not None:
+                    other.after.append(step)
+        pending.append(step)
+        return step
+
+    async def _aiter_next_step(self, name_to_tool_map, color_mapping, inputs, intermediate_steps,
+                               run_manager=None) -> AsyncIterator[Union[AgentFinish, AgentAction, AgentStep]]:
+        if not _STEPS_SUPPORTED:
+            async for output in super()._aiter_next_step(name_to_tool_map, color_mapping, inputs,
+                                                         intermediate_steps, run_manager):
+                yield output
+            return
+
+        # O passo original emite todas as ações antes de executá-las com asyncio.gather;
+        # as tarefas do gather herdam o contexto e, com ele, o plano do passo
+        step = _AsyncStep()
+        token = _async_step.set(step)
+        try:
+            async for output in super()._aiter_next_step(name_to_tool_map, color_mapping, inputs,
+                                                         intermediate_steps, run_manager):
+                if isinstance(output, AgentAction):
+                    step.plan(output)
+                yield output
+        finally:
+            _async_step.reset(token)
+
+    async def _aperform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None):
+        step = _async_step.get() if _STEPS_SUPPORTED else None
+        perform = super()._aperform_agent_action
+        if step is None:
+            return await perform(name_to_tool_map, color_mapping, agent_action, run_manager)
+        if _is_sequential(agent_action.tool):
+            # Ferramentas que alteram o estado da sessão rodam sozinhas, após as demais do passo
+            await step.others_done.wait()
+            async with step.sequential:
+                return await perform(name_to_tool_map, color_mapping, agent_action, run_manager)
+        try:
+            return await perform(name_to_tool_map, color_mapping, agent_action, run_manager)
+        finally:
+            step.finish()
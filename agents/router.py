@@ -0,0 +1,168 @@
+"""
+Roteador de perguntas simples, executado antes do agente LLM.
+
+Usa o classificador de intenções do agente offline e atribui uma confiança à
+decisão: perguntas diretas ("histograma de Amount", "matriz de correlação")
+são respondidas executando a ferramenta em milissegundos; perguntas ambíguas,
+abertas ou com várias partes seguem para o LLM.
+"""
+
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from agents.matcher import QueryMatches
+from agents.offline_agent import offline_agent
+from config.settings import settings
+from tools.context import current_data_context
+
+logger = logging.getLogger(__name__)
+
+# Indícios de pergunta aberta, que pede interpretação e não apenas um resultado
+OPEN_ENDED_MARKERS = (
+    'por que', 'porque', 'explique', 'explica', 'interprete', 'interpretar', 'significa',
+    'como posso', 'como melhorar', 'recomend', 'sugira', 'sugest', 'plano', 'deveria', 'devo',
+    'qual a melhor', 'quais as melhores', 'compare', 'comparar', 'impacto', 'causa', 'preveja',
+    'previsão', 'modelo', 'hipótese', 'conclus', 'insight', 'e se', 'o que você acha'
+)
+
+# Indícios de uma pergunta com várias partes
+MULTI_PART_MARKERS = (' e depois', ' e também', ' além disso', ' em seguida', ' e então', '; ')
+
+# Ferramentas agrupadas por família de intenção (para detectar pedidos ambíguos)
+TOOL_FAMILIES = {
+    'get_data_description': 'descrição',
+    'get_descriptive_statistics': 'estatísticas',
+    'plot_histogram': 'distribuição',
+    'plot_histograms_grid': 'distribuição',
+    'plot_boxplot': 'outliers',
+    'plot_multiple_boxplots': 'outliers',
+    'plot_correlation_heatmap': 'correlação',
+    'plot_scatter': 'dispersão',
+    'generate_insights_and_conclusions': 'insights'
+}
+
+SINGLE_COLUMN_TOOLS = ('plot_histogram', 'plot_boxplot')
+
+# Ferramentas de várias colunas: exigem um pedido explícito de várias/todas as colunas
+MULTI_COLUMN_TOOLS = ('plot_histograms_grid', 'plot_multiple_boxplots')
+MULTI_COLUMN_MARKERS = ('todas', 'todos', 'all', 'cada', 'colunas', 'variáveis', 'histogramas',
+                        'boxplots', 'ecdf', 'outliers')
+
+# Palavras que aparecem no mapeamento do agente offline mas não indicam intenção sozinhas
+_WEAK_KEYWORDS = {'todos', 'todas', 'info', 'relação', 'intervalo', 'frequentes'}
+
+
+class QueryRouter:
+    """Decide se a pergunta pode ser respondida diretamente por uma ferramenta."""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = config or settings.ROUTER_CONFIG
+        self.agent = offline_agent
+
+    def classify(self, query: str, df=None) -> Dict[str, Any]:
+        """
+        Classifica a pergunta.
+
+        Returns:
+            Dicionário com tool (ou None), params, confidence (0 a 1) e reason
+        """
+        query_lower = query.lower().strip()
+        decision = {'tool': None, 'params': {}, 'confidence': 0.0, 'reason': "nenhuma intenção reconhecida"}
+
+        matches = self.agent.scan(query_lower, df)
+        tool_name = self.agent.identify_tool(query_lower, matches)
+        if tool_name is None:
+            return decision
+        decision['tool'] = tool_name
+
+        families = {TOOL_FAMILIES.get(tool) for keyword, tool in self.agent.keyword_tool_mapping.items()
+                    if keyword not in _WEAK_KEYWORDS and keyword in matches.keywords}
+        families.discard(None)
+        # Colunas citadas como palavra inteira (ex.: V1 não casa com V10), na ordem do texto
+        columns = matches.columns(whole_words=True)
+        approximate = False
+        if not columns and df is not None:
+            # Nomes aproximados ("valor da transação" → transaction_amount), com confiança menor
+            columns = self.agent.fuzzy_columns(query_lower, df)
+            approximate = bool(columns)
+
+        confidence, reason = 0.9, "intenção e parâmetros explícitos"
+        if tool_name not in self.config["tools"]:
+            confidence, reason = 0.0, "ferramenta reservada ao LLM"
+        elif any(marker in query_lower for marker in OPEN_ENDED_MARKERS):
+            confidence, reason = 0.3, "pergunta aberta"
+        elif any(marker in query_lower for marker in MULTI_PART_MARKERS) or query_lower.count('?') > 1:
+            confidence, reason = 0.4, "pergunta com várias partes"
+        elif TOOL_FAMILIES[tool_name] not in families:
+            # Decisão por palavras genéricas ("analisar", "mostrar")
+            confidence, reason = 0.3, "intenção inferida por palavras genéricas"
+        elif len(families) > 1:
+            confidence, reason = 0.4, f"intenções concorrentes: {', '.join(sorted(families))}"
+        elif tool_name in SINGLE_COLUMN_TOOLS and len(columns) != 1:
+            confidence, reason = 0.5, "coluna não identificada"
+        elif tool_name in MULTI_COLUMN_TOOLS and not any(m in query_lower for m in MULTI_COLUMN_MARKERS):
+            confidence, reason = 0.5, "colunas não especificadas"
+        elif tool_name == 'plot_scatter' and len(columns) != 2:
+            confidence, reason = 0.5, "par de colunas não identificado"
+        elif tool_name == 'get_descriptive_statistics' and len(columns) > 1:
+            confidence, reason = 0.5, "coluna ambígua"
+        elif len(query_lower.split()) > self.config["max_words"]:
+            confidence, reason = 0.6, "pergunta longa"
+        elif approximate:
+            confidence, reason = 0.8, "coluna identificada por nome aproximado"
+
+        decision.update(confidence=confidence, reason=reason,
+                        params=self._parameters(query_lower, tool_name, columns, matches, approximate))
+        return decision
+
+    def _parameters(self, query_lower: str, tool_name: str, columns: List[str],
+                    matches: QueryMatches = None, approximate: bool = False) -> Dict[str, Any]:
+        """Parâmetros do agente offline, corrigidos pelas colunas citadas como palavra inteira."""
+        params = self.agent.extract_parameters(query_lower, tool_name, matches)
+        if approximate:
+            # O agente offline já resolveu os nomes aproximados (inclusive a ordem do par)
+            return params
+        if tool_name in SINGLE_COLUMN_TOOLS and len(columns) == 1:
+            params['column'] = columns[0]
+        elif tool_name == 'get_descriptive_statistics':
+            params.pop('column', None)
+            if len(columns) == 1:
+                params['column'] = columns[0]
+        elif tool_name == 'plot_scatter' and len(columns) == 2:
+            params.update(x_column=columns[0], y_column=columns[1])
+        return params
+
+    def route(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Executa a ferramenta diretamente quando a confiança é alta.
+
+        Returns:
+            Resultado no formato do agente (com 'routed_by') ou None para seguir ao LLM
+        """
+        if not self.config["enabled"]:
+            return None
+        started = time.perf_counter()
+        decision = self.classify(query, current_data_context().df)
+        if decision['confidence'] < self.config["min_confidence"]:
+            logger.info(f"Router sent query to LLM ({decision['reason']}, "
+                        f"confidence {decision['confidence']:.1f})")
+            return None
+
+        try:
+            result = self.agent.run_tool(decision['tool'], decision['params'], footer=(
+                "*⚡ Resposta direta da ferramenta, sem chamada ao LLM. "
+                "Para interpretações, faça uma pergunta mais aberta.*"
+            ))
+        except Exception as e:
+            logger.warning(f"Router tool {decision['tool']} failed, falling back to LLM: {e}")
+            return None
+
+        decision['seconds'] = time.perf_counter() - started
+        result['routed_by'] = decision
+        logger.info(f"Router answered with {decision['tool']} in {decision['seconds'] * 1000:.0f} ms")
+        return result
+
+
+# Instância global
+query_router = QueryRouter()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Relatórios de análise exploratória em lote, sem a interface do Streamlit.
+
+Processa todos os CSVs de um diretório em processos de trabalho paralelos. Para
+cada arquivo, executa as mesmas ferramentas do agente (visão geral,
+estatísticas descritivas, outliers, correlações e insights) com um
+`DataContext` próprio e grava em `<saída>/<arquivo>/` o relatório em Markdown e
+as figuras em HTML. Com `--llm`, o agente LLM acrescenta um resumo executivo;
+sem a opção, apenas as ferramentas (modo offline) são usadas. Ao final, exibe
+o tempo e o pico de memória de cada arquivo e grava `summary.csv`.
+
+Uso:
+    python batch_report.py dados/ --output reports --workers 4
+    python batch_report.py dados/ --llm
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config.settings import settings
+from tools import (
+    generate_insights_and_conclusions,
+    get_data_description,
+    get_descriptive_statistics,
+    plot_correlation_heatmap,
+    plot_histograms_grid,
+    plot_multiple_boxplots
+)
+from tools.context import DataContext, use_data_context
+from tools.formatting import fmt_number, full_detail
+from utils.dataset_cache import dataset_cache, get_column_summaries, get_correlation_matrix
+
+logger = logging.getLogger("eda_agent.batch")
+
+# (arquivo, ferramenta, argumentos) das figuras gravadas em cada relatório
+FIGURES = [
+    ("boxplots", plot_multiple_boxplots, {}),
+    ("correlacao", plot_correlation_heatmap, {}),
+    ("histogramas", plot_histograms_grid, {}),
+]
+
+
+def _configure_logging(level: str) -> None:
+    logging.basicConfig(level=getattr(logging, level), format=settings.LOGGING_CONFIG["format"])
+    # Avisos de "missing ScriptRunContext" ao usar o Streamlit fora de um script
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+
+def _outlier_section(df: pd.DataFrame) -> str:
+    """Tabela de outliers (critério IQR) por coluna numérica, com os resumos em cache."""
+    numeric_cols = list(df.select_dtypes(include=[np.number]).columns)
+    if not numeric_cols:
+        return "⚠️ Não há colunas numéricas no DataFrame."
+    summaries = get_column_summaries(df, numeric_cols)
+    rows = sorted(((col, s) for col, s in summaries.items() if s['n_outliers']),
+                  key=lambda item: item[1]['n_outliers'], reverse=True)
+    if not rows:
+        return "✅ Nenhuma coluna com outliers pelo critério IQR (1,5 × IQR)."
+    lines = ["| Coluna | Outliers | % | Limite inferior | Limite superior |",
+             "|---|---|---|---|---|"]
+    for col, s in rows:
+        lines.append(f"| {col} | {s['n_outliers']:,} | {s['n_outliers'] / s['count'] * 100:.2f}% | "
+                     f"{fmt_number(s['lower_fence'])} | {fmt_number(s['upper_fence'])} |")
+    return "\n".join(lines)
+
+
+def _correlation_section(df: pd.DataFrame, top: int) -> str:
+    """Pares de colunas numéricas com maior correlação absoluta."""
+    corr = get_correlation_matrix(df)
+    if len(corr.columns) < 2:
+        return "⚠️ São necessárias ao menos duas colunas numéricas para calcular correlações."
+    strength = corr.where(np.triu(np.ones(corr.shape, dtype=bool), k=1)).stack()
+    pairs = strength.reindex(strength.abs().sort_values(ascending=False).index)[:top]
+    lines = ["| Coluna 1 | Coluna 2 | Correlação |", "|---|---|---|"]
+    lines += [f"| {a} | {b} | {value:.3f} |" for (a, b), value in pairs.items()]
+    return "\n".join(lines)
+
+
+def _llm_summary(prompt: str) -> str:
+    """Resumo executivo do agente LLM (com as ferramentas em modo compacto)."""
+    from agents import create_eda_agent
+
+    try:
+        result = create_eda_agent().invoke({"input": prompt})
+        return str(result.get('output', ''))
+    except Exception as e:
+        logger.warning(f"LLM summary failed, report keeps only the tool sections: {e}")
+        return f"⚠️ LLM indisponível ({e}). O relatório contém apenas as análises das ferramentas."
+
+
+def _write_report(report_dir: Path, title: str, sections: List[Tuple[str, str]],
+                  figures: List[str]) -> Path:
+    lines = [f"# Relatório de Análise Exploratória: {title}", ""]
+    for heading, body in sections:
+        lines += [f"## {heading}", "", body, ""]
+    if figures:
+        lines += ["## Figuras", ""]
+        lines += [f"- [{name}]({name}.html)" for name in figures]
+        lines.append("")
+    path = report_dir / "report.md"
+    path.write_text("\n".join(lines), encoding="utf-8")
+    return path
+
+
+def analyze_file(path: str, output_dir: str, use_llm: bool = False,
+                 trace_memory: bool = True) -> Dict[str, Any]:
+    """
+    Gera o relatório de um CSV (executado em um processo de trabalho).
+
+    Args:
+        path: Arquivo CSV
+        output_dir: Diretório de saída (o relatório fica em `<output_dir>/<nome do arquivo>/`)
+        use_llm: Acrescentar o resumo executivo do agente LLM
+        trace_memory: Medir o pico de memória alocada (tracemalloc, ~50% mais lento)
+
+    Returns:
+        Dict com file, status, rows, columns, seconds, peak_mb, report e error
+    """
+    config = settings.BATCH_CONFIG
+    source = Path(path)
+    report_dir = Path(output_dir) / source.stem
+    outcome = {'file': source.name, 'status': 'ok', 'rows': 0, 'columns': 0, 'seconds': 0.0,
+               'peak_mb': 0.0, 'report': '', 'error': ''}
+    df = None
+    started = time.perf_counter()
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        df = pd.read_csv(source)
+        outcome['rows'], outcome['columns'] = df.shape
+        report_dir.mkdir(parents=True, exist_ok=True)
+
+        context = DataContext(df=df, analysis_history=[])
+        with use_data_context(context):
+            with full_detail():
+                sections = [
+                    ("Visão Geral", get_data_description.invoke({})),
+                    ("Estatísticas Descritivas", get_descriptive_statistics.invoke({})),
+                    ("Outliers", _outlier_section(df)),
+                    ("Correlações", _correlation_section(df, config["top_correlations"])),
+                    ("Insights e Conclusões", generate_insights_and_conclusions.invoke({}))
+                ]
+                figures = []
+                for name, tool, args in FIGURES:
+                    tool.invoke(args).write_html(report_dir / f"{name}.html", include_plotlyjs="cdn")
+                    figures.append(name)
+            if use_llm:
+                sections.append(("Resumo do LLM", _llm_summary(config["llm_prompt"])))
+
+        outcome['report'] = str(_write_report(report_dir, source.name, sections, figures))
+    except Exception as e:
+        logger.error(f"Batch report of {source.name} failed: {e}")
+        outcome['status'] = 'error'
+        outcome['error'] = str(e)
+    finally:
+        if trace_memory:
+            outcome['peak_mb'] = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+            tracemalloc.stop()
+        outcome['seconds'] = time.perf_counter() - started
+        if df is not None:
+            # O processo de trabalho segue para o próximo arquivo: liberar o cache deste
+            dataset_cache.invalidate(df)
+    return outcome
+
+
+def main() -> int:
+    config = settings.BATCH_CONFIG
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input_dir", help="Diretório com os arquivos CSV")
+    parser.add_argument("--output", default=config["output_dir"], help="Diretório dos relatórios")
+    parser.add_argument("--pattern", default=config["pattern"], help="Padrão dos arquivos (glob)")
+    parser.add_argument("--workers", type=int, default=config["workers"],
+                        help="Processos de trabalho (padrão: número de CPUs)")
+    parser.add_argument("--llm", action="store_true",
+                        help="Acrescentar o resumo executivo do agente LLM (padrão: apenas as ferramentas)")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Não medir o pico de memória (o tracemalloc deixa a análise ~50%% mais lenta)")
+    args = parser.parse_args()
+
+    _configure_logging(config["log_level"])
+    files = sorted(str(path) for path in Path(args.input_dir).glob(args.pattern) if path.is_file())
+    if not files:
+        print(f"Nenhum arquivo '{args.pattern}' em {args.input_dir}")
+        return 1
+    workers = max(1, min(args.workers or os.cpu_count() or 1, len(files)))
+    Path(args.output).mkdir(parents=True, exist_ok=True)
+
+    print(f"{len(files)} arquivo(s), {workers} processo(s), modo {'LLM' if args.llm else 'offline'}\n")
+    print(f"{'arquivo':<32} {'status':<7} {'linhas':>10} {'colunas':>8} {'tempo':>8} {'pico de memória':>16}")
+    started = time.perf_counter()
+    outcomes = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_configure_logging,
+                             initargs=(config["log_level"],)) as pool:
+        futures = [pool.submit(analyze_file, path, args.output, args.llm, not args.no_memory) for path in files]
+        for future in as_completed(futures):
+            outcome = future.result()
+            outcomes.append(outcome)
+            peak = "-" if args.no_memory else f"{outcome['peak_mb']:.1f} MB"
+            print(f"{outcome['file']:<32} {outcome['status']:<7} {outcome['rows']:>10,} "
+                  f"{outcome['columns']:>8} {outcome['seconds']:>7.1f}s {peak:>16}")
+            if outcome['error']:
+                print(f"    {outcome['error']}")
+
+    summary = pd.DataFrame(outcomes).sort_values('file')
+    summary_path = Path(args.output) / "summary.csv"
+    summary.to_csv(summary_path, index=False)
+    failed = int((summary['status'] != 'ok').sum())
+    print(f"\n{len(files) - failed}/{len(files)} relatório(s) em {time.perf_counter() - started:.1f}s "
+          f"(soma dos arquivos {summary['seconds'].sum():.1f}s); resumo em {summary_path}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
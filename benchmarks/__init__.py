@@ -0,0 +1,6 @@
+"""
+Benchmarks de desempenho do EDA Agent.
+
+Execute a partir da raiz do projeto, por exemplo:
+    python -m benchmarks.bench_multiple_boxplots --rows 1000000 --cols 40
+"""
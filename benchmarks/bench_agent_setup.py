@@ -0,0 +1,66 @@
+"""
+Benchmark da configuração do agente por sessão.
+
+Compara a construção anterior (novo ChatOpenAI, agente e executor a cada sessão)
+com o pool de clientes, medindo a latência de configuração e o número de
+conexões TCP abertas quando cada sessão faz uma chamada ao LLM (contra um
+servidor local compatível com a API da OpenAI).
+"""
+
+import argparse
+import time
+
+import streamlit as st
+from langchain.agents import AgentExecutor, create_tool_calling_agent
+from langchain_openai import ChatOpenAI
+
+from agents.eda_agent import AGENT_PROMPT, create_eda_agent
+from benchmarks.mock_openai import MockOpenAIServer
+from config.settings import settings
+from tools import ALL_TOOLS
+from utils.llm_fallback import llm_fallback_manager
+from utils.llm_pool import llm_client_pool
+from utils.memory import create_memory
+
+
+def _legacy_setup(config: dict) -> AgentExecutor:
+    """Reproduz a construção anterior: tudo novo a cada sessão."""
+    llm = ChatOpenAI(**config)
+    agent = create_tool_calling_agent(llm, ALL_TOOLS, AGENT_PROMPT)
+    return AgentExecutor(agent=agent, tools=ALL_TOOLS, memory=create_memory(llm), **settings.AGENT_CONFIG)
+
+
+def _run(label: str, server: MockOpenAIServer, setup, sessions: int) -> None:
+    connections_before = server.connections
+    setup_times = []
+    for _ in range(sessions):
+        st.session_state.clear()
+        started = time.perf_counter()
+        executor = setup()
+        setup_times.append(time.perf_counter() - started)
+        executor.agent.runnable.invoke({"input": "oi", "chat_history": [], "intermediate_steps": []})
+    first = setup_times[0]
+    setup_times.sort()
+    print(f"{label:<10} configuração: primeira {first * 1000:7.1f} ms, "
+          f"mediana {setup_times[len(setup_times) // 2] * 1000:7.1f} ms   "
+          f"conexões TCP: {server.connections - connections_before}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=20)
+    args = parser.parse_args()
+
+    with MockOpenAIServer() as server:
+        config = {"model_name": "mock", "base_url": server.base_url, "api_key": "local", "temperature": 0.1}
+        provider = {"name": "Mock", "config": config}
+        llm_fallback_manager.get_llm = lambda force_provider=None: llm_fallback_manager._create_llm(provider)
+
+        print(f"{args.sessions} sessões, uma chamada ao LLM por sessão\n")
+        _run("anterior", server, lambda: _legacy_setup(config), args.sessions)
+        _run("pool", server, create_eda_agent, args.sessions)
+        print(f"\npool: {llm_client_pool.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
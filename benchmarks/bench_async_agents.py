@@ -0,0 +1,101 @@
+"""
+Teste de carga das execuções do agente contra um LLM local simulado.
+
+Dispara N perguntas simultâneas (uma por sessão simulada), com o servidor
+local respondendo após uma latência fixa, e compara:
+
+- síncrono: uma thread bloqueada em `invoke` por pergunta;
+- assíncrono: todas as perguntas em andamento no event loop compartilhado.
+
+Reporta o tempo total, a vazão e o pico de threads do processo, e verifica o
+cancelamento por timeout.
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain.agents import AgentExecutor
+
+from agents.eda_agent import EXECUTOR_TOOLS, _build_agent
+from benchmarks.mock_openai import MockOpenAIServer
+from config.settings_alternatives import alternative_settings
+from utils.async_runner import async_agent_runner
+from utils.llm_pool import LLMClientPool
+
+
+def _client_threads() -> int:
+    """Threads do processo, sem contar as do servidor simulado."""
+    return sum('process_request_thread' not in thread.name for thread in threading.enumerate())
+
+
+class _ThreadSampler:
+    """Amostra o número de threads do cliente enquanto o bloco executa."""
+
+    def __enter__(self):
+        self.peak = _client_threads()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(0.01):
+            self.peak = max(self.peak, _client_threads())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def _executor(llm) -> AgentExecutor:
+    return AgentExecutor(agent=_build_agent(llm), tools=EXECUTOR_TOOLS, max_iterations=3)
+
+
+def _report(label: str, n: int, elapsed: float, sampler: _ThreadSampler) -> None:
+    print(f"{label:<11} {n} perguntas em {elapsed:6.2f} s  "
+          f"({n / elapsed:6.1f} perguntas/s)  pico de threads: {sampler.peak}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--sync-threads", type=int, default=16,
+                        help="Threads do servidor disponíveis para o modo síncrono")
+    args = parser.parse_args()
+
+    with MockOpenAIServer(latency=args.latency, content="Resposta simulada") as server:
+        config = {"model_name": "mock", "base_url": server.base_url, "api_key": "local",
+                  "streaming": False, "max_retries": 0}
+        # Pool HTTP dimensionado para a carga, para que o limite seja o modo de execução
+        pool_config = {**alternative_settings.CLIENT_POOL_CONFIG,
+                       "max_connections": args.requests, "max_keepalive_connections": args.requests}
+        llm = LLMClientPool(pool_config).get_llm("Mock", config)
+        inputs = {"input": "Quais os tipos de dados?", "chat_history": []}
+        print(f"Latência simulada do LLM: {args.latency:.1f} s\n")
+
+        with _ThreadSampler() as sampler, ThreadPoolExecutor(args.sync_threads) as pool:
+            started = time.perf_counter()
+            list(pool.map(lambda _: _executor(llm).invoke(inputs), range(args.requests)))
+            _report("síncrono", args.requests, time.perf_counter() - started, sampler)
+
+        with _ThreadSampler() as sampler:
+            started = time.perf_counter()
+            futures = [async_agent_runner.submit(_executor(llm), inputs) for _ in range(args.requests)]
+            for future in futures:
+                future.result()
+            _report("assíncrono", args.requests, time.perf_counter() - started, sampler)
+
+        future = async_agent_runner.submit(_executor(llm), inputs, timeout=args.latency / 2)
+        try:
+            future.result()
+            print("\ntimeout: NÃO cancelado")
+        except TimeoutError:
+            print(f"\ntimeout: execução cancelada após {args.latency / 2:.1f} s "
+                  f"(em andamento no loop: {async_agent_runner.in_flight})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Acerto e latência da resolução aproximada de nomes de colunas em datasets largos.
+
+Cada referência rotulada (como um usuário ou o LLM escreveria) é resolvida pela
+regra anterior do agente offline (nome em minúsculas, ou com `_`/`-` como
+espaço, contido no texto) e pelo índice de colunas (`ColumnIndex.resolve`).
+As colunas reais ficam misturadas a milhares de colunas sintéticas.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from utils.column_index import ColumnIndex
+
+COLUMNS = [
+    'transaction_amount', 'customer_age', 'TransactionDate', 'is_fraud', 'merchantCategory',
+    'país_origem', 'numeroDeParcelas', 'account_balance', 'Time', 'V1', 'V10', 'annual-income'
+]
+
+# (referência, coluna esperada ou None quando não deve resolver)
+REFERENCES = [
+    ("transaction_amount", "transaction_amount"),
+    ("Transaction Amount", "transaction_amount"),
+    ("valor da transação", "transaction_amount"),
+    ("idade do cliente", "customer_age"),
+    ("idade", "customer_age"),
+    ("data da transação", "TransactionDate"),
+    ("transaction date", "TransactionDate"),
+    ("fraude", "is_fraud"),
+    ("categoria do comerciante", "merchantCategory"),
+    ("merchant category", "merchantCategory"),
+    ("pais de origem", "país_origem"),
+    ("número de parcelas", "numeroDeParcelas"),
+    ("saldo da conta", "account_balance"),
+    ("balance", "account_balance"),
+    ("renda anual", "annual-income"),
+    ("annual income", "annual-income"),
+    ("tempo", "Time"),
+    ("v10", "V10"),
+    ("V1", "V1"),
+    ("feature 1234", "feature_1234"),
+    ("sensor 17", "sensor-17"),
+    ("xyz", None),
+    ("feature", None),
+    ("estatísticas descritivas", None),
+]
+
+
+def _legacy_resolve(reference: str, columns) -> str:
+    """Regra anterior: primeira coluna contida no texto (exata ou com separadores como espaço)."""
+    text = reference.lower()
+    for col in columns:
+        if col.lower() in text or col.replace('_', ' ').replace('-', ' ').lower() in text:
+            return col
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--columns", type=int, default=5_000, help="Total de colunas (reais + sintéticas)")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    synthetic = args.columns - len(COLUMNS)
+    columns = COLUMNS + [f'feature_{i}' for i in range(synthetic // 2)] + \
+        [f'sensor-{i}' for i in range(synthetic - synthetic // 2)]
+
+    started = time.perf_counter()
+    index = ColumnIndex(columns)
+    print(f"{len(columns):,} colunas; construção do índice: {(time.perf_counter() - started) * 1000:.0f} ms\n")
+
+    legacy_hits = index_hits = 0
+    latencies = []
+    print(f"{'referência':<28} {'regra anterior':<20} {'índice':<20}")
+    for reference, expected in REFERENCES:
+        legacy = _legacy_resolve(reference, columns)
+        index._similar_cache.clear()
+        started = time.perf_counter()
+        resolved = index.resolve(reference)
+        latencies.append(time.perf_counter() - started)
+        for _ in range(args.repeat - 1):
+            index._similar_cache.clear()
+            started = time.perf_counter()
+            index.resolve(reference)
+            latencies.append(time.perf_counter() - started)
+        legacy_hits += legacy == expected
+        index_hits += resolved == expected
+        mark = "" if resolved == expected else "  <- erro"
+        print(f"{reference:<28} {str(legacy):<20} {str(resolved):<20}{mark}")
+
+    latencies = np.array(latencies) * 1000
+    print(f"\nacertos: regra anterior {legacy_hits}/{len(REFERENCES)}, índice {index_hits}/{len(REFERENCES)}")
+    print(f"latência do índice (sem cache de palavras): mediana {np.median(latencies):.3f} ms, "
+          f"p99 {np.percentile(latencies, 99):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
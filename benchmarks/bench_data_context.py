@@ -0,0 +1,85 @@
+"""
+Ferramentas sem Streamlit: vários datasets analisados em paralelo com `DataContext`.
+
+Cada "sessão" tem o próprio dataset e executa as mesmas chamadas de ferramentas,
+primeiro em sequência e depois em um pool de threads, cada tarefa com o seu
+contexto ativo (`use_data_context`), sem `st.session_state`. Confere se as
+saídas em paralelo são idênticas às sequenciais (nenhuma sessão enxerga os
+dados de outra) e mede o custo de obter o contexto em cada chamada.
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from tools import get_data_description, get_descriptive_statistics, plot_boxplot, plot_histogram
+from tools.context import DataContext, current_data_context, use_data_context
+from utils.dataset_cache import dataset_cache
+
+CALLS = [
+    (get_data_description, {}),
+    (get_descriptive_statistics, {}),
+    (get_descriptive_statistics, {"column": "Amount"}),
+    (plot_histogram, {"column": "V1"}),
+    (plot_boxplot, {"column": "Amount"}),
+]
+
+
+def _dataset(seed: int, rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    data = {f'V{i}': rng.normal(seed, 1 + i % 3, rows) for i in range(1, 11)}
+    data['Amount'] = rng.exponential(50 + seed, rows).round(2)
+    return pd.DataFrame(data)
+
+
+def _run_session(context: DataContext) -> list:
+    """Executa as chamadas com o contexto da sessão; figuras viram o título (comparável)."""
+    outputs = []
+    with use_data_context(context):
+        for tool, args in CALLS:
+            result = tool.invoke(args)
+            outputs.append(result if isinstance(result, str) else result.layout.title.text)
+    return outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    contexts = [DataContext(df=_dataset(seed, args.rows)) for seed in range(args.sessions)]
+
+    dataset_cache.invalidate()
+    started = time.perf_counter()
+    sequential = [_run_session(context) for context in contexts]
+    sequential_seconds = time.perf_counter() - started
+
+    dataset_cache.invalidate()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        parallel = list(pool.map(_run_session, contexts))
+    parallel_seconds = time.perf_counter() - started
+
+    mismatches = sum(a != b for seq, par in zip(sequential, parallel) for a, b in zip(seq, par))
+    calls = args.sessions * len(CALLS)
+    print(f"{args.sessions} sessões × {len(CALLS)} chamadas, {args.rows:,} linhas cada (sem Streamlit)\n")
+    print(f"sequencial           {sequential_seconds:>6.2f} s")
+    print(f"pool de {args.workers} threads     {parallel_seconds:>6.2f} s")
+    print(f"saídas divergentes:  {mismatches}/{calls}")
+
+    repeat = 100_000
+    with use_data_context(contexts[0]):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            current_data_context()
+        active = (time.perf_counter() - started) / repeat
+    print(f"\nobter o contexto por chamada: {active * 1e6:.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark do hedging entre providers com latência de cauda pesada.
+
+Dois servidores locais simulam providers gratuitos: a maioria das respostas é
+rápida, mas uma fração demora muito mais. Compara p50/p95/p99 das chamadas só
+ao provider principal com as chamadas via `HedgedChatModel`, e reporta a fração
+de requisições duplicadas.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import numpy as np
+
+from benchmarks.mock_openai import MockOpenAIServer
+from config.settings_alternatives import alternative_settings
+from utils.llm_pool import LLMClientPool
+from utils.llm_wrappers import HedgedChatModel, hedge_stats
+from utils.provider_metrics import provider_metrics
+
+
+def _heavy_tail(median: float, tail_fraction: float, tail_latency: float, seed: int):
+    rng = random.Random(seed)
+
+    def latency():
+        if rng.random() < tail_fraction:
+            return tail_latency * rng.uniform(0.8, 1.2)
+        return median * rng.lognormvariate(0, 0.3)
+    return latency
+
+
+async def _run(model, n: int, concurrency: int) -> np.ndarray:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await model.ainvoke("Resuma os dados")
+            return time.perf_counter() - started
+
+    return np.array(await asyncio.gather(*(one() for _ in range(n))))
+
+
+def _report(label: str, latencies: np.ndarray) -> tuple:
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"{label:<14} p50 {p50:5.2f}s  p95 {p95:5.2f}s  p99 {p99:5.2f}s  máx {latencies.max():5.2f}s")
+    return p95, p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--median", type=float, default=0.2)
+    parser.add_argument("--tail-fraction", type=float, default=0.04)
+    parser.add_argument("--tail-latency", type=float, default=5.0)
+    args = parser.parse_args()
+
+    latency = dict(median=args.median, tail_fraction=args.tail_fraction, tail_latency=args.tail_latency)
+    with MockOpenAIServer(latency=_heavy_tail(seed=1, **latency)) as primary_server, \
+            MockOpenAIServer(latency=_heavy_tail(seed=2, **latency)) as backup_server:
+        pool = LLMClientPool({**alternative_settings.CLIENT_POOL_CONFIG, "max_connections": 100})
+        llms = []
+        for name, server in (("Principal", primary_server), ("Reserva", backup_server)):
+            llms.append(pool.get_llm(name, {
+                "model_name": "mock", "base_url": server.base_url, "api_key": "local",
+                "streaming": False, "max_retries": 0, "callbacks": [provider_metrics.handler(name)]
+            }))
+
+        print(f"{args.requests} requisições, {args.tail_fraction:.0%} com ~{args.tail_latency:.0f}s "
+              f"(mediana {args.median:.1f}s)\n")
+        hedged = HedgedChatModel(llms, ["Principal", "Reserva"])
+
+        async def compare():
+            # Um único event loop: o cliente HTTP assíncrono do pool fica associado a ele
+            baseline = await _run(llms[0], args.requests, args.concurrency)
+            print(f"prazo do hedge (p95 do principal): {hedged.deadline():.2f}s")
+            return baseline, await _run(hedged, args.requests, args.concurrency)
+
+        baseline, with_hedging = asyncio.run(compare())
+        base_p95, base_p99 = _report("sem hedging", baseline)
+        p95, p99 = _report("com hedging", with_hedging)
+
+        stats = hedge_stats.get_stats()
+        print(f"\nduplicadas: {stats['hedged']} ({stats['hedge_rate']:.0%}), vencidas pelo reserva: "
+              f"{stats['backup_wins']}, negadas pelo orçamento: {stats['denied']}")
+        print(f"cauda economizada: p95 {base_p95 - p95:+.2f}s, p99 {base_p99 - p99:+.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Tempo de casamento de palavras-chave e colunas por pergunta em um dataset largo.
+
+Compara a varredura anterior do agente offline (um teste `in` por palavra-chave
+e por coluna, repetido na identificação da ferramenta e na extração de
+parâmetros) com uma única passada do matcher Aho–Corasick compilado para o
+dataset. Reporta também o tempo de compilação, pago uma vez no carregamento.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from agents.matcher import QueryMatcher
+from agents.offline_agent import INTENT_KEYWORDS, offline_agent
+
+QUERIES = [
+    "Mostre o histograma de feature_2321",
+    "boxplot da coluna sensor 17",
+    "Estatísticas descritivas de todas as colunas",
+    "Gráfico de dispersão entre feature_10 e feature_2400",
+    "Qual a média de amount?",
+    "Existem outliers nos dados?",
+]
+
+
+def _columns(n: int) -> list:
+    names = ['Time', 'amount', 'Class']
+    names += [f'feature_{i}' for i in range(n // 2)]
+    names += [f'sensor-{i}' for i in range(n - len(names))]
+    return names
+
+
+def _legacy_scan(query: str, columns) -> tuple:
+    """Varredura anterior: cada grupo de palavras e cada coluna testados com `in`."""
+    query_lower = query.lower()
+    keywords = {word for words in INTENT_KEYWORDS.values() for word in words
+                if word in query_lower}
+    keywords.update(k for k in offline_agent.keyword_tool_mapping if k in query_lower)
+    found = None
+    # `identify_tool` e `extract_parameters` repetiam a varredura das colunas
+    for _ in range(2):
+        for col in columns:
+            if col.lower() in query_lower or col.replace('_', ' ').replace('-', ' ').lower() in query_lower:
+                found = col
+                break
+    return keywords, found
+
+
+def _timeit(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--columns", type=int, default=5_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    columns = _columns(args.columns)
+    df = pd.DataFrame(np.zeros((1, len(columns))), columns=columns)
+
+    started = time.perf_counter()
+    matcher = QueryMatcher(offline_agent.match_keywords, df.columns)
+    build = time.perf_counter() - started
+    print(f"{len(columns):,} colunas; compilação do matcher: {build * 1000:.0f} ms (uma vez por dataset)\n")
+
+    print(f"{'pergunta':<56} {'varredura':>10} {'matcher':>9} {'ganho':>7}  coluna (varredura -> matcher)")
+    for query in QUERIES:
+        legacy = _timeit(lambda: _legacy_scan(query, columns), args.repeat)
+        compiled = _timeit(lambda: matcher.scan(query), args.repeat)
+        # A varredura pára na primeira coluna contida na pergunta (ex.: feature_2 em feature_2321)
+        legacy_column = _legacy_scan(query, columns)[1]
+        print(f"{query:<56} {legacy * 1000:>8.2f}ms {compiled * 1000:>7.3f}ms {legacy / compiled:>6.0f}x  "
+              f"{legacy_column} -> {matcher.scan(query).columns()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Tokens do histórico enviado ao LLM ao longo de uma sessão longa.
+
+Simula uma conversa em que parte das respostas traz tabelas grandes (como as
+saídas de estatísticas) e compara, a cada turno, o tamanho do `chat_history`
+carregado da memória por janela (últimas K interações) e da memória limitada
+por tokens (`TokenBudgetMemory`).
+"""
+
+import argparse
+import random
+
+from langchain.memory import ConversationBufferWindowMemory
+
+from config.settings import settings
+from tools.formatting import estimate_tokens
+from utils.memory import TokenBudgetMemory
+
+
+def _answer(rng: random.Random, turn: int) -> str:
+    """Resposta curta, média ou com uma tabela markdown longa."""
+    text = (f"A coluna V{turn % 28 + 1} tem média próxima de zero e desvio padrão "
+            f"{rng.uniform(0.5, 2):.2f}; há {rng.randint(0, 900)} outliers pelo critério IQR.")
+    kind = rng.random()
+    if kind < 0.3:
+        rows = "\n".join(f"| V{i} | {rng.gauss(0, 1):.4f} | {rng.uniform(0.5, 2):.4f} | {rng.uniform(-50, -1):.4f} "
+                         f"| {rng.uniform(1, 50):.4f} |" for i in range(1, rng.randint(20, 60)))
+        text += "\n\n| coluna | média | dp | mín | máx |\n|---|---|---|---|---|\n" + rows
+    elif kind < 0.6:
+        text += " " + " ".join(f"Observação {i}: a distribuição é assimétrica à direita." for i in range(8))
+    return text
+
+
+def _history_tokens(memory) -> int:
+    messages = memory.load_memory_variables({"input": ""})["chat_history"]
+    return sum(estimate_tokens(str(message.content)) for message in messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=60)
+    args = parser.parse_args()
+
+    config = settings.MEMORY_CONFIG
+    window = ConversationBufferWindowMemory(k=config["window_size"], return_messages=True,
+                                            memory_key="chat_history", output_key="output")
+    budget = TokenBudgetMemory(max_tokens=config["max_tokens"], summary_max_tokens=config["summary_max_tokens"],
+                               max_message_tokens=config["max_message_tokens"], return_messages=True,
+                               memory_key="chat_history", output_key="output")
+
+    rng = random.Random(0)
+    print(f"{'turno':>5} {'janela (k=' + str(config['window_size']) + ')':>16} {'orçamento':>10}")
+    window_total = budget_total = window_max = budget_max = 0
+    for turn in range(1, args.turns + 1):
+        # Tokens do histórico no prompt desta pergunta (antes de salvar a resposta)
+        window_tokens, budget_tokens = _history_tokens(window), _history_tokens(budget)
+        window_total += window_tokens
+        budget_total += budget_tokens
+        window_max, budget_max = max(window_max, window_tokens), max(budget_max, budget_tokens)
+        if turn in (1, 2, 5, 10, 20, 40) or turn == args.turns:
+            print(f"{turn:>5} {window_tokens:>16,} {budget_tokens:>10,}")
+
+        inputs = {"input": f"Analise a coluna V{turn % 28 + 1}"}
+        outputs = {"output": _answer(rng, turn)}
+        window.save_context(inputs, outputs)
+        budget.save_context(inputs, outputs)
+
+    print(f"\nmédia por turno: janela {window_total / args.turns:,.0f} tokens, "
+          f"orçamento {budget_total / args.turns:,.0f} tokens; máximo: janela {window_max:,}, "
+          f"orçamento {budget_max:,} "
+          f"({len(budget.references)} respostas guardadas por referência)")
+
+
+if __name__ == "__main__":
+    main()
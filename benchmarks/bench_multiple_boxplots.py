@@ -0,0 +1,67 @@
+"""
+Benchmark de memória de pico e tempo de plot_multiple_boxplots.
+
+Compara a normalização antiga (StandardScaler materializando uma cópia float64
+de todas as colunas numéricas) com os boxplots derivados dos resumos em cache.
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+
+from tools.visualizations import plot_multiple_boxplots
+from utils.dataset_cache import dataset_cache
+
+
+def _legacy_multiple_boxplots(df: pd.DataFrame) -> go.Figure:
+    """Reproduz a implementação anterior (cópia normalizada + boxplots com todas as linhas)."""
+    from sklearn.preprocessing import StandardScaler
+    numeric_cols = df.select_dtypes(include=[np.number]).columns
+    df_normalized = pd.DataFrame(
+        StandardScaler().fit_transform(df[numeric_cols]),
+        columns=numeric_cols
+    )
+    fig = go.Figure()
+    for col in numeric_cols[:20]:
+        fig.add_trace(go.Box(y=df_normalized[col], name=col, boxpoints='outliers'))
+    return fig
+
+
+def _measure(label: str, func) -> None:
+    tracemalloc.start()
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} tempo: {elapsed:8.2f} s   pico de memória: {peak / 1024**2:10.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--cols", type=int, default=40)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame(
+        rng.standard_normal((args.rows, args.cols)),
+        columns=[f"V{i}" for i in range(args.cols)]
+    )
+    st.session_state.df = df
+    print(f"Dataset: {args.rows:,} linhas × {args.cols} colunas "
+          f"({df.memory_usage().sum() / 1024**2:.0f} MB)\n")
+
+    _measure("anterior (StandardScaler)", lambda: _legacy_multiple_boxplots(df))
+    dataset_cache.invalidate(df)
+    _measure("resumos (cache frio)", plot_multiple_boxplots.func)
+    _measure("resumos (cache quente)", plot_multiple_boxplots.func)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark das ferramentas pedidas em um mesmo passo do agente.
+
+Simula um modelo que pede várias ferramentas de uma vez (estatísticas,
+heatmap, boxplots e grid de histogramas) e compara o tempo total do
+AgentExecutor sequencial com o ParallelAgentExecutor, com o cache de
+resultados do dataset frio em cada rodada.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from langchain.agents import AgentExecutor
+from langchain_core.agents import AgentActionMessageLog, AgentFinish
+from langchain_core.runnables import RunnableLambda
+
+from agents.parallel_executor import ParallelAgentExecutor
+from tools import ALL_TOOLS
+from utils.dataset_cache import dataset_cache
+
+TOOL_CALLS = [
+    ("get_descriptive_statistics", {}),
+    ("plot_correlation_heatmap", {}),
+    ("plot_multiple_boxplots", {}),
+    ("plot_histograms_grid", {}),
+]
+
+
+def _plan(inputs: dict):
+    """Pede todas as ferramentas no primeiro passo e encerra no segundo."""
+    if inputs["intermediate_steps"]:
+        tools = [step[0].tool for step in inputs["intermediate_steps"]]
+        return AgentFinish({"output": f"Concluído: {tools}"}, "")
+    return [AgentActionMessageLog(tool=name, tool_input=args, log="", message_log=[])
+            for name, args in TOOL_CALLS]
+
+
+def _measure(label: str, executor_class, df: pd.DataFrame, repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        dataset_cache.invalidate(df)
+        executor = executor_class(agent=RunnableLambda(_plan), tools=ALL_TOOLS,
+                                  return_intermediate_steps=True)
+        started = time.perf_counter()
+        result = executor.invoke({"input": "análise completa"})
+        times.append(time.perf_counter() - started)
+    order = [step[0].tool for step in result["intermediate_steps"]]
+    assert order == [name for name, _ in TOOL_CALLS], order
+    best = min(times)
+    print(f"{label:<12} melhor de {repeats}: {best:6.2f} s")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--cols", type=int, default=30)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame(rng.standard_normal((args.rows, args.cols)),
+                      columns=[f"V{i}" for i in range(args.cols)])
+    st.session_state.df = df
+    print(f"Dataset: {args.rows:,} linhas × {args.cols} colunas; "
+          f"{len(TOOL_CALLS)} ferramentas no mesmo passo\n")
+
+    sequential = _measure("sequencial", AgentExecutor, df, args.repeats)
+    parallel = _measure("paralelo", ParallelAgentExecutor, df, args.repeats)
+    print(f"\nGanho: {sequential / parallel:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
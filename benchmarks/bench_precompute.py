@@ -0,0 +1,73 @@
+"""
+Latência da primeira pergunta com e sem o pré-cálculo em segundo plano.
+
+Para cada ferramenta, mede a primeira chamada com o cache do dataset vazio
+(como logo após o upload, sem pré-cálculo) e depois de o `PrecomputeWorker`
+terminar (o usuário leva alguns segundos lendo o preview e escrevendo a
+pergunta). Reporta também a duração do pré-cálculo.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from tools import (get_descriptive_statistics, plot_correlation_heatmap, plot_histograms_grid,
+                   plot_multiple_boxplots)
+from utils.dataset_cache import dataset_cache
+from utils.precompute import PrecomputeWorker
+
+CALLS = [
+    ("plot_correlation_heatmap", plot_correlation_heatmap, {}),
+    ("plot_multiple_boxplots", plot_multiple_boxplots, {}),
+    ("get_descriptive_statistics", get_descriptive_statistics, {}),
+    ("plot_histograms_grid", plot_histograms_grid, {}),
+]
+
+
+def _dataset(rows: int, columns: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    data = {f'V{i}': rng.normal(size=rows) for i in range(1, columns + 1)}
+    data['Amount'] = rng.exponential(88, rows).round(2)
+    return pd.DataFrame(data)
+
+
+def _first_calls() -> dict:
+    seconds = {}
+    for name, tool, args in CALLS:
+        started = time.perf_counter()
+        tool.invoke(args)
+        seconds[name] = time.perf_counter() - started
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=300_000)
+    parser.add_argument("--columns", type=int, default=60)
+    args = parser.parse_args()
+
+    df = _dataset(args.rows, args.columns)
+    st.session_state.df = df
+
+    dataset_cache.invalidate()
+    cold = _first_calls()
+
+    dataset_cache.invalidate()
+    job = PrecomputeWorker().start("bench", df)
+    while job.running:
+        time.sleep(0.05)
+    warm = _first_calls()
+
+    print(f"Dataset {args.rows:,} linhas × {df.shape[1]} colunas; pré-cálculo: "
+          f"{job.elapsed:.1f}s em segundo plano ({job.total} tarefas)\n")
+    print(f"{'primeira chamada':<28} {'sem pré-cálculo':>16} {'com pré-cálculo':>16}")
+    for name, _, _ in CALLS:
+        print(f"{name:<28} {cold[name] * 1000:>14.0f}ms {warm[name] * 1000:>14.0f}ms")
+    print(f"{'total':<28} {sum(cold.values()) * 1000:>14.0f}ms {sum(warm.values()) * 1000:>14.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
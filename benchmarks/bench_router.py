@@ -0,0 +1,113 @@
+"""
+Precisão do roteador e latência economizada em um conjunto rotulado de perguntas.
+
+Cada pergunta tem a ferramenta esperada (com parâmetros) quando pode ser
+respondida diretamente, ou None quando deve seguir para o LLM (pergunta aberta,
+ambígua ou com várias partes). Reporta a precisão das respostas diretas, a
+cobertura, as perguntas simples que foram ao LLM e o tempo economizado,
+estimado com a latência de uma execução do agente LLM (`--llm-seconds`).
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from agents.router import QueryRouter
+from config.settings import settings
+
+# (pergunta, ferramenta esperada ou None para o LLM, parâmetros esperados)
+LABELLED_QUERIES = [
+    ("Mostre o histograma de Amount", "plot_histogram", {"column": "Amount"}),
+    ("histograma da coluna Time", "plot_histogram", {"column": "Time"}),
+    ("Qual a distribuição de V1?", "plot_histogram", {"column": "V1"}),
+    ("Histogramas de todas as colunas", "plot_histograms_grid", {}),
+    ("ECDF das variáveis numéricas", "plot_histograms_grid", {"kind": "ecdf"}),
+    ("Boxplot de Amount", "plot_boxplot", {"column": "Amount"}),
+    ("Mostre o boxplot da coluna V10", "plot_boxplot", {"column": "V10"}),
+    ("Boxplots de todas as colunas", "plot_multiple_boxplots", {}),
+    ("Existem outliers nos dados?", "plot_multiple_boxplots", {}),
+    ("Matriz de correlação", "plot_correlation_heatmap", {}),
+    ("Mostre o heatmap de correlação", "plot_correlation_heatmap", {}),
+    ("Gráfico de dispersão entre V1 e V2", "plot_scatter", {"x_column": "V1", "y_column": "V2"}),
+    ("scatter Amount versus Time", "plot_scatter", {"x_column": "Amount", "y_column": "Time"}),
+    ("Estatísticas descritivas", "get_descriptive_statistics", {}),
+    ("Estatísticas da coluna Amount", "get_descriptive_statistics", {"column": "Amount"}),
+    ("Qual a média de V3?", "get_descriptive_statistics", {"column": "V3"}),
+    ("Mediana e desvio padrão de todas as colunas", "get_descriptive_statistics", {}),
+    ("Visão geral dos dados", "get_data_description", {}),
+    ("Quais os tipos de dados?", "get_data_description", {}),
+    ("Quantos valores nulos existem?", "get_data_description", {}),
+    # Perguntas que devem seguir para o LLM
+    ("Por que a coluna Amount tem tantos outliers?", None, {}),
+    ("Explique a correlação entre V1 e V2", None, {}),
+    ("Quais são as conclusões da análise?", None, {}),
+    ("Monte um plano de ação para reduzir fraudes", None, {}),
+    ("Compare a distribuição de Amount entre fraudes e não fraudes", None, {}),
+    ("Mostre o histograma de Amount e depois o boxplot de Time", None, {}),
+    ("O que você acha desses dados?", None, {}),
+    ("Quais variáveis mais influenciam a classe de fraude?", None, {}),
+    ("Há algum padrão temporal nas transações?", None, {}),
+    ("Qual modelo de machine learning devo usar?", None, {}),
+    ("Analise os dados", None, {}),
+    ("Mostre a distribuição", None, {}),
+]
+
+
+def _dataset(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    data = {'Time': np.sort(rng.uniform(0, 172_800, rows))}
+    data.update({f'V{i}': rng.normal(size=rows) for i in range(1, 29)})
+    data['Amount'] = rng.exponential(88, rows).round(2)
+    data['Class'] = (rng.random(rows) < 0.002).astype(int)
+    return pd.DataFrame(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--llm-seconds", type=float, default=8.0,
+                        help="Latência estimada de uma execução do agente LLM (duas chamadas + ferramenta)")
+    parser.add_argument("--min-confidence", type=float, default=settings.ROUTER_CONFIG["min_confidence"])
+    args = parser.parse_args()
+
+    st.session_state.df = _dataset(args.rows)
+    router = QueryRouter({**settings.ROUTER_CONFIG, "min_confidence": args.min_confidence})
+
+    routed = correct = missed_simple = 0
+    routed_seconds = []
+    for query, expected_tool, expected_params in LABELLED_QUERIES:
+        decision = router.classify(query, st.session_state.df)
+        goes_direct = decision['confidence'] >= args.min_confidence
+        status = "LLM"
+        if goes_direct:
+            routed += 1
+            started = time.perf_counter()
+            router.route(query)
+            routed_seconds.append(time.perf_counter() - started)
+            params_ok = all(decision['params'].get(k) == v for k, v in expected_params.items())
+            if decision['tool'] == expected_tool and params_ok:
+                correct += 1
+                status = "ok"
+            else:
+                status = "ERRO"
+        elif expected_tool is not None:
+            missed_simple += 1
+            status = "LLM (simples)"
+        print(f"{status:<14} {decision['confidence']:.1f} {str(decision['tool']):<28} {query}")
+
+    simple = sum(tool is not None for _, tool, _ in LABELLED_QUERIES)
+    print(f"\nrespondidas diretamente: {routed}/{len(LABELLED_QUERIES)}  precisão: {correct / max(routed, 1):.0%}  "
+          f"cobertura das simples: {correct}/{simple}  simples enviadas ao LLM: {missed_simple}")
+    if routed_seconds:
+        saved = routed * args.llm_seconds - sum(routed_seconds)
+        print(f"tempo da resposta direta: mediana {np.median(routed_seconds) * 1000:.0f} ms, "
+              f"máx {max(routed_seconds) * 1000:.0f} ms")
+        print(f"latência economizada: ~{saved:.0f} s em {len(LABELLED_QUERIES)} perguntas "
+              f"(~{args.llm_seconds:.0f} s por execução do agente LLM)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark do cache de perguntas similares.
+
+Avalia pares rotulados de perguntas (equivalentes ou não) para vários limiares
+de similaridade, reportando a taxa de falsos acertos e o recall, e mede a
+latência de busca com milhares de perguntas indexadas.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from utils.semantic_cache import SemanticQueryIndex, extract_entities, measure_false_hits
+
+COLUMNS = ['Time', 'Amount', 'Class'] + [f'V{i}' for i in range(1, 29)]
+
+# (pergunta em cache, nova pergunta, são equivalentes?)
+LABELED_PAIRS = [
+    ("Mostre a correlação", "qual a correlação entre as variáveis?", True),
+    ("Mostre a matriz de correlação", "gere a matriz de correlação", True),
+    ("Quais os tipos de dados?", "quais são os tipos de dados do dataset", True),
+    ("Mostre o histograma de Amount", "histograma da coluna Amount", True),
+    ("Existem outliers em Amount?", "há outliers na coluna Amount?", True),
+    ("Faça um boxplot de V1", "crie o boxplot de V1", True),
+    ("Qual a distribuição de Class?", "mostre a distribuição da Class", True),
+    ("Quais as conclusões?", "quais conclusões você tirou?", True),
+    ("Estatísticas descritivas", "mostre as estatísticas descritivas", True),
+    ("Mostre o histograma de Amount", "mostre o boxplot de Amount", False),
+    ("Faça um boxplot de V1", "faça um boxplot de V2", False),
+    ("Mostre a correlação entre V1 e V2", "mostre a correlação entre V1 e V3", False),
+    ("Existem outliers em Amount?", "existem valores ausentes em Amount?", False),
+    ("Mostre a correlação", "mostre a distribuição", False),
+    ("Quais os tipos de dados?", "quais os valores ausentes?", False),
+    ("Mostre os 10 maiores valores de Amount", "mostre os 20 maiores valores de Amount", False),
+    ("Dispersão entre Time e Amount", "dispersão entre Time e Class", False),
+    ("Qual a média de Amount?", "qual a mediana de Amount?", False),
+]
+
+_TEMPLATES = [
+    "mostre o histograma de {col}", "existem outliers em {col}", "boxplot de {col}",
+    "qual a média de {col}", "dispersão entre {col} e {other}", "tendência de {col} no tempo"
+]
+
+
+def _latency(n_entries: int, n_queries: int = 500) -> None:
+    rng = np.random.default_rng(0)
+    index = SemanticQueryIndex()
+    for i in range(n_entries):
+        text = _TEMPLATES[i % len(_TEMPLATES)].format(
+            col=COLUMNS[rng.integers(len(COLUMNS))], other=COLUMNS[rng.integers(len(COLUMNS))]
+        ) + f" variante {i}"
+        index.add(i, text, 'p', extract_entities(text, COLUMNS))
+    started = time.perf_counter()
+    for i in range(n_queries):
+        text = _TEMPLATES[i % len(_TEMPLATES)].format(col=COLUMNS[i % len(COLUMNS)], other='Amount')
+        index.query(text, 'p', extract_entities(text, COLUMNS))
+    elapsed = (time.perf_counter() - started) / n_queries
+    print(f"{n_entries:>8,} entradas: {elapsed * 1000:.2f} ms por busca")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--thresholds", type=float, nargs='+', default=[0.6, 0.7, 0.8, 0.9])
+    parser.add_argument("--entries", type=int, nargs='+', default=[1_000, 5_000, 20_000])
+    args = parser.parse_args()
+
+    print(f"{len(LABELED_PAIRS)} pares rotulados "
+          f"({sum(p[2] for p in LABELED_PAIRS)} equivalentes)\n")
+    for threshold in args.thresholds:
+        result = measure_false_hits(LABELED_PAIRS, threshold, COLUMNS)
+        print(f"limiar {threshold:.2f}: acertos {result['hits']:2d}  "
+              f"falsos {result['false_hits']:2d} ({result['false_hit_rate']:.0%})  "
+              f"recall {result['recall']:.0%}")
+
+    print()
+    for n_entries in args.entries:
+        _latency(n_entries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Acerto e latência da execução especulativa em sessões típicas de perguntas.
+
+Cada sessão é uma sequência de perguntas respondidas diretamente pelas
+ferramentas (roteador). Entre uma pergunta e outra, o usuário "lê" a resposta
+por `--think-seconds`, tempo em que o agendador especula as próximas chamadas.
+Compara a latência das perguntas seguintes com e sem especulação e reporta a
+taxa de acerto, o trabalho desperdiçado e o tempo de CPU gasto.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from agents.router import QueryRouter
+from config.settings import settings
+from utils.dataset_cache import dataset_cache
+from utils.precompute import PrecomputeWorker
+from utils.speculation import speculative_scheduler
+
+SESSIONS = [
+    ["Mostre o histograma de Amount", "Boxplot de Amount", "Estatísticas da coluna Amount"],
+    ["Qual a média de V3?", "histograma da coluna V3", "Mostre o boxplot da coluna V3"],
+    ["Matriz de correlação", "Gráfico de dispersão entre V2 e V7"],
+    ["Visão geral dos dados", "Estatísticas descritivas", "Histogramas de todas as colunas"],
+    ["Boxplot de V10", "Qual a distribuição de V10?", "Gráfico de dispersão entre V10 e V4"],
+]
+
+
+def _dataset(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    data = {'Time': np.sort(rng.uniform(0, 172_800, rows))}
+    base = rng.normal(size=rows)
+    data.update({f'V{i}': base * (i % 3) + rng.normal(size=rows) for i in range(1, 29)})
+    data['Amount'] = rng.exponential(88, rows).round(2)
+    data['Class'] = (rng.random(rows) < 0.002).astype(int)
+    return pd.DataFrame(data)
+
+
+def _run_sessions(router: QueryRouter, scheduler, think_seconds: float) -> list:
+    """Latência das perguntas seguintes (a primeira de cada sessão não é especulável)."""
+    latencies = []
+    for session in SESSIONS:
+        for position, query in enumerate(session):
+            scheduler.cancel_pending("bench")
+            started = time.perf_counter()
+            result = router.route(query)
+            elapsed = time.perf_counter() - started
+            if position:
+                latencies.append(elapsed)
+            if result is not None and scheduler.enabled:
+                decision = result['routed_by']
+                scheduler.schedule("bench", st.session_state.df, decision['tool'], decision['params'],
+                                   compact=False)
+            time.sleep(think_seconds)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=300_000)
+    parser.add_argument("--think-seconds", type=float, default=2.0,
+                        help="Tempo de leitura da resposta antes da próxima pergunta")
+    args = parser.parse_args()
+
+    st.session_state.df = _dataset(args.rows)
+    router = QueryRouter({**settings.ROUTER_CONFIG, "enabled": True})
+
+    results = {}
+    for label, enabled in (("sem especulação", False), ("com especulação", True)):
+        dataset_cache.invalidate()
+        # Cache do dataset aquecido como após o upload, para isolar o ganho da especulação
+        job = PrecomputeWorker().start("bench", st.session_state.df)
+        while job.running:
+            time.sleep(0.05)
+        speculative_scheduler.config = {**settings.SPECULATION_CONFIG, "enabled": enabled}
+        results[label] = _run_sessions(router, speculative_scheduler, args.think_seconds)
+
+    print(f"Dataset {len(st.session_state.df):,} linhas; {sum(len(s) - 1 for s in SESSIONS)} perguntas seguintes\n")
+    for label, latencies in results.items():
+        print(f"{label:<18} mediana {np.median(latencies) * 1000:>6.0f} ms  "
+              f"p90 {np.percentile(latencies, 90) * 1000:>6.0f} ms  total {sum(latencies):>5.1f} s")
+
+    stats = speculative_scheduler.get_stats()
+    print(f"\nespeculadas: {stats['completed']} (agendadas {stats['scheduled']}, "
+          f"fora do orçamento {stats['skipped_budget']}, canceladas {stats['cancelled']})")
+    print(f"acertos: {stats['hits']} ({stats['hit_rate']:.0%} das especuladas)  "
+          f"descartadas: {stats['wasted']}  ainda guardadas: {stats['pending_results']}")
+    unused = stats['compute_seconds'] - stats['saved_seconds'] - stats['wasted_seconds']
+    print(f"CPU especulativa: {stats['compute_seconds']:.1f}s; poupado {stats['saved_seconds']:.1f}s; "
+          f"desperdiçado {stats['wasted_seconds']:.1f}s (+{unused:.1f}s ainda sem uso)")
+
+
+if __name__ == "__main__":
+    main()
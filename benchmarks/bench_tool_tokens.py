@@ -0,0 +1,62 @@
+"""
+Tokens das saídas das ferramentas de análise enviadas ao LLM.
+
+Compara, para um dataset estreito e um largo, a renderização completa
+(`DataFrame.to_string()`, exibida no modo offline) com a saída compacta
+limitada por `TOOL_OUTPUT_CONFIG["max_tokens"]`. Os tokens são estimados
+por `estimate_tokens` (~4 caracteres por token).
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from tools import get_data_description, get_descriptive_statistics
+from tools.formatting import estimate_tokens, full_detail
+
+
+def _dataset(rows: int, numbered: int, categorical: int, seed: int = 0) -> pd.DataFrame:
+    """Dataset no formato do exemplo de fraudes, com colunas categóricas e nulos extras."""
+    rng = np.random.default_rng(seed)
+    data = {'Time': np.sort(rng.uniform(0, 172_800, rows))}
+    data.update({f'V{i}': rng.normal(size=rows) for i in range(1, numbered + 1)})
+    data['Amount'] = rng.exponential(88, rows).round(2)
+    for i in range(categorical):
+        values = rng.choice([f'c{j}' for j in range(rng.integers(2, 40))], rows).astype(object)
+        values[rng.random(rows) < 0.05 * (i % 3)] = None
+        data[f'cat_{chr(97 + i % 26)}{i // 26}'] = values
+    data['Class'] = (rng.random(rows) < 0.002).astype(int)
+    return pd.DataFrame(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50_000)
+    args = parser.parse_args()
+
+    datasets = {
+        "estreito (31 colunas)": _dataset(args.rows, numbered=28, categorical=0),
+        "largo (320 colunas)": _dataset(args.rows, numbered=250, categorical=67),
+    }
+    calls = [
+        ("get_data_description", get_data_description, {}),
+        ("get_descriptive_statistics", get_descriptive_statistics, {}),
+        ("get_descriptive_statistics(Amount)", get_descriptive_statistics, {"column": "Amount"}),
+    ]
+
+    for label, df in datasets.items():
+        st.session_state.df = df
+        print(f"\nDataset {label}, {len(df)} linhas")
+        print(f"{'ferramenta':<36} {'completo':>9} {'compacto':>9} {'redução':>8}")
+        for name, tool, tool_args in calls:
+            with full_detail():
+                full = tool.func(**tool_args)
+            compact = tool.invoke(tool_args)
+            full_tokens, compact_tokens = estimate_tokens(full), estimate_tokens(compact)
+            print(f"{name:<36} {full_tokens:>9,} {compact_tokens:>9,} {full_tokens / compact_tokens:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
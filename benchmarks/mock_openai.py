@@ -0,0 +1,122 @@
+"""
+Servidor local compatível com `/chat/completions` da API da OpenAI, para benchmarks.
+
+Responde sempre com a mesma mensagem após uma latência configurável (também em
+streaming SSE, palavra a palavra) e conta as conexões TCP e requisições
+recebidas, permitindo medir reuso de conexões, concorrência e tempo até o
+primeiro token sem acessar a rede.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockOpenAIServer:
+    """Servidor HTTP/1.1 em thread própria; use como context manager."""
+
+    def __init__(self, latency=0.0, content: str = "ok", token_delay: float = 0.0):
+        """
+        Args:
+            latency: Segundos antes de responder, ou função sem argumentos que os sorteia
+            content: Texto da resposta
+            token_delay: Intervalo entre os chunks no modo streaming
+        """
+        self.latency = latency
+        self.content = content
+        self.token_delay = token_delay
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                with server._lock:
+                    server.requests += 1
+                latency = server.latency() if callable(server.latency) else server.latency
+                if latency:
+                    time.sleep(latency)
+                if request.get('stream'):
+                    self._stream()
+                    return
+                body = json.dumps({
+                    "id": "chatcmpl-mock",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": "mock",
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": server.content},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+                }).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self):
+                words = server.content.split(' ')
+                chunks = [{"role": "assistant", "content": ""}]
+                chunks += [{"content": word if i == 0 else ' ' + word} for i, word in enumerate(words)]
+                events = [
+                    b"data: " + json.dumps({
+                        "id": "chatcmpl-mock",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": "mock",
+                        "choices": [{"index": 0, "delta": delta,
+                                     "finish_reason": "stop" if i == len(chunks) - 1 else None}]
+                    }).encode() + b"\n\n"
+                    for i, delta in enumerate(chunks)
+                ] + [b"data: [DONE]\n\n"]
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Content-Length', str(sum(len(event) for event in events)))
+                self.end_headers()
+                for event in events:
+                    self.wfile.write(event)
+                    self.wfile.flush()
+                    if server.token_delay:
+                        time.sleep(server.token_delay)
+
+            def handle_one_request(self):
+                try:
+                    super().handle_one_request()
+                except (BrokenPipeError, ConnectionResetError):
+                    # Cliente cancelou a requisição (ex.: perdedor de um hedge)
+                    self.close_connection = True
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -72,10 +72,25 @@ class Settings:
     
     # Configurações de Memória
     MEMORY_CONFIG: Dict[str, Any] = {
-        "window_size": 10,  # Número de interações para manter em memória
-        "return_messages": True
+        "backend": "token_budget",  # "token_budget" ou "window" (últimas window_size interações)
+        "window_size": 10,  # Número de interações para manter em memória (e recarregadas do histórico)
+        "return_messages": True,
+        "max_tokens": 1500,  # Orçamento do histórico enviado ao LLM (resumo + mensagens recentes)
+        "summary_max_tokens": 300,  # Parte do orçamento para o resumo das interações antigas
+        "max_message_tokens": 300  # Mensagens maiores ficam guardadas por referência
     }
-    
+
+    # Configurações do histórico da sessão (mensagens, chat_history, analysis_history)
+    HISTORY_CONFIG: Dict[str, Any] = {
+        "memory_quota_mb": 32,  # Cota de entradas não comprimidas por sessão
+        "compressed_quota_mb": 64,  # Cota de entradas comprimidas em memória por sessão
+        "min_hot_entries": 6,  # Entradas mais recentes que nunca são comprimidas
+        "compression_level": 6,
+        "decoded_cache_size": 16,  # Entradas recarregadas mantidas em cache
+        "render_recent_messages": 20,  # Mensagens exibidas no chat sem carregar o restante
+        "spill_dir": None  # None = diretório temporário do sistema
+    }
+
     # Configurações do Agente
     AGENT_CONFIG: Dict[str, Any] = {
         "verbose": True,
@@ -86,6 +101,49 @@ class Settings:
         "early_stopping_method": "generate"  # Força o agente a gerar uma resposta final
     }
     
+    # Roteador que responde perguntas simples executando a ferramenta, sem o LLM
+    ROUTER_CONFIG: Dict[str, Any] = {
+        "enabled": True,
+        "min_confidence": 0.8,  # Abaixo disso a pergunta segue para o LLM
+        "max_words": 12,  # Perguntas mais longas tendem a pedir interpretação
+        "tools": [  # Ferramentas que podem ser executadas diretamente
+            "get_data_description", "get_descriptive_statistics", "plot_histogram",
+            "plot_histograms_grid", "plot_boxplot", "plot_multiple_boxplots",
+            "plot_correlation_heatmap", "plot_scatter"
+        ]
+    }
+
+    # Busca aproximada de nomes de colunas (agente offline e validação das ferramentas)
+    COLUMN_INDEX_CONFIG: Dict[str, Any] = {
+        "enabled": True,
+        "ngram_size": 3,  # N-gramas de caracteres de cada palavra do nome
+        "min_similarity": 0.6,  # Similaridade mínima (Dice) entre duas palavras
+        "min_score": 0.4,  # Pontuação mínima de uma coluna candidata
+        "resolve_margin": 0.1,  # Vantagem mínima da melhor candidata para substituir um nome inválido
+        "max_candidates": 5
+    }
+
+    # Execução concorrente das ferramentas pedidas em um mesmo passo do agente
+    PARALLEL_TOOLS_CONFIG: Dict[str, Any] = {
+        "enabled": True,
+        "max_workers": min(4, os.cpu_count() or 1),  # Pool de threads compartilhado pelo processo
+        "sequential_tools": ["generate_insights_and_conclusions"]  # Alteram o estado da sessão
+    }
+    
+    # Execução assíncrona (ainvoke) dos agentes em um event loop compartilhado
+    ASYNC_CONFIG: Dict[str, Any] = {
+        "enabled": True,
+        "timeout": 150,  # Tempo máximo (s) de uma execução antes de cancelá-la
+        "poll_interval": 0.05,  # Intervalo (s) para exibir os eventos de callback no chat
+        "tool_workers": min(8, (os.cpu_count() or 1) + 4)  # Threads para ferramentas síncronas
+    }
+    
+    # Streaming das respostas do LLM para o chat
+    STREAMING_CONFIG: Dict[str, Any] = {
+        "enabled": True,
+        "render_interval": 0.1  # Intervalo mínimo (s) entre atualizações do texto parcial
+    }
+    
     # Configurações da Interface
     UI_CONFIG: Dict[str, Any] = {
         "page_title": "🤖 I2A2 EDA Agent - Análise Exploratória Inteligente",
@@ -99,12 +157,71 @@ class Settings:
         "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     }
     
+    # Cache de resultados derivados dos datasets (compartilhado entre sessões)
+    DATASET_CACHE_CONFIG: Dict[str, Any] = {
+        "max_datasets": 8  # Datasets distintos mantidos no cache do processo
+    }
+
+    # Execução especulativa das ferramentas seguintes prováveis enquanto o usuário lê a resposta
+    SPECULATION_CONFIG: Dict[str, Any] = {
+        "enabled": True,
+        "max_workers": 1,  # Threads dedicadas à especulação
+        "max_tasks": 4,  # Chamadas especuladas por resposta
+        "cpu_budget_seconds": 2.0,  # Tempo de CPU máximo gasto por resposta
+        "ttl_seconds": 600,  # Resultados não usados depois disso contam como desperdício
+        "max_results": 32
+    }
+
+    # Pré-cálculo em segundo plano após o upload (perfil, resumos, correlação, histogramas)
+    PRECOMPUTE_CONFIG: Dict[str, Any] = {
+        "enabled": True,
+        "max_columns": 200,  # Colunas numéricas com resumo e histograma pré-calculados
+        "refresh_seconds": 1.0  # Intervalo de atualização do progresso na barra lateral
+    }
+
+    # Relatórios em lote pela linha de comando (batch_report.py)
+    BATCH_CONFIG: Dict[str, Any] = {
+        "output_dir": "reports",
+        "pattern": "*.csv",
+        "workers": None,  # Processos de trabalho (None = número de CPUs)
+        "top_correlations": 10,  # Pares mais correlacionados listados no relatório
+        "llm_prompt": ("Faça um resumo executivo da análise exploratória deste dataset: "
+                       "qualidade dos dados, distribuições, outliers e correlações relevantes."),
+        "log_level": "WARNING"  # Nível de log nos processos de trabalho
+    }
+
+    # Saída das ferramentas enviada ao LLM (o modo offline exibe a versão completa)
+    TOOL_OUTPUT_CONFIG: Dict[str, Any] = {
+        "compact": True,  # Tabelas compactas em vez de DataFrame.to_string()
+        "max_tokens": 800,  # Orçamento aproximado de tokens por saída de ferramenta
+        "significant_digits": 4,
+        "top_values": 3  # Valores mais frequentes listados para colunas categóricas
+    }
+
+    # Resumo do esquema do dataset incluído no prompt do sistema
+    SCHEMA_DIGEST_CONFIG: Dict[str, Any] = {
+        "enabled": True,
+        "max_tokens": 600  # Limite para datasets muito largos (demais colunas omitidas)
+    }
+
     # Configurações de Visualização
     VISUALIZATION_CONFIG: Dict[str, Any] = {
         "max_columns_boxplot": 20,  # Máximo de colunas para boxplot múltiplo
+        "boxplot_outlier_points": 100,  # Outliers mais extremos de cada lado desenhados por coluna
         "subplot_max_cols": 3,  # Máximo de colunas em subplots
         "default_height": 500,
-        "color_scheme": "#1f77b4"
+        "color_scheme": "#1f77b4",
+        "heatmap_cluster_min_columns": 3,  # Reordenar por clustering hierárquico a partir daqui
+        "heatmap_text_max_columns": 30,  # Acima disso, células sem rótulo de texto
+        "heatmap_max_side": 80,  # Acima disso, células agregadas em blocos
+        "heatmap_cell_px": 18,  # Tamanho aproximado de cada célula em pixels
+        "histogram_bins": 30,
+        "histogram_grid_max_columns": 36,  # Máximo de colunas no grid de histogramas
+        "histogram_grid_cols": 4,  # Gráficos por linha no grid de histogramas
+        "ecdf_points": 200,  # Pontos (quantis) usados em cada ECDF
+        "parallel_workers": min(4, os.cpu_count() or 1),  # Threads para cálculos por coluna
+        "max_figure_bytes": 2_000_000,  # Orçamento de payload por figura (JSON serializado)
+        "degrade_min_points": 1000  # Pontos mínimos mantidos ao reduzir uma figura
     }
 
 # Instância única de configurações
@@ -119,7 +119,8 @@ class AlternativeSettings:
         "enabled": True,
         "ttl": 3600,  # 1 hora em segundos
         "max_size": 100,  # máximo de entradas no cache
-        "cache_similar_queries": True  # agrupar queries similares
+        "cache_similar_queries": True,  # agrupar queries similares
+        "similarity_threshold": 0.8  # similaridade mínima (cosseno TF-IDF) para reaproveitar
     }
     
     # Configuração de rate limiting local
@@ -128,7 +129,44 @@ class AlternativeSettings:
         "requests_per_minute": 10,
         "requests_per_hour": 50,
         "requests_per_day": 200,
-        "cooldown_minutes": 5  # tempo de espera após atingir limite
+        "cooldown_minutes": 5,  # tempo de espera após atingir limite
+        "max_wait_seconds": 20  # espera máxima na fila antes de passar ao próximo provider
+    }
+    
+    # Roteamento entre providers com base nas métricas recentes
+    ROUTING_CONFIG = {
+        "policy": "fastest",  # "fastest", "cheapest", "round_robin" ou "priority" (ordem da lista)
+        "window_size": 50,  # chamadas mantidas por provider
+        "window_seconds": 1800,  # idade máxima das chamadas consideradas
+        "min_samples": 3,  # chamadas necessárias para confiar nas métricas
+        "max_error_rate": 0.5  # acima disso o provider é considerado não saudável
+    }
+    
+    # Hedging: repetir a requisição no próximo provider quando o principal demora
+    HEDGING_CONFIG = {
+        "enabled": False,  # opt-in: duplica parte das requisições
+        "default_deadline_seconds": 20,  # prazo enquanto não há p95 do provider principal
+        "min_deadline_seconds": 3,  # prazo mínimo mesmo com p95 baixo
+        "max_hedge_ratio": 0.1,  # no máximo ~10% das requisições duplicadas
+        "budget_burst": 3  # duplicações acumuláveis
+    }
+    
+    # Novas tentativas e circuit breaker por provider
+    RESILIENCE_CONFIG = {
+        "max_retries": 2,  # novas tentativas para erros transitórios (rede, timeout, 5xx)
+        "backoff_base_seconds": 1.0,  # espera base, dobrada a cada tentativa (com jitter)
+        "backoff_max_seconds": 8.0,
+        "failure_threshold": 3,  # falhas consecutivas que abrem o circuito
+        "recovery_seconds": 60,  # tempo com o circuito aberto antes da chamada de teste
+        "half_open_max_calls": 1  # chamadas de teste simultâneas no estado meio-aberto
+    }
+    
+    # Pool de clientes HTTP compartilhado pelos LLMs de todas as sessões
+    CLIENT_POOL_CONFIG = {
+        "max_connections": 20,
+        "max_keepalive_connections": 10,
+        "keepalive_expiry": 120,  # segundos que uma conexão ociosa é mantida
+        "timeout": 120  # timeout das requisições em segundos
     }
 
 # Instância única
@@ -9,6 +9,7 @@ from .data_analysis import (
 
 from .visualizations import (
     plot_histogram,
+    plot_histograms_grid,
     plot_boxplot,
     plot_multiple_boxplots,
     plot_correlation_heatmap,
@@ -16,27 +17,32 @@ from .visualizations import (
 )
 
 from .insights import generate_insights_and_conclusions
+from .history import get_previous_answer
 
 # Lista de todas as ferramentas disponíveis
 ALL_TOOLS = [
     get_data_description,
     get_descriptive_statistics,
     plot_histogram,
+    plot_histograms_grid,
     plot_boxplot,
     plot_multiple_boxplots,
     plot_correlation_heatmap,
     plot_scatter,
-    generate_insights_and_conclusions
+    generate_insights_and_conclusions,
+    get_previous_answer
 ]
 
 __all__ = [
     'get_data_description',
     'get_descriptive_statistics',
     'plot_histogram',
+    'plot_histograms_grid',
     'plot_boxplot',
     'plot_multiple_boxplots',
     'plot_correlation_heatmap',
     'plot_scatter',
     'generate_insights_and_conclusions',
+    'get_previous_answer',
     'ALL_TOOLS'
 ]
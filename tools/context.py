@@ -0,0 +1,90 @@
+"""
+Contexto de dados das ferramentas de análise.
+
+As ferramentas não leem mais `st.session_state` diretamente: recebem um
+`DataContext` (DataFrame, histórico de análises, mensagens e memória da
+sessão) ativado pelo chamador com `use_data_context()`. O mesmo código roda
+na interface, em threads e processos de trabalho, em benchmarks e em testes de
+carga sem o Streamlit. Sem contexto ativo, as ferramentas usam o adaptador
+`DataContext.from_session_state()`, que lê a sessão do Streamlit uma vez.
+"""
+
+import contextlib
+import contextvars
+import logging
+from typing import Any, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+NO_DATA_ERROR = "❌ Erro: Nenhum dado foi carregado ainda. Por favor, faça upload de um arquivo CSV."
+
+_active: contextvars.ContextVar = contextvars.ContextVar('tool_data_context', default=None)
+
+
+class DataContext:
+    """Dados e estado de uma sessão de análise, passados explicitamente às ferramentas."""
+
+    def __init__(self, df: Optional[pd.DataFrame] = None, analysis_history: Optional[List[dict]] = None,
+                 messages: Optional[List[dict]] = None, memory: Any = None):
+        """
+        Args:
+            df: Dataset analisado
+            analysis_history: Histórico de análises (as conclusões são acrescentadas a ele);
+                None quando nenhuma análise foi feita ainda
+            messages: Mensagens da conversa (para resumir as análises realizadas)
+            memory: Memória do agente (respostas anteriores guardadas por referência)
+        """
+        self.df = df
+        self.analysis_history = analysis_history
+        self.messages = messages if messages is not None else []
+        self.memory = memory
+
+    @classmethod
+    def from_session_state(cls) -> "DataContext":
+        """Adaptador do Streamlit: contexto com os objetos da sessão atual (sem cópias)."""
+        import streamlit as st
+        state = st.session_state
+        return cls(
+            df=state.get('df'),
+            analysis_history=state.get('analysis_history'),
+            messages=state.get('messages'),
+            memory=state.get('agent_memory')
+        )
+
+    def require_df(self) -> Optional[str]:
+        """Mensagem de erro para a ferramenta quando não há dados carregados, ou None."""
+        if self.df is None:
+            logger.error("No DataFrame in the tool data context")
+            return NO_DATA_ERROR
+        logger.info(f"✅ Successfully accessed DataFrame with shape: {self.df.shape}")
+        return None
+
+
+@contextlib.contextmanager
+def use_data_context(context: DataContext):
+    """Dentro do bloco (e nas threads que copiam o contexto), as ferramentas usam `context`."""
+    token = _active.set(context)
+    try:
+        yield context
+    finally:
+        _active.reset(token)
+
+
+def get_active_context() -> Optional[DataContext]:
+    """Contexto ativado explicitamente, ou None."""
+    return _active.get()
+
+
+def current_data_context() -> DataContext:
+    """Contexto ativo ou, na falta dele, o da sessão do Streamlit."""
+    context = _active.get()
+    if context is not None:
+        return context
+    try:
+        return DataContext.from_session_state()
+    except Exception as e:
+        # Fora de um script do Streamlit (ex.: processo de trabalho sem contexto ativo)
+        logger.debug(f"No Streamlit session available for tools: {e}")
+        return DataContext()
@@ -2,7 +2,6 @@
 Ferramentas de análise de dados para o EDA Agent.
 """
 
-import streamlit as st
 import pandas as pd
 import numpy as np
 import io
@@ -10,6 +9,13 @@ import logging
 from typing import Optional
 from langchain.tools import tool
 
+from config.settings import settings
+from tools.context import current_data_context
+from tools.formatting import (fit_to_budget, fmt_number, group_numbered_names, is_compact,
+                              table_lines)
+from utils.column_index import column_suggestions, resolve_column
+from utils.dataset_cache import dataset_cache
+
 logger = logging.getLogger(__name__)
 
 @tool
@@ -19,22 +25,16 @@ def get_data_description() -> str:
     contagens de valores nulos e valores únicos por coluna.
     """
     logger.info("Executing get_data_description")
-    logger.info(f"Session state keys: {list(st.session_state.keys())}")
-    
-    # Acessar o DataFrame do session_state
-    if 'df' not in st.session_state:
-        logger.error("'df' key not found in session_state")
-        logger.error(f"Available keys: {list(st.session_state.keys())}")
-        return "❌ Erro: Nenhum dado foi carregado ainda. Por favor, faça upload de um arquivo CSV."
-    
-    if st.session_state.df is None:
-        logger.error("DataFrame is None in session_state")
-        return "❌ Erro: O DataFrame está vazio. Por favor, faça upload de um arquivo CSV."
-    
-    df = st.session_state.df
-    logger.info(f"✅ Successfully accessed DataFrame with shape: {df.shape}")
+    context = current_data_context()
+    error = context.require_df()
+    if error:
+        return error
+    df = context.df
     logger.info(f"DataFrame columns: {list(df.columns)[:5]}..." if len(df.columns) > 5 else f"DataFrame columns: {list(df.columns)}")
     
+    if is_compact():
+        return _compact_data_description(df)
+    
     buffer = io.StringIO()
     
     # Informações gerais
@@ -72,28 +72,26 @@ def get_descriptive_statistics(column: Optional[str] = None) -> str:
     calcula para todo o DataFrame.
     """
     logger.info(f"Executing get_descriptive_statistics for column: {column}")
-    logger.info(f"Session state has 'df': {'df' in st.session_state}")
-    
-    # Acessar o DataFrame do session_state
-    if 'df' not in st.session_state:
-        logger.error("'df' key not found in session_state")
-        return "❌ Erro: Nenhum dado foi carregado ainda. Por favor, faça upload de um arquivo CSV."
-    
-    if st.session_state.df is None:
-        logger.error("DataFrame is None in session_state")
-        return "❌ Erro: O DataFrame está vazio. Por favor, faça upload de um arquivo CSV."
-    
-    df = st.session_state.df
-    logger.info(f"✅ Successfully accessed DataFrame with shape: {df.shape}")
+    context = current_data_context()
+    error = context.require_df()
+    if error:
+        return error
+    df = context.df
     
     if column:
         logger.info(f"Calculating statistics for column: {column}")
-        if column not in df.columns:
-            return f"❌ Erro: A coluna '{column}' não existe no DataFrame."
+        # Aceita nomes aproximados ("valor da transação" → transaction_amount)
+        resolved = resolve_column(df, column)
+        if resolved is None:
+            return f"❌ Erro: A coluna '{column}' não existe no DataFrame.{column_suggestions(df, column)}"
+        column = resolved
         
         if not pd.api.types.is_numeric_dtype(df[column]):
             return f"⚠️ A coluna '{column}' não é numérica. Estatísticas não podem ser calculadas."
         
+        if is_compact():
+            return _compact_column_statistics(df, column)
+        
         stats = df[column].describe()
         result = f"📈 **Estatísticas Descritivas para '{column}':**\n\n"
         result += stats.to_string()
@@ -111,8 +109,145 @@ def get_descriptive_statistics(column: Optional[str] = None) -> str:
         if len(numeric_cols) == 0:
             return "⚠️ Não há colunas numéricas no DataFrame."
         
-        stats = df[numeric_cols].describe()
+        if is_compact():
+            return _compact_statistics(df, numeric_cols)
+        
+        stats = _numeric_describe(df)
         result = "📈 **Estatísticas Descritivas para Todas as Colunas Numéricas:**\n\n"
         result += stats.to_string()
         
     return result
+
+
+def _column_profile(df: pd.DataFrame) -> pd.DataFrame:
+    """Tipo, nulos e valores únicos por coluna (em cache por dataset)."""
+    def compute():
+        return pd.DataFrame({
+            'tipo': df.dtypes.astype(str),
+            'nulos': df.isnull().sum(),
+            'unicos': df.nunique()
+        })
+    return dataset_cache.get_or_compute(df, 'column_profile', compute)
+
+
+def _numeric_describe(df: pd.DataFrame) -> pd.DataFrame:
+    """`describe()` de todas as colunas numéricas (em cache por dataset)."""
+    return dataset_cache.get_or_compute(
+        df, 'numeric_describe', lambda: df.select_dtypes(include=[np.number]).describe())
+
+
+def _top_values(series: pd.Series, k: int) -> str:
+    counts = series.value_counts(dropna=False)
+    listed = ", ".join(f"{value}:{count}" for value, count in counts.head(k).items())
+    if len(counts) > k:
+        listed += f", +{len(counts) - k} outros"
+    return "{" + listed + "}"
+
+
+def _compact_data_description(df: pd.DataFrame) -> str:
+    """Visão geral para o LLM: colunas com o mesmo perfil agrupadas, categorias com contagens."""
+    top_k = settings.TOOL_OUTPUT_CONFIG["top_values"]
+    profile = _column_profile(df)
+    n_rows = len(df)
+    
+    # Colunas numeradas consecutivas do mesmo tipo e com a mesma contagem de nulos
+    # viram uma linha (ex.: V1..V28); a contagem exibida vale para cada coluna do grupo
+    keys = [(row.tipo, row.nulos) for row in profile.itertuples()]
+    body = []
+    for label, indices in group_numbered_names(list(df.columns), keys):
+        rows = profile.iloc[indices]
+        nulls = rows['nulos']
+        uniques = rows['unicos']
+        null_text = fmt_number(nulls.iloc[0])
+        if nulls.iloc[0]:
+            null_text += f" ({nulls.iloc[0] / n_rows:.1%})"
+        unique_text = (fmt_number(uniques.iloc[0]) if uniques.min() == uniques.max()
+                       else f"{fmt_number(uniques.min())}-{fmt_number(uniques.max())}")
+        line = [label, rows['tipo'].iloc[0], null_text, unique_text]
+        if len(indices) == 1 and uniques.iloc[0] <= max(10, top_k) and uniques.iloc[0] < n_rows:
+            line.append(_top_values(df.iloc[:, indices[0]], top_k))
+        body.extend(table_lines([line]))
+    
+    type_counts = ", ".join(f"{dtype}={count}" for dtype, count in df.dtypes.astype(str).value_counts().items())
+    head = [
+        f"Dataset: {n_rows} linhas × {df.shape[1]} colunas, "
+        f"{df.memory_usage(deep=True).sum() / 1024**2:.1f} MB",
+        f"Tipos: {type_counts}",
+        "Colunas [nome|tipo|nulos|únicos|{valor:contagem}]:"
+    ]
+    return fit_to_budget(head, body, "colunas",
+                         hint="consulte colunas específicas com get_descriptive_statistics")
+
+
+def _compact_statistics(df: pd.DataFrame, numeric_cols) -> str:
+    """Estatísticas de todas as colunas numéricas em tabela compacta (uma linha por coluna)."""
+    stats = _numeric_describe(df).T
+    counts = stats['count']
+    same_count = counts.min() == counts.max()
+    header = ["coluna", "média", "dp", "mín", "25%", "50%", "75%", "máx"]
+    if not same_count:
+        header.insert(1, "n")
+    body = []
+    for name, row in stats.iterrows():
+        values = [fmt_number(row[key]) for key in ('mean', 'std', 'min', '25%', '50%', '75%', 'max')]
+        if not same_count:
+            values.insert(0, fmt_number(row['count']))
+        body.extend(table_lines([[name, *values]]))
+    head = [f"Estatísticas de {len(numeric_cols)} colunas numéricas"
+            + (f" (n={fmt_number(counts.iloc[0])} em todas):" if same_count else ":"),
+            "|".join(header)]
+    return fit_to_budget(head, body, "colunas",
+                         hint="use get_descriptive_statistics(column=...) para as demais")
+
+
+def _compact_column_statistics(df: pd.DataFrame, column: str) -> str:
+    """Estatísticas de uma coluna numérica em uma linha."""
+    series = df[column]
+    stats = series.describe()
+    mean = series.mean()
+    cv = f"{series.std() / mean * 100:.1f}%" if mean else "-"
+    return (
+        f"'{column}' (n={fmt_number(stats['count'])}): média={fmt_number(stats['mean'])} "
+        f"dp={fmt_number(stats['std'])} mín={fmt_number(stats['min'])} 25%={fmt_number(stats['25%'])} "
+        f"50%={fmt_number(stats['50%'])} 75%={fmt_number(stats['75%'])} máx={fmt_number(stats['max'])}\n"
+        f"variância={fmt_number(series.var())} assimetria={fmt_number(series.skew())} "
+        f"curtose={fmt_number(series.kurtosis())} CV={cv}"
+    )
+
+
+def get_schema_digest(df: pd.DataFrame) -> str:
+    """
+    Resumo compacto do esquema (nomes, tipos, % de nulos e faixas) para o
+    prompt do sistema, limitado por SCHEMA_DIGEST_CONFIG["max_tokens"].
+    Calculado uma vez por dataset (em cache).
+    """
+    def compute():
+        profile = _column_profile(df)
+        n_rows = len(df)
+        numeric = df.select_dtypes(include=[np.number])
+        minimums, maximums = numeric.min(), numeric.max()
+        
+        # Mesmo agrupamento da visão geral: todas as colunas do grupo têm o mesmo % de nulos
+        keys = [(row.tipo, row.nulos) for row in profile.itertuples()]
+        body = []
+        for label, indices in group_numbered_names(list(df.columns), keys):
+            names = [df.columns[i] for i in indices]
+            rows = profile.iloc[indices]
+            null_pct = fmt_number(round(rows['nulos'].iloc[0] / n_rows * 100, 1)) if n_rows else "0"
+            if all(name in minimums.index for name in names):
+                value_range = f"{fmt_number(minimums[names].min())}..{fmt_number(maximums[names].max())}"
+                if len(names) == 1 and rows['unicos'].iloc[0] <= 10:
+                    value_range += f" ({rows['unicos'].iloc[0]} valores)"
+            elif len(names) == 1 and rows['unicos'].iloc[0] <= 10:
+                values = df[names[0]].dropna().unique()[:5]
+                value_range = f"{rows['unicos'].iloc[0]} valores: " + ", ".join(str(v) for v in values)
+            else:
+                value_range = f"{fmt_number(rows['unicos'].max())} valores distintos"
+            body.extend(table_lines([[label, rows['tipo'].iloc[0], null_pct, value_range]]))
+        
+        head = [f"ESQUEMA DO DATASET CARREGADO ({n_rows} linhas × {df.shape[1]} colunas):",
+                "nome|tipo|% nulos|faixa"]
+        return fit_to_budget(head, body, "colunas",
+                             max_tokens=settings.SCHEMA_DIGEST_CONFIG["max_tokens"],
+                             hint="use get_data_description() para ver todas")
+    return dataset_cache.get_or_compute(df, 'schema_digest', compute)
@@ -0,0 +1,245 @@
+"""
+Instrumentação e orçamento de payload das figuras das ferramentas de visualização.
+
+Cada figura retornada por `tools/visualizations.py` passa por `instrument_figure`,
+que mede o tempo de construção e o tamanho serializado. Quando a figura excede
+`VISUALIZATION_CONFIG["max_figure_bytes"]`, os traces com dados linha a linha são
+reduzidos (histogramas agregados em barras, boxplots em resumos, dispersões
+amostradas, heatmaps agregados em blocos) antes de chegar ao navegador.
+"""
+
+import functools
+import logging
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from config.settings import settings
+from utils.dataset_cache import summarize_series
+
+logger = logging.getLogger(__name__)
+
+# Atributos com um valor por ponto que podem ser amostrados juntos
+_POINT_ATTRIBUTES = ('x', 'y', 'text', 'hovertext', 'customdata')
+
+_metrics: Dict[int, Dict[str, Any]] = {}
+_metrics_lock = threading.Lock()
+
+
+def instrument_figure(func: Callable[..., go.Figure]) -> Callable[..., go.Figure]:
+    """
+    Decorador para ferramentas que retornam figuras: mede, aplica o orçamento
+    de payload e registra as métricas (ver `get_figure_metrics`).
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        fig = func(*args, **kwargs)
+        build_seconds = time.perf_counter() - started
+        if not isinstance(fig, go.Figure):
+            return fig
+        fig, metrics = enforce_payload_budget(fig)
+        metrics.update(tool=func.__name__, build_seconds=build_seconds)
+        _record_metrics(fig, metrics)
+        logger.info(
+            f"Figure from {func.__name__}: {metrics['bytes'] / 1024:.1f} KB, "
+            f"built in {build_seconds:.2f}s" + (" (degraded)" if metrics['degraded'] else "")
+        )
+        return fig
+
+    return wrapper
+
+
+def get_figure_metrics(fig: go.Figure) -> Optional[Dict[str, Any]]:
+    """
+    Retorna as métricas registradas para uma figura instrumentada.
+
+    Returns:
+        Dict com tool, build_seconds, bytes, original_bytes, degraded e actions,
+        ou None se a figura não passou por `instrument_figure`
+    """
+    with _metrics_lock:
+        return _metrics.get(id(fig))
+
+
+def _record_metrics(fig: go.Figure, metrics: Dict[str, Any]) -> None:
+    key = id(fig)
+    with _metrics_lock:
+        _metrics[key] = metrics
+    weakref.finalize(fig, _forget_metrics, key)
+
+
+def _forget_metrics(key: int) -> None:
+    with _metrics_lock:
+        _metrics.pop(key, None)
+
+
+def estimate_payload_bytes(fig: go.Figure) -> int:
+    """Estima o tamanho serializado dos dados da figura sem serializá-la."""
+    return sum(_trace_bytes(trace) for trace in fig.data) + 2048
+
+
+def _trace_bytes(trace) -> int:
+    total = 0
+    for attr in _POINT_ATTRIBUTES + ('z',):
+        value = getattr(trace, attr, None)
+        if value is None:
+            continue
+        if isinstance(value, np.ndarray):
+            # Arrays numpy são serializados em base64 (≈ 4/3 do tamanho binário)
+            total += value.nbytes * 4 // 3 if value.dtype.kind in 'biuf' else value.size * 20
+        elif isinstance(value, (list, tuple)):
+            total += _sequence_size(value) * 20
+    return total
+
+
+def _sequence_size(value) -> int:
+    if value and isinstance(value[0], (list, tuple, np.ndarray)):
+        return sum(len(row) for row in value)
+    return len(value)
+
+
+def _trace_points(trace) -> int:
+    for attr in ('x', 'y', 'z'):
+        value = getattr(trace, attr, None)
+        if value is not None and hasattr(value, '__len__'):
+            return np.size(value) if attr == 'z' else len(value)
+    return 0
+
+
+def enforce_payload_budget(fig: go.Figure, max_bytes: Optional[int] = None):
+    """
+    Reduz a figura até caber no orçamento de payload.
+
+    Args:
+        fig: Figura a verificar
+        max_bytes: Orçamento em bytes (padrão: VISUALIZATION_CONFIG["max_figure_bytes"])
+
+    Returns:
+        Tupla (figura, métricas) com bytes, original_bytes, degraded e actions
+    """
+    budget = max_bytes or settings.VISUALIZATION_CONFIG["max_figure_bytes"]
+    estimated = estimate_payload_bytes(fig)
+    # Só serializar de fato quando a estimativa indica que a figura cabe
+    size = len(fig.to_json()) if estimated <= 2 * budget else estimated
+    metrics = {'bytes': size, 'original_bytes': size, 'degraded': False, 'actions': []}
+    if size <= budget:
+        return fig, metrics
+
+    total_points = sum(_trace_points(trace) for trace in fig.data) or 1
+    point_budget = int(total_points * budget * 0.9 / size)
+    # A estimativa por ponto é aproximada: reduzir novamente se ainda exceder
+    for _ in range(3):
+        point_budget = max(point_budget, settings.VISUALIZATION_CONFIG["degrade_min_points"])
+        degraded, actions = _degrade_figure(fig, point_budget, total_points)
+        degraded_size = len(degraded.to_json())
+        if degraded_size <= budget or point_budget <= settings.VISUALIZATION_CONFIG["degrade_min_points"]:
+            break
+        point_budget = int(point_budget * budget * 0.9 / degraded_size)
+
+    metrics.update(bytes=degraded_size, degraded=True, actions=actions)
+    logger.warning(
+        f"Figure exceeded payload budget ({size / 1024:.0f} KB > {budget / 1024:.0f} KB); "
+        f"degraded to {degraded_size / 1024:.0f} KB: {actions}"
+    )
+    return degraded, metrics
+
+
+def _degrade_figure(fig: go.Figure, point_budget: int, total_points: int):
+    """Reduz cada trace proporcionalmente ao seu número de pontos."""
+    traces = []
+    actions = []
+    for trace in fig.data:
+        share = max(int(point_budget * _trace_points(trace) / total_points), 1)
+        new_trace, action = _degrade_trace(trace, share)
+        traces.append(new_trace)
+        if action:
+            actions.append(action)
+
+    degraded = go.Figure(data=traces, layout=fig.layout)
+    degraded.add_annotation(
+        text="⚠️ Visualização reduzida (amostragem/agregação) para respeitar o limite de tamanho",
+        xref="paper", yref="paper",
+        x=1, y=1.06,
+        xanchor="right",
+        showarrow=False,
+        font=dict(size=10, color="gray")
+    )
+    return degraded, actions
+
+
+def _degrade_trace(trace, max_points: int):
+    """Retorna (trace reduzido, descrição da ação) ou (trace, None) se já couber."""
+    points = _trace_points(trace)
+    if points <= max_points:
+        return trace, None
+
+    if trace.type == 'histogram' and trace.x is not None:
+        values = pd.to_numeric(pd.Series(np.asarray(trace.x)), errors='coerce').dropna()
+        counts, edges = np.histogram(values, bins=trace.nbinsx or 30)
+        bar = go.Bar(
+            x=(edges[:-1] + edges[1:]) / 2,
+            y=counts,
+            width=np.diff(edges),
+            name=trace.name,
+            marker_color=trace.marker.color,
+            xaxis=trace.xaxis,
+            yaxis=trace.yaxis,
+            showlegend=trace.showlegend
+        )
+        return bar, f"{trace.type}: {points:,} valores agregados em {len(counts)} barras"
+
+    if trace.type == 'box' and (trace.y is not None or trace.x is not None):
+        values = np.asarray(trace.y if trace.y is not None else trace.x)
+        summary = summarize_series(pd.Series(values))
+        box = go.Box(
+            x=[trace.name],
+            q1=[summary['q1']],
+            median=[summary['median']],
+            q3=[summary['q3']],
+            lowerfence=[summary['whisker_low']],
+            upperfence=[summary['whisker_high']],
+            mean=[summary['mean']],
+            name=trace.name,
+            marker_color=trace.marker.color,
+            xaxis=trace.xaxis,
+            yaxis=trace.yaxis
+        )
+        return box, f"box: {points:,} valores resumidos em quartis"
+
+    if trace.type == 'heatmap' and trace.z is not None:
+        z = np.asarray(trace.z, dtype=float)
+        factor = int(np.ceil(np.sqrt(z.size / max_points)))
+        rows, cols = -(-z.shape[0] // factor), -(-z.shape[1] // factor)
+        padded = np.full((rows * factor, cols * factor), np.nan)
+        padded[:z.shape[0], :z.shape[1]] = z
+        reduced = np.nanmean(padded.reshape(rows, factor, cols, factor), axis=(1, 3))
+        heatmap = go.Heatmap(z=reduced, colorscale=trace.colorscale, zmid=trace.zmid,
+                             xaxis=trace.xaxis, yaxis=trace.yaxis)
+        return heatmap, f"heatmap: células agregadas em blocos {factor}×{factor}"
+
+    if trace.type in ('scatter', 'scattergl'):
+        mode = trace.mode or ''
+        if 'lines' in mode:
+            # Linhas (ex.: tendência) mantêm a ordem: amostragem uniforme
+            index = np.linspace(0, points - 1, max_points).astype(int)
+        else:
+            index = np.sort(np.random.default_rng(0).choice(points, max_points, replace=False))
+        sampled = trace.to_plotly_json()
+        for attr in _POINT_ATTRIBUTES:
+            value = getattr(trace, attr, None)
+            if value is not None and not isinstance(value, str) and len(value) == points:
+                sampled[attr] = np.asarray(value)[index]
+        marker = sampled.get('marker') or {}
+        for attr in ('color', 'size'):
+            value = marker.get(attr)
+            if isinstance(value, (list, tuple, np.ndarray)) and len(value) == points:
+                marker[attr] = np.asarray(value)[index]
+        return type(trace)(sampled), f"{trace.type}: amostra de {max_points:,} de {points:,} pontos"
+
+    return trace, None
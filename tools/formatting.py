@@ -0,0 +1,120 @@
+"""
+Formatação compacta das saídas das ferramentas enviadas ao LLM.
+
+As ferramentas de análise retornam, por padrão, um texto compacto limitado por
+um orçamento de tokens (`TOOL_OUTPUT_CONFIG`): tabelas separadas por `|` com
+números em poucos algarismos significativos, colunas com o mesmo perfil
+agrupadas (ex.: `V1..V28`) e truncamento com contagem do que foi omitido. O
+modo offline, que exibe o resultado diretamente na interface, usa
+`full_detail()` para obter a renderização completa.
+"""
+
+import contextlib
+import contextvars
+import math
+import re
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from config.settings import settings
+
+_full_detail: contextvars.ContextVar = contextvars.ContextVar('tool_full_detail', default=False)
+
+_NUMBERED_NAME = re.compile(r'^(.*?)(\d+)$')
+
+
+@contextlib.contextmanager
+def full_detail():
+    """Dentro do bloco, as ferramentas retornam a renderização completa (para a interface)."""
+    token = _full_detail.set(True)
+    try:
+        yield
+    finally:
+        _full_detail.reset(token)
+
+
+def is_compact() -> bool:
+    """Verifica se a saída da ferramenta deve ser compacta (destinada ao LLM)."""
+    return settings.TOOL_OUTPUT_CONFIG["compact"] and not _full_detail.get()
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa de tokens (~4 caracteres por token)."""
+    return math.ceil(len(text) / 4)
+
+
+def fmt_number(value, digits: int = None) -> str:
+    """Número com poucos algarismos significativos (inteiros exatos até 6 dígitos)."""
+    digits = digits or settings.TOOL_OUTPUT_CONFIG["significant_digits"]
+    if value is None or (isinstance(value, float) and not np.isfinite(value)):
+        return "-" if value is None or np.isnan(value) else str(value)
+    if float(value).is_integer() and abs(value) < 1e6:
+        return str(int(value))
+    return f"{value:.{digits}g}"
+
+
+def table_lines(rows: Iterable[Sequence]) -> List[str]:
+    """Codifica as linhas como valores separados por `|`."""
+    return ["|".join(str(cell) for cell in row) for row in rows]
+
+
+def fit_to_budget(head: List[str], body: List[str], omitted_label: str,
+                  max_tokens: int = None, hint: str = "") -> str:
+    """
+    Junta o cabeçalho e o máximo de linhas do corpo que cabem no orçamento.
+
+    Args:
+        head: Linhas sempre incluídas
+        body: Linhas incluídas em ordem até o orçamento
+        omitted_label: Nome do que foi omitido (ex.: "colunas")
+        max_tokens: Orçamento (padrão: TOOL_OUTPUT_CONFIG["max_tokens"])
+        hint: Sugestão anexada quando há omissões
+    """
+    max_tokens = max_tokens or settings.TOOL_OUTPUT_CONFIG["max_tokens"]
+    used = estimate_tokens("\n".join(head))
+    kept = []
+    for line in body:
+        cost = estimate_tokens(line) + 1
+        if used + cost > max_tokens:
+            break
+        kept.append(line)
+        used += cost
+    lines = head + kept
+    omitted = len(body) - len(kept)
+    if omitted:
+        lines.append(f"… +{omitted} {omitted_label} omitidas{'; ' + hint if hint else ''}")
+    return "\n".join(lines)
+
+
+def group_numbered_names(names: Sequence[str], keys: Sequence) -> List[tuple]:
+    """
+    Agrupa nomes consecutivos com o mesmo prefixo numerado e a mesma chave de
+    perfil (ex.: V1, V2, ..., V28 do mesmo tipo e sem nulos).
+
+    Returns:
+        Lista de (rótulo, índices das colunas do grupo)
+    """
+    groups: List[tuple] = []
+    current: Optional[list] = None
+    for i, (name, key) in enumerate(zip(names, keys)):
+        match = _NUMBERED_NAME.match(str(name))
+        prefix = match.group(1) if match else None
+        if (current is not None and prefix is not None and prefix == current[0]
+                and key == current[1] and int(match.group(2)) == current[3] + 1):
+            current[2].append(i)
+            current[3] += 1
+            continue
+        if current is not None:
+            groups.append(current)
+        current = [prefix, key, [i], int(match.group(2)) if match else None]
+    if current is not None:
+        groups.append(current)
+
+    result = []
+    for prefix, _, indices, _ in groups:
+        if prefix is not None and len(indices) >= 3:
+            result.append((f"{names[indices[0]]}..{names[indices[-1]]} ({len(indices)})", indices))
+        else:
+            result.extend((str(names[i]), [i]) for i in indices)
+    return result
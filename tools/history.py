@@ -0,0 +1,27 @@
+"""
+Ferramenta de consulta às respostas anteriores guardadas por referência na memória.
+"""
+
+import logging
+from langchain.tools import tool
+
+from tools.context import current_data_context
+
+logger = logging.getLogger(__name__)
+
+@tool
+def get_previous_answer(reference: int) -> str:
+    """
+    Recupera o texto completo de uma resposta ou pergunta anterior que aparece
+    resumida no histórico com a indicação get_previous_answer(reference=N).
+    """
+    logger.info(f"Executing get_previous_answer for reference: {reference}")
+    
+    memory = current_data_context().memory
+    if memory is None or not hasattr(memory, 'get_reference'):
+        return "⚠️ Não há respostas anteriores guardadas por referência nesta sessão."
+    
+    text = memory.get_reference(int(reference))
+    if text is None:
+        return f"⚠️ A referência {reference} não existe ou já foi descartada."
+    return text
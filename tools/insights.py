@@ -2,13 +2,15 @@
 Ferramenta de geração de insights e conclusões para o EDA Agent.
 """
 
-import streamlit as st
 import pandas as pd
 import numpy as np
 import logging
 from datetime import datetime
 from langchain.tools import tool
 
+from tools.context import current_data_context
+from utils.history_store import SessionHistoryStore
+
 logger = logging.getLogger(__name__)
 
 @tool
@@ -18,23 +20,16 @@ def generate_insights_and_conclusions() -> str:
     baseados nas análises já realizadas durante a sessão.
     """
     logger.info("Generating insights and conclusions")
-    logger.info(f"Session state has 'df': {'df' in st.session_state}")
-    logger.info(f"Session state has 'analysis_history': {'analysis_history' in st.session_state}")
+    context = current_data_context()
     
-    if 'analysis_history' not in st.session_state:
+    if context.analysis_history is None:
         return "⚠️ Ainda não foram realizadas análises suficientes para gerar conclusões."
     
-    if 'df' not in st.session_state:
-        logger.error("'df' key not found in session_state")
-        return "❌ Erro: Nenhum dado foi carregado ainda. Por favor, faça upload de um arquivo CSV."
-    
-    if st.session_state.df is None:
-        logger.error("DataFrame is None in session_state")
-        return "❌ Erro: O DataFrame está vazio. Por favor, faça upload de um arquivo CSV."
+    error = context.require_df()
+    if error:
+        return error
     
-    df = st.session_state.df
-    logger.info(f"✅ Successfully accessed DataFrame with shape: {df.shape}")
-    history = st.session_state.analysis_history
+    df = context.df
     
     insights = []
     insights.append("## 🎯 Insights e Conclusões Baseados nas Análises\n")
@@ -110,9 +105,9 @@ def generate_insights_and_conclusions() -> str:
             insights.append(f"- **{info['column']}**: {info['count']} outliers ({info['percentage']:.1f}% dos dados)")
     
     # Adicionar histórico de análises realizadas
-    if 'messages' in st.session_state and len(st.session_state.messages) > 0:
+    if len(context.messages) > 0:
         insights.append(f"\n### 📝 Análises Realizadas na Sessão:")
-        analysis_count = _count_analyses(st.session_state.messages)
+        analysis_count = _count_analyses(context.messages)
         
         for analysis, count in analysis_count.items():
             insights.append(f"- {analysis}: {count} análise(s)")
@@ -135,10 +130,7 @@ def generate_insights_and_conclusions() -> str:
     # Armazenar conclusões no histórico
     conclusion_summary = "\n".join(insights)
     
-    if 'analysis_history' not in st.session_state:
-        st.session_state.analysis_history = []
-    
-    st.session_state.analysis_history.append({
+    context.analysis_history.append({
         'timestamp': datetime.now().isoformat(),
         'type': 'conclusions',
         'content': conclusion_summary
@@ -174,6 +166,9 @@ def _analyze_outliers(df: pd.DataFrame, numeric_cols) -> list:
 def _count_analyses(messages: list) -> dict:
     """Conta os tipos de análises realizadas."""
     analysis_count = {}
+    if isinstance(messages, SessionHistoryStore):
+        # Apenas os resumos em memória: recarregar as mensagens traria as figuras do disco
+        messages = messages.summaries()
     
     for msg in messages:
         if msg.get('role') == 'user':
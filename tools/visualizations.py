@@ -2,41 +2,50 @@
 Ferramentas de visualização para o EDA Agent.
 """
 
-import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 from langchain.tools import tool
 from config.settings import settings
+from tools.context import current_data_context
+from tools.figure_budget import instrument_figure
+from utils.column_index import column_suggestions, resolve_column
+from utils.dataset_cache import (
+    get_column_summaries,
+    get_correlation_matrix,
+    get_correlation_order,
+    get_ecdf_points,
+    get_histogram_bins
+)
 
 logger = logging.getLogger(__name__)
 
 @tool
+@instrument_figure
 def plot_histogram(column: str) -> go.Figure:
     """
     Útil para visualizar a distribuição de uma única coluna numérica. 
     Retorna uma figura de histograma.
     """
     logger.info(f"Executing plot_histogram for column: {column}")
-    logger.info(f"Session state has 'df': {'df' in st.session_state}")
-    
-    if 'df' not in st.session_state:
-        logger.error("'df' key not found in session_state")
-        return _create_error_figure("❌ Erro: Nenhum dado foi carregado ainda. Por favor, faça upload de um arquivo CSV.")
-    
-    if st.session_state.df is None:
-        logger.error("DataFrame is None in session_state")
-        return _create_error_figure("❌ Erro: O DataFrame está vazio. Por favor, faça upload de um arquivo CSV.")
-    
-    df = st.session_state.df
-    logger.info(f"✅ Successfully accessed DataFrame with shape: {df.shape}")
-    
-    if column not in df.columns:
+    context = current_data_context()
+    error = context.require_df()
+    if error:
+        return _create_error_figure(error)
+    df = context.df
+    
+    # Aceita nomes aproximados ("valor da transação" → transaction_amount)
+    resolved = resolve_column(df, column)
+    if resolved is None:
         logger.warning(f"Column {column} not found in DataFrame")
-        return _create_error_figure(f"❌ Erro: A coluna '{column}' não existe no DataFrame.")
+        return _create_error_figure(
+            f"❌ Erro: A coluna '{column}' não existe no DataFrame.{column_suggestions(df, column)}")
+    column = resolved
     
     if not pd.api.types.is_numeric_dtype(df[column]):
         return _create_error_figure(f"⚠️ A coluna '{column}' não é numérica.")
@@ -78,28 +87,125 @@ def plot_histogram(column: str) -> go.Figure:
 
 
 @tool
-def plot_boxplot(column: str) -> go.Figure:
+@instrument_figure
+def plot_histograms_grid(columns: Optional[str] = None, kind: str = "histogram") -> go.Figure:
     """
-    Gera um boxplot para uma coluna numérica, útil para identificar 
-    outliers e a dispersão dos dados.
+    Gera, em uma única figura, histogramas (kind="histogram") ou ECDFs
+    (kind="ecdf") de várias colunas numéricas. Use para pedidos como
+    "histogramas de todas as colunas". columns é uma lista separada por
+    vírgulas; se omitida, usa todas as colunas numéricas.
     """
-    logger.info(f"Executing plot_boxplot for column: {column}")
-    logger.info(f"Session state has 'df': {'df' in st.session_state}")
+    logger.info(f"Executing plot_histograms_grid for columns: {columns} (kind={kind})")
+    context = current_data_context()
+    error = context.require_df()
+    if error:
+        return _create_error_figure(error)
+    df = context.df
+    
+    if kind not in ("histogram", "ecdf"):
+        return _create_error_figure(f"❌ Erro: Tipo '{kind}' inválido. Use 'histogram' ou 'ecdf'.")
+    
+    numeric_cols = list(df.select_dtypes(include=[np.number]).columns)
+    if columns:
+        requested = [name.strip() for name in columns.split(",") if name.strip()]
+        resolved = {name: resolve_column(df, name) for name in requested}
+        missing = [name for name, col in resolved.items() if col is None]
+        if missing:
+            return _create_error_figure(f"❌ Erro: Coluna(s) não encontrada(s): {', '.join(missing)}."
+                                        f"{column_suggestions(df, missing[0])}")
+        selected = list(dict.fromkeys(resolved[name] for name in requested))
+        skipped = [col for col in selected if col not in numeric_cols]
+        selected = [col for col in selected if col in numeric_cols]
+        if skipped:
+            logger.info(f"Skipping non-numeric columns: {skipped}")
+    else:
+        selected = numeric_cols
     
-    if 'df' not in st.session_state:
-        logger.error("'df' key not found in session_state")
-        return _create_error_figure("❌ Erro: Nenhum dado foi carregado ainda. Por favor, faça upload de um arquivo CSV.")
+    if len(selected) == 0:
+        return _create_error_figure("⚠️ Não há colunas numéricas para gerar os histogramas.")
     
-    if st.session_state.df is None:
-        logger.error("DataFrame is None in session_state")
-        return _create_error_figure("❌ Erro: O DataFrame está vazio. Por favor, faça upload de um arquivo CSV.")
+    config = settings.VISUALIZATION_CONFIG
+    max_cols = config["histogram_grid_max_columns"]
+    omitted = len(selected) - max_cols
+    selected = selected[:max_cols]
     
-    df = st.session_state.df
-    logger.info(f"✅ Successfully accessed DataFrame with shape: {df.shape}")
+    # Calcular bins/ECDFs em paralelo (numpy libera o GIL nas ordenações e contagens)
+    if kind == "histogram":
+        compute = lambda col: get_histogram_bins(df, col, config["histogram_bins"])
+    else:
+        compute = lambda col: get_ecdf_points(df, col, config["ecdf_points"])
+    with ThreadPoolExecutor(max_workers=config["parallel_workers"]) as pool:
+        results = list(pool.map(compute, selected))
+    
+    n_cols = min(config["histogram_grid_cols"], len(selected))
+    n_rows = (len(selected) + n_cols - 1) // n_cols
+    fig = make_subplots(
+        rows=n_rows,
+        cols=n_cols,
+        subplot_titles=[str(col) for col in selected],
+        vertical_spacing=min(0.3 / n_rows, 0.08),
+        horizontal_spacing=0.05
+    )
+    
+    for idx, (col, (first, second)) in enumerate(zip(selected, results)):
+        row = idx // n_cols + 1
+        col_idx = idx % n_cols + 1
+        if kind == "histogram":
+            counts, edges = first, second
+            trace = go.Bar(
+                x=(edges[:-1] + edges[1:]) / 2,
+                y=counts,
+                width=np.diff(edges),
+                name=str(col),
+                marker_color=config["color_scheme"]
+            )
+        else:
+            trace = go.Scatter(
+                x=first,
+                y=second,
+                mode='lines',
+                line_shape='hv',
+                name=str(col),
+                line_color=config["color_scheme"]
+            )
+        fig.add_trace(trace, row=row, col=col_idx)
+    
+    title = "Distribuição das Variáveis Numéricas" if kind == "histogram" else "ECDF das Variáveis Numéricas"
+    if omitted > 0:
+        title += f" (primeiras {max_cols}; {omitted} omitidas)"
     
-    if column not in df.columns:
+    fig.update_layout(
+        title=title,
+        height=max(300, 250 * n_rows),
+        showlegend=False,
+        bargap=0
+    )
+    
+    logger.info(f"Created {kind} grid for {len(selected)} columns")
+    return fig
+
+
+@tool
+@instrument_figure
+def plot_boxplot(column: str) -> go.Figure:
+    """
+    Gera um boxplot para uma coluna numérica, útil para identificar 
+    outliers e a dispersão dos dados.
+    """
+    logger.info(f"Executing plot_boxplot for column: {column}")
+    context = current_data_context()
+    error = context.require_df()
+    if error:
+        return _create_error_figure(error)
+    df = context.df
+    
+    # Aceita nomes aproximados ("valor da transação" → transaction_amount)
+    resolved = resolve_column(df, column)
+    if resolved is None:
         logger.warning(f"Column {column} not found in DataFrame")
-        return _create_error_figure(f"❌ Erro: A coluna '{column}' não existe no DataFrame.")
+        return _create_error_figure(
+            f"❌ Erro: A coluna '{column}' não existe no DataFrame.{column_suggestions(df, column)}")
+    column = resolved
     
     if not pd.api.types.is_numeric_dtype(df[column]):
         return _create_error_figure(f"⚠️ A coluna '{column}' não é numérica.")
@@ -142,24 +248,18 @@ def plot_boxplot(column: str) -> go.Figure:
 
 
 @tool
+@instrument_figure
 def plot_multiple_boxplots() -> go.Figure:
     """
     Cria múltiplos boxplots para todas as colunas numéricas do dataset,
     útil para identificar outliers em todas as variáveis de uma só vez.
     """
     logger.info("Executing plot_multiple_boxplots for all numeric columns")
-    logger.info(f"Session state has 'df': {'df' in st.session_state}")
-    
-    if 'df' not in st.session_state:
-        logger.error("'df' key not found in session_state")
-        return _create_error_figure("❌ Erro: Nenhum dado foi carregado ainda. Por favor, faça upload de um arquivo CSV.")
-    
-    if st.session_state.df is None:
-        logger.error("DataFrame is None in session_state")
-        return _create_error_figure("❌ Erro: O DataFrame está vazio. Por favor, faça upload de um arquivo CSV.")
-    
-    df = st.session_state.df
-    logger.info(f"✅ Successfully accessed DataFrame with shape: {df.shape}")
+    context = current_data_context()
+    error = context.require_df()
+    if error:
+        return _create_error_figure(error)
+    df = context.df
     
     # Selecionar apenas colunas numéricas
     numeric_cols = df.select_dtypes(include=[np.number]).columns
@@ -167,30 +267,21 @@ def plot_multiple_boxplots() -> go.Figure:
     if len(numeric_cols) == 0:
         return _create_error_figure("⚠️ Não há colunas numéricas no DataFrame.")
     
-    # Normalizar dados para melhor visualização
-    from sklearn.preprocessing import StandardScaler
-    scaler = StandardScaler()
-    df_normalized = pd.DataFrame(
-        scaler.fit_transform(df[numeric_cols]),
-        columns=numeric_cols
-    )
-    
     max_cols = settings.VISUALIZATION_CONFIG["max_columns_boxplot"]
     subplot_max_cols = settings.VISUALIZATION_CONFIG["subplot_max_cols"]
     
+    # Resumos por coluna (quantis e momentos) vêm do cache do dataset:
+    # nenhuma cópia linha a linha do DataFrame é criada
+    plotted_cols = numeric_cols[:max_cols] if len(numeric_cols) > 9 else numeric_cols
+    summaries = get_column_summaries(df, plotted_cols)
+    
     # Se muitas variáveis, criar um único boxplot com todas
     if len(numeric_cols) > 9:
         fig = go.Figure()
         
-        # Adicionar um trace para cada coluna
+        # Adicionar um trace para cada coluna, com o resumo normalizado (Z-score)
         for col in numeric_cols[:max_cols]:
-            fig.add_trace(go.Box(
-                y=df_normalized[col],
-                name=col,
-                boxpoints='outliers',
-                jitter=0.3,
-                pointpos=-1.8
-            ))
+            fig.add_traces(_summary_traces(col, summaries[col], standardize=True))
         
         fig.update_layout(
             title="Boxplots de Todas as Variáveis Numéricas (Normalizadas)",
@@ -220,16 +311,12 @@ def plot_multiple_boxplots() -> go.Figure:
             row = idx // n_cols + 1
             col_idx = idx % n_cols + 1
             
-            fig.add_trace(
-                go.Box(
-                    y=df[col],
-                    name=col,
-                    boxpoints='outliers',
-                    marker_color=settings.VISUALIZATION_CONFIG["color_scheme"]
-                ),
-                row=row,
-                col=col_idx
-            )
+            for trace in _summary_traces(col, summaries[col]):
+                fig.add_trace(
+                    trace,
+                    row=row,
+                    col=col_idx
+                )
         
         fig.update_layout(
             title="Boxplots para Identificação de Outliers",
@@ -246,24 +333,20 @@ def plot_multiple_boxplots() -> go.Figure:
 
 
 @tool
-def plot_correlation_heatmap() -> go.Figure:
+@instrument_figure
+def plot_correlation_heatmap(block_row: Optional[int] = None, block_col: Optional[int] = None) -> go.Figure:
     """
     Cria um heatmap de correlação para visualizar a relação entre 
-    todas as colunas numéricas do DataFrame.
+    todas as colunas numéricas do DataFrame. As colunas são agrupadas por
+    similaridade; com muitas colunas, o heatmap é resumido em blocos numerados
+    e block_row/block_col permitem detalhar um bloco específico.
     """
-    logger.info("Executing plot_correlation_heatmap")
-    logger.info(f"Session state has 'df': {'df' in st.session_state}")
-    
-    if 'df' not in st.session_state:
-        logger.error("'df' key not found in session_state")
-        return _create_error_figure("❌ Erro: Nenhum dado foi carregado ainda. Por favor, faça upload de um arquivo CSV.")
-    
-    if st.session_state.df is None:
-        logger.error("DataFrame is None in session_state")
-        return _create_error_figure("❌ Erro: O DataFrame está vazio. Por favor, faça upload de um arquivo CSV.")
-    
-    df = st.session_state.df
-    logger.info(f"✅ Successfully accessed DataFrame with shape: {df.shape}")
+    logger.info(f"Executing plot_correlation_heatmap (block_row={block_row}, block_col={block_col})")
+    context = current_data_context()
+    error = context.require_df()
+    if error:
+        return _create_error_figure(error)
+    df = context.df
     
     # Selecionar apenas colunas numéricas
     numeric_cols = df.select_dtypes(include=[np.number]).columns
@@ -271,63 +354,108 @@ def plot_correlation_heatmap() -> go.Figure:
     if len(numeric_cols) < 2:
         return _create_error_figure("⚠️ Necessário pelo menos 2 colunas numéricas para calcular correlação.")
     
-    # Calcular matriz de correlação
-    corr_matrix = df[numeric_cols].corr()
+    config = settings.VISUALIZATION_CONFIG
+    
+    # Calcular matriz de correlação (em cache) e reordenar por clustering hierárquico
+    corr_matrix = get_correlation_matrix(df)
+    if len(numeric_cols) >= config["heatmap_cluster_min_columns"]:
+        order = get_correlation_order(df)
+        corr_matrix = corr_matrix.loc[order, order]
+    
+    n = len(corr_matrix.columns)
+    block_size = int(np.ceil(n / config["heatmap_max_side"]))
+    n_blocks = int(np.ceil(n / block_size))
+    title = "Matriz de Correlação"
+    
+    if block_size > 1 and (block_row is not None or block_col is not None):
+        # Detalhar um bloco na resolução original
+        block_row = block_row if block_row is not None else block_col
+        block_col = block_col if block_col is not None else block_row
+        if not (0 <= block_row < n_blocks and 0 <= block_col < n_blocks):
+            return _create_error_figure(f"❌ Erro: Blocos válidos vão de 0 a {n_blocks - 1}.")
+        rows = slice(block_row * block_size, (block_row + 1) * block_size)
+        cols = slice(block_col * block_size, (block_col + 1) * block_size)
+        corr_matrix = corr_matrix.iloc[rows, cols]
+        z = corr_matrix.values
+        x_labels, y_labels = list(corr_matrix.columns), list(corr_matrix.index)
+        aggregated = False
+        title += f" - Bloco ({block_row}, {block_col})"
+    elif block_size > 1:
+        # Visão geral: agregar células em blocos (média das correlações)
+        z, x_labels = _aggregate_correlation_blocks(corr_matrix, block_size)
+        y_labels = x_labels
+        aggregated = True
+        title += f" ({n} variáveis agrupadas em {n_blocks}×{n_blocks} blocos)"
+        logger.info(f"Aggregated {n}x{n} correlation matrix into {n_blocks}x{n_blocks} blocks")
+    else:
+        z = corr_matrix.values
+        x_labels, y_labels = list(corr_matrix.columns), list(corr_matrix.index)
+        aggregated = False
+    
+    side = max(len(x_labels), len(y_labels))
+    show_text = side <= config["heatmap_text_max_columns"]
     
     # Criar heatmap
     fig = go.Figure(data=go.Heatmap(
-        z=corr_matrix.values,
-        x=corr_matrix.columns,
-        y=corr_matrix.columns,
+        z=z,
+        x=x_labels,
+        y=y_labels,
         colorscale='RdBu',
         zmid=0,
-        text=np.round(corr_matrix.values, 2),
-        texttemplate='%{text}',
+        zmin=-1,
+        zmax=1,
+        text=np.round(z, 2) if show_text else None,
+        texttemplate='%{text}' if show_text else None,
         textfont={"size": 10},
+        hovertemplate='%{y} × %{x}<br>Correlação média: %{z:.2f}<extra></extra>' if aggregated else None,
         colorbar=dict(title="Correlação")
     ))
     
+    size = int(np.clip(side * config["heatmap_cell_px"], 600, 1400))
     fig.update_layout(
-        title="Matriz de Correlação",
-        height=600,
-        width=800,
+        title=title,
+        height=size,
+        width=size + 200,
         xaxis_title="",
         yaxis_title="",
         xaxis={'side': 'bottom'}
     )
     
+    if aggregated:
+        fig.add_annotation(
+            text="Cada célula é a correlação média entre dois blocos; use block_row/block_col para detalhar.",
+            xref="paper", yref="paper",
+            x=0, y=-0.08,
+            showarrow=False,
+            font=dict(size=10),
+            align="left"
+        )
+    
     return fig
 
 
 @tool
+@instrument_figure
 def plot_scatter(x_column: str, y_column: str) -> go.Figure:
     """
     Gera um gráfico de dispersão (scatter plot) para investigar 
     a relação entre duas colunas numéricas específicas.
     """
     logger.info(f"Executing plot_scatter for columns: {x_column} vs {y_column}")
-    logger.info(f"Session state has 'df': {'df' in st.session_state}")
-    
-    if 'df' not in st.session_state:
-        logger.error("'df' key not found in session_state")
-        return _create_error_figure("❌ Erro: Nenhum dado foi carregado ainda. Por favor, faça upload de um arquivo CSV.")
+    context = current_data_context()
+    error = context.require_df()
+    if error:
+        return _create_error_figure(error)
+    df = context.df
     
-    if st.session_state.df is None:
-        logger.error("DataFrame is None in session_state")
-        return _create_error_figure("❌ Erro: O DataFrame está vazio. Por favor, faça upload de um arquivo CSV.")
-    
-    df = st.session_state.df
-    logger.info(f"✅ Successfully accessed DataFrame with shape: {df.shape}")
-    
-    # Validação das colunas
-    missing_cols = []
-    if x_column not in df.columns:
-        missing_cols.append(x_column)
-    if y_column not in df.columns:
-        missing_cols.append(y_column)
+    # Validação das colunas (aceita nomes aproximados)
+    resolved_x, resolved_y = resolve_column(df, x_column), resolve_column(df, y_column)
+    missing_cols = [name for name, col in ((x_column, resolved_x), (y_column, resolved_y)) if col is None]
     
     if missing_cols:
-        return _create_error_figure(f"❌ Erro: Coluna(s) não encontrada(s): {', '.join(missing_cols)}")
+        return _create_error_figure(f"❌ Erro: Coluna(s) não encontrada(s): {', '.join(missing_cols)}."
+                                    f"{column_suggestions(df, missing_cols[0])}")
+    x_column, y_column = resolved_x, resolved_y
     
     # Verificar se as colunas são numéricas
     non_numeric = []
@@ -389,17 +517,79 @@ def _create_error_figure(message: str) -> go.Figure:
     return fig
 
 
+def _summary_traces(name: str, summary: dict, standardize: bool = False) -> list:
+    """
+    Cria um boxplot a partir do resumo pré-calculado da coluna.
+    
+    Os outliers mais extremos guardados no resumo são sobrepostos como pontos
+    (até VISUALIZATION_CONFIG["boxplot_outlier_points"] de cada lado); a
+    contagem total continua na anotação do gráfico. Com standardize=True, o
+    resumo é convertido para Z-score usando a média e o desvio padrão
+    populacional da coluna (equivalente ao StandardScaler).
+    """
+    keys = ['q1', 'median', 'q3', 'whisker_low', 'whisker_high', 'mean']
+    values = {key: summary[key] for key in keys}
+    outliers = np.asarray(summary['extremes_low'] + summary['extremes_high'], dtype=float)
+    if standardize:
+        std = summary['std'] or 1.0
+        values = {key: (value - summary['mean']) / std for key, value in values.items()}
+        outliers = (outliers - summary['mean']) / std
+    color = settings.VISUALIZATION_CONFIG["color_scheme"] if not standardize else None
+    
+    box = go.Box(
+        x=[name],
+        q1=[values['q1']],
+        median=[values['median']],
+        q3=[values['q3']],
+        lowerfence=[values['whisker_low']],
+        upperfence=[values['whisker_high']],
+        mean=[values['mean']],
+        name=name,
+        marker_color=color
+    )
+    if not outliers.size:
+        return [box]
+    
+    points = go.Scatter(
+        x=[name] * outliers.size,
+        y=outliers,
+        mode='markers',
+        name=f"{name} (outliers)",
+        marker=dict(size=4, color=color, symbol='circle-open'),
+        hovertemplate=f"{name}: %{{y}}<extra>outlier</extra>"
+    )
+    return [box, points]
+
+
+def _aggregate_correlation_blocks(corr_matrix: pd.DataFrame, block_size: int):
+    """
+    Agrega a matriz de correlação (já reordenada) em blocos quadrados.
+    
+    Returns:
+        Tupla (matriz de médias por bloco, rótulos "B<i>: primeira…última" dos blocos)
+    """
+    n = len(corr_matrix.columns)
+    n_blocks = int(np.ceil(n / block_size))
+    padded = np.full((n_blocks * block_size, n_blocks * block_size), np.nan)
+    padded[:n, :n] = corr_matrix.values
+    blocks = np.nanmean(
+        padded.reshape(n_blocks, block_size, n_blocks, block_size), axis=(1, 3)
+    )
+    
+    names = [str(name)[:12] for name in corr_matrix.columns]
+    labels = [
+        f"B{i}: {names[i * block_size]}…{names[min((i + 1) * block_size, n) - 1]}"
+        for i in range(n_blocks)
+    ]
+    return blocks, labels
+
+
 def _add_outlier_summary(fig: go.Figure, df: pd.DataFrame, columns) -> None:
     """Adiciona resumo de outliers ao gráfico."""
     outlier_summary = []
     
-    for col in columns:
-        Q1 = df[col].quantile(0.25)
-        Q3 = df[col].quantile(0.75)
-        IQR = Q3 - Q1
-        lower_bound = Q1 - 1.5 * IQR
-        upper_bound = Q3 + 1.5 * IQR
-        outliers = df[(df[col] < lower_bound) | (df[col] > upper_bound)][col].count()
+    for col, summary in get_column_summaries(df, columns).items():
+        outliers = summary['n_outliers']
         if outliers > 0:
             outlier_summary.append(f"{col}: {outliers} outliers")
     
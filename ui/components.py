@@ -6,15 +6,37 @@ import streamlit as st
 import pandas as pd
 import logging
 import traceback
+import uuid
 from datetime import datetime
 
 from agents import create_eda_agent
+from agents.offline_agent import offline_agent
+from agents.router import query_router
+from config.settings import settings
+from tools.context import DataContext, use_data_context
+from tools.data_analysis import get_schema_digest
+from utils.column_index import get_column_index
+from utils.dataset_cache import dataset_fingerprint
+from utils.history_store import SessionMemoryBudget, create_session_history, message_summary
+from utils.llm_cache import conversation_digest, llm_response_cache
+from utils.llm_fallback import llm_fallback_manager
+from utils.async_runner import async_agent_runner
+from utils.precompute import precompute_worker
+from utils.rate_limiter import RateLimitExceeded
+from utils.speculation import speculative_scheduler
+from utils.resilience import PERMANENT, CircuitOpenError, classify_error, is_context_overflow
 
 logger = logging.getLogger(__name__)
 
 
 def initialize_session_state():
     """Inicializa as variáveis de estado da sessão."""
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+        logger.info("Initialized session_id in session_state")
+    if 'history_budget' not in st.session_state:
+        st.session_state.history_budget = SessionMemoryBudget(st.session_state.session_id)
+        logger.info("Initialized history_budget in session_state")
     if 'df' not in st.session_state:
         st.session_state.df = None
         logger.info("Initialized df in session_state")
@@ -22,16 +44,17 @@ def initialize_session_state():
         st.session_state.agent_executor = None
         logger.info("Initialized agent_executor in session_state")
     if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = []
+        st.session_state.chat_history = create_session_history('chat_history', st.session_state.history_budget)
         logger.info("Initialized chat_history in session_state")
     if 'messages' not in st.session_state:
-        st.session_state.messages = []
+        st.session_state.messages = create_session_history('messages', st.session_state.history_budget,
+                                                           summarize=message_summary)
         logger.info("Initialized messages in session_state")
     if 'processing_steps' not in st.session_state:
         st.session_state.processing_steps = []
         logger.info("Initialized processing_steps in session_state")
     if 'analysis_history' not in st.session_state:
-        st.session_state.analysis_history = []
+        st.session_state.analysis_history = create_session_history('analysis_history', st.session_state.history_budget)
         logger.info("Initialized analysis_history in session_state")
     if 'agent_memory' not in st.session_state:
         st.session_state.agent_memory = None
@@ -123,6 +146,19 @@ def render_sidebar():
                         df = pd.read_csv(uploaded_file)
                         st.session_state.df = df
                         logger.info(f"File loaded successfully: {df.shape}")
+                        
+                        # Resumo do esquema para o prompt do agente (em cache por dataset)
+                        fingerprint = dataset_fingerprint(df)
+                        if settings.SCHEMA_DIGEST_CONFIG["enabled"]:
+                            get_schema_digest(df)
+                        # Matcher de palavras-chave e colunas do agente offline e do roteador
+                        offline_agent.scan("", df)
+                        # Índice aproximado de nomes de colunas
+                        if settings.COLUMN_INDEX_CONFIG["enabled"]:
+                            get_column_index(df)
+                        # Perfil, resumos, correlação e histogramas em segundo plano
+                        # (trocar de arquivo cancela o pré-cálculo anterior)
+                        precompute_worker.start(st.session_state.session_id, df)
                     
                     st.success(f"✅ Arquivo carregado: {df.shape[0]:,} linhas × {df.shape[1]} colunas")
                 
@@ -130,7 +166,9 @@ def render_sidebar():
                 need_recreate = (
                     st.session_state.agent_executor is None or
                     not hasattr(st.session_state, 'current_model_index') or
-                    st.session_state.current_model_index != st.session_state.selected_model_index
+                    st.session_state.current_model_index != st.session_state.selected_model_index or
+                    # Outro arquivo: o esquema no prompt do agente precisa ser atualizado
+                    st.session_state.get('agent_dataset') != fingerprint
                 )
                 
                 if need_recreate:
@@ -150,8 +188,9 @@ def render_sidebar():
                             # Recriar o agente (o DataFrame já está em st.session_state.df)
                             st.session_state.agent_executor = create_eda_agent()
                             
-                            # Armazenar o índice do modelo atual
+                            # Armazenar o índice do modelo atual e o dataset do esquema no prompt
                             st.session_state.current_model_index = st.session_state.selected_model_index
+                            st.session_state.agent_dataset = fingerprint
                             
                             # Verificar se o DataFrame ainda está disponível após criar o agente
                             if st.session_state.df is not None:
@@ -175,6 +214,7 @@ def render_sidebar():
                     st.metric("Total de Linhas", f"{df.shape[0]:,}")
                 with col2:
                     st.metric("Total de Colunas", df.shape[1])
+                _render_precompute_status()
                 
                 # Preview dos dados
                 with st.expander("👀 Preview dos Dados", expanded=True):
@@ -207,14 +247,50 @@ def render_sidebar():
                         st.caption(f"💰 {'Gratuito' if provider_info.get('is_free') else 'Pago'}")
                         if provider_info.get('rate_limit'):
                             st.caption(f"⏱️ {provider_info['rate_limit']} req/dia")
+                        if provider_info.get('remaining'):
+                            # Orçamento local compartilhado por todas as sessões
+                            st.caption("🪣 Restante: " + " · ".join(
+                                f"{budget['remaining']}/{budget['capacity']} por {window}"
+                                for window, budget in provider_info['remaining'].items()
+                            ))
                         
                         # Mostrar se está usando modelo selecionado ou fallback
                         if st.session_state.selected_model_index is not None:
                             st.caption("🎯 Modelo selecionado manualmente")
                         else:
                             st.caption("🔄 Fallback automático ativo")
+                            decision = llm_fallback_manager.last_routing_decision
+                            if decision:
+                                st.caption(f"🧭 Roteamento ({decision['policy']}): "
+                                           f"{decision['chosen']} — {decision['reason']}")
+                                for name, reason in decision['skipped'].items():
+                                    st.caption(f"↪️ {name} ignorado: {reason}")
+                        
+                        # Métricas recentes de todos os providers (compartilhadas entre sessões)
+                        with st.expander("📈 Latência dos providers"):
+                            st.dataframe(_provider_metrics_table(), hide_index=True)
                     else:
                         st.warning("⚠️ Nenhum modelo ativo")
+                    
+                    # Eficiência da execução especulativa (compartilhada entre sessões)
+                    speculation_stats = speculative_scheduler.get_stats()
+                    if speculation_stats['completed']:
+                        st.caption(
+                            f"🔮 Especulação: {speculation_stats['hit_rate']:.0%} de acerto "
+                            f"({speculation_stats['hits']} usadas, {speculation_stats['wasted']} descartadas); "
+                            f"{speculation_stats['saved_seconds']:.1f}s poupados, "
+                            f"{speculation_stats['wasted_seconds']:.1f}s desperdiçados"
+                        )
+                    
+                    # Eficiência do cache de respostas (compartilhado entre sessões)
+                    cache_stats = llm_response_cache.get_stats()
+                    if cache_stats['hits'] + cache_stats['misses'] > 0:
+                        st.caption(
+                            f"⚡ Cache de respostas: {cache_stats['hit_rate']:.0%} de acerto "
+                            f"({cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']}, "
+                            f"{cache_stats['semantic_hits']} por similaridade, "
+                            f"{cache_stats['size']}/{cache_stats['max_size']} entradas)"
+                        )
                 else:
                     st.warning("⚠️ Agente não configurado")
                     
@@ -226,15 +302,65 @@ def render_sidebar():
                     st.code(traceback.format_exc())
                 st.session_state.df = None
                 st.session_state.agent_executor = None
+                precompute_worker.cancel(st.session_state.session_id)
+        else:
+            # Arquivo removido: nada a pré-calcular
+            precompute_worker.cancel(st.session_state.session_id)
         
         # Botão para limpar sessão
         if st.button("🔄 Nova Análise"):
             logger.info("Clearing session state")
+            precompute_worker.cancel(st.session_state.session_id)
             for key in list(st.session_state.keys()):
                 del st.session_state[key]
             st.rerun()
 
 
+def _render_precompute_status():
+    """Mostra o progresso do pré-cálculo em segundo plano, atualizado enquanto ele roda."""
+    job = precompute_worker.get_job(st.session_state.session_id)
+    if job is None:
+        return
+    
+    @st.fragment(run_every=settings.PRECOMPUTE_CONFIG["refresh_seconds"] if job.running else None)
+    def precompute_status():
+        status = job.get_status()
+        if status['status'] == 'running':
+            st.progress(status['progress'], text=(
+                f"⚙️ Pré-calculando análises ({status['done']}/{status['total']}): {status['current'] or '...'}"
+            ))
+        elif status['status'] == 'done':
+            st.caption(f"⚡ Análises pré-calculadas em {status['elapsed']:.1f}s "
+                       f"(perfil, outliers, correlação e histogramas)")
+        elif status['status'] == 'error':
+            st.caption(f"⚠️ Pré-cálculo interrompido: {status['error']}")
+    
+    precompute_status()
+
+
+def _provider_metrics_table() -> pd.DataFrame:
+    """Monta a tabela de latência, primeiro token e erros por provider."""
+    def seconds(value):
+        return f"{value:.1f}s" if value is not None else "—"
+    
+    circuit_labels = {'closed': "fechado", 'open': "aberto", 'half_open': "meio-aberto"}
+    
+    rows = []
+    for name, status in llm_fallback_manager.get_status().items():
+        metrics = status['metrics']
+        rows.append({
+            'Provider': name,
+            'Chamadas': metrics['samples'],
+            'p50': seconds(metrics['p50']),
+            'p95': seconds(metrics['p95']),
+            '1º token': seconds(metrics['ttft_p50']),
+            'Erros': f"{metrics['error_rate']:.0%}",
+            'Circuito': circuit_labels[status['circuit']['state']],
+            'Disponível': "✅" if status['available'] else "⏸️"
+        })
+    return pd.DataFrame(rows)
+
+
 def render_chat_interface():
     """Renderiza a interface de chat principal."""
     if st.session_state.df is not None and st.session_state.agent_executor is not None:
@@ -242,17 +368,15 @@ def render_chat_interface():
         # Container para mensagens do chat
         st.subheader("💬 Chat de Análise")
         
-        # Exibir histórico de mensagens
-        for message in st.session_state.messages:
-            with st.chat_message(message["role"]):
-                if message["role"] == "user":
-                    st.write(message["content"])
-                else:
-                    # Para mensagens do assistente, verificar se há figuras
-                    if "figure" in message:
-                        st.plotly_chart(message["figure"], use_container_width=True)
-                    else:
-                        st.write(message["content"])
+        # Exibir histórico de mensagens (as antigas só são recarregadas sob demanda)
+        messages = st.session_state.messages
+        recent = settings.HISTORY_CONFIG["render_recent_messages"]
+        older_count = max(0, len(messages) - recent)
+        if older_count and st.checkbox(f"📜 Mostrar {older_count} mensagens anteriores", value=False):
+            for message in messages[:older_count]:
+                _render_message(message)
+        for message in messages[older_count:]:
+            _render_message(message)
         
         # Input do usuário
         if prompt := st.chat_input("Digite sua pergunta sobre os dados..."):
@@ -261,20 +385,35 @@ def render_chat_interface():
             with st.chat_message("user"):
                 st.write(prompt)
             
-            # Processar com o agente
-            _process_user_query(prompt)
+            # Processar com o agente (as ferramentas recebem os dados da sessão por contexto)
+            with use_data_context(DataContext.from_session_state()):
+                _process_user_query(prompt)
     else:
         # Mensagem quando não há dados carregados
         st.info("👈 Por favor, faça upload de um arquivo CSV na barra lateral para começar a análise.")
 
 
+def _render_message(message: dict):
+    """Renderiza uma mensagem do histórico do chat."""
+    with st.chat_message(message["role"]):
+        if message["role"] == "user":
+            st.write(message["content"])
+        else:
+            # Para mensagens do assistente, verificar se há figuras
+            if "figure" in message:
+                st.plotly_chart(message["figure"], use_container_width=True)
+            else:
+                st.write(message["content"])
+
+
 def _process_user_query(prompt: str):
     """Processa a pergunta do usuário com o agente."""
     import io
     import sys
     import plotly.graph_objects as go
     from langchain_core.messages import HumanMessage, AIMessage
-    from utils.callbacks import StreamlitCallbackHandler
+    from tools.figure_budget import get_figure_metrics
+    from utils.callbacks import StreamingAnswerHandler, StreamlitCallbackHandler
     from utils.memory import save_to_history
     
     with st.chat_message("assistant"):
@@ -285,10 +424,20 @@ def _process_user_query(prompt: str):
         with progress_container:
             status_placeholder = st.empty()
             progress_placeholder = st.empty()
+            stream_handler = None
             
             try:
                 # Criar callback handler
                 callback_handler = StreamlitCallbackHandler(progress_placeholder)
+                callbacks = [callback_handler]
+                
+                # Resposta parcial exibida token a token na mensagem do assistente
+                if settings.STREAMING_CONFIG["enabled"]:
+                    stream_handler = StreamingAnswerHandler(
+                        result_container.empty(),
+                        settings.STREAMING_CONFIG["render_interval"]
+                    )
+                    callbacks.append(stream_handler)
                 
                 # Status inicial
                 status_placeholder.info("🔍 Processando sua pergunta...")
@@ -298,40 +447,32 @@ def _process_user_query(prompt: str):
                 old_stdout = sys.stdout
                 sys.stdout = io.StringIO()
                 
-                # Executar o agente com callbacks
-                try:
-                    result = st.session_state.agent_executor.invoke(
-                        {"input": prompt},
-                        {"callbacks": [callback_handler]}
-                    )
-                except (NotImplementedError, Exception) as nie:
-                    # Verificar se é erro de rate limit
-                    if "429" in str(nie) or "rate limit" in str(nie).lower():
-                        logger.warning(f"Rate limit detected: {nie}")
-                        st.error("⚠️ Limite de requisições excedido. Mudando para modo offline...")
-                        
-                        # Usar agente offline
-                        from agents.offline_agent import offline_agent
-                        result = offline_agent.invoke({"input": prompt})
-                        
-                    else:
-                        # Outros erros - tentar sem memória
-                        logger.warning(f"Memory issue detected: {nie}")
-                        logger.info("Attempting without memory...")
-                        
-                        try:
-                            # Tentar executar sem memória
-                            result = st.session_state.agent_executor.invoke(
-                                {"input": prompt, "chat_history": []},
-                                {"callbacks": [callback_handler]}
-                            )
-                        except Exception as e2:
-                            # Se ainda falhar, usar modo offline
-                            logger.error(f"All attempts failed: {e2}")
-                            st.error("❌ LLM indisponível. Usando modo offline...")
-                            
-                            from agents.offline_agent import offline_agent
-                            result = offline_agent.invoke({"input": prompt})
+                # Nova pergunta: especulações ainda não iniciadas deixam de rodar
+                speculative_scheduler.cancel_pending(st.session_state.session_id)
+                
+                # Consultar o cache de respostas antes de chamar o LLM
+                from utils.llm_fallback import llm_fallback_manager
+                model_name = llm_fallback_manager.get_current_provider_info()['model']
+                fingerprint = dataset_fingerprint(st.session_state.df)
+                columns = list(st.session_state.df.columns)
+                # Histórico antes da pergunta: acompanhamentos só acertam na mesma conversa
+                conversation = conversation_digest(st.session_state.agent_memory)
+                result = llm_response_cache.get(prompt, fingerprint, model_name, columns, conversation)
+                from_cache = result is not None
+                answered_by_llm = from_cache
+                
+                if from_cache:
+                    status_placeholder.info("⚡ Resposta recuperada do cache")
+                    # Registrar a interação na memória do agente, como o invoke faria
+                    if st.session_state.agent_memory is not None:
+                        st.session_state.agent_memory.save_context(
+                            {"input": prompt}, {"output": str(result.get('output', ''))}
+                        )
+                else:
+                    # Executar o agente com callbacks
+                    result, answered_by_llm = _invoke_agent(prompt, callbacks)
+                    if answered_by_llm:
+                        llm_response_cache.put(prompt, fingerprint, model_name, result, columns, conversation)
                 
                 # Armazenar análise no histórico
                 tools_used = [step[0].tool if hasattr(step[0], 'tool') else 'unknown' 
@@ -342,9 +483,13 @@ def _process_user_query(prompt: str):
                 verbose_output = sys.stdout.getvalue()
                 sys.stdout = old_stdout
                 
-                # Limpar status
+                # Limpar status (a resposta final substitui o texto parcial)
                 status_placeholder.empty()
                 progress_placeholder.empty()
+                stream_metrics = None
+                if stream_handler is not None:
+                    stream_metrics = stream_handler.get_metrics()
+                    stream_handler.clear()
                 
                 logger.info("Agent processing completed successfully")
                 
@@ -398,6 +543,9 @@ def _process_user_query(prompt: str):
                             **⏱️ Rate Limit:** {provider_info.get('rate_limit', 'N/A')} req/dia
                             ---
                             """
+                            if result.get('routed_by'):
+                                # Respondida pelo roteador: nenhum modelo foi consultado
+                                model_header = "---\n**⚡ Resposta direta da ferramenta** (sem LLM)\n\n---"
                             
                             # Exibir cabeçalho e resposta
                             st.markdown(model_header)
@@ -415,6 +563,9 @@ def _process_user_query(prompt: str):
                 st.session_state.chat_history.append(HumanMessage(content=prompt))
                 st.session_state.chat_history.append(AIMessage(content=str(output)))
                 
+                # Enquanto o usuário lê a resposta, adiantar as análises seguintes prováveis
+                _schedule_speculation(prompt, result, compact=answered_by_llm)
+                
                 # Mostrar detalhes do processamento
                 with st.expander("🔍 Detalhes do Processamento"):
                     col1, col2 = st.columns(2)
@@ -425,15 +576,44 @@ def _process_user_query(prompt: str):
                             st.code(verbose_output, language="text")
                     
                     with col2:
+                        if from_cache:
+                            st.markdown("**⚡ Resposta obtida do cache** (sem chamada ao LLM)")
+                        elif result.get('routed_by'):
+                            routed_by = result['routed_by']
+                            st.markdown(f"**⚡ Resposta direta** com `{routed_by['tool']}` em "
+                                        f"{routed_by['seconds'] * 1000:.0f} ms (sem chamada ao LLM)")
+                        elif stream_metrics is not None:
+                            first_token = stream_metrics['time_to_first_token']
+                            st.markdown(
+                                f"**⏱️ Latência:** {stream_metrics['total_latency']:.1f} s total"
+                                + (f", primeiro token em {first_token:.1f} s" if first_token is not None else "")
+                            )
                         st.markdown("**🔧 Ferramentas Utilizadas:**")
                         if "intermediate_steps" in result:
                             for i, step in enumerate(result["intermediate_steps"], 1):
                                 if hasattr(step[0], 'tool'):
                                     st.write(f"{i}. {step[0].tool}")
+
+                        # Tamanho e tempo de construção das figuras geradas
+                        figure_metrics = [
+                            get_figure_metrics(step[1]) for step in result.get("intermediate_steps", [])
+                            if len(step) > 1 and isinstance(step[1], go.Figure)
+                        ]
+                        figure_metrics = [m for m in figure_metrics if m]
+                        if figure_metrics:
+                            st.markdown("**📦 Figuras:**")
+                            for metrics in figure_metrics:
+                                line = (f"- {metrics['tool']}: {metrics['bytes'] / 1024:.0f} KB, "
+                                        f"{metrics['build_seconds'] * 1000:.0f} ms")
+                                if metrics['degraded']:
+                                    line += f" (reduzida de {metrics['original_bytes'] / 1024:.0f} KB)"
+                                st.write(line)
                 
             except Exception as e:
                 status_placeholder.empty()
                 progress_placeholder.empty()
+                if stream_handler is not None:
+                    stream_handler.clear()
                 
                 logger.error(f"Error processing question: {e}")
                 logger.error(traceback.format_exc())
@@ -455,6 +635,146 @@ def _process_user_query(prompt: str):
                 })
 
 
+def _invoke_agent(prompt: str, callbacks: list):
+    """
+    Executa o agente LLM com os fallbacks (próximo provider e modo offline).
+    
+    Returns:
+        Tupla (resultado, True se a resposta veio do LLM e não do modo offline)
+    """
+    from agents.offline_agent import offline_agent
+    
+    # Perguntas simples e sem ambiguidade: executar a ferramenta diretamente
+    routed = query_router.route(prompt)
+    if routed is not None:
+        _remember_routed_answer(prompt, routed)
+        return routed, False
+    
+    answered_by_llm = True
+    try:
+        # Erros transitórios já foram repetidos com backoff dentro do cliente do provider
+        result = _run_agent({"input": prompt}, callbacks)
+    except (RateLimitExceeded, CircuitOpenError) as unavailable:
+        # Provider sem orçamento (local ou 429) ou com o circuito aberto: tentar o próximo
+        logger.warning(str(unavailable))
+        result, answered_by_llm = _reroute_after_provider_error(prompt, callbacks, unavailable)
+    except TimeoutError:
+        logger.error("Agent run timed out and was cancelled")
+        st.error("⏱️ O LLM demorou demais para responder. Usando modo offline...")
+        result = offline_agent.invoke({"input": prompt})
+        answered_by_llm = False
+    except Exception as e:
+        if is_context_overflow(e):
+            # O histórico não cabe no contexto do modelo: tentar apenas com a pergunta. A memória
+            # sobrescreveria o chat_history vazio, então a nova tentativa usa um executor sem ela
+            logger.warning(f"Context overflow, retrying without chat history: {e}")
+            executor = st.session_state.agent_executor
+            try:
+                result = _run_agent({"input": prompt, "chat_history": []}, callbacks,
+                                    executor.model_copy(update={"memory": None}))
+                if executor.memory is not None:
+                    executor.memory.save_context({"input": prompt}, {"output": str(result.get('output', ''))})
+                return result, True
+            except Exception as e2:
+                e = e2
+        
+        logger.error(f"LLM request failed ({classify_error(e)}): {e}")
+        if classify_error(e) == PERMANENT:
+            st.error("❌ O LLM recusou a requisição. Usando modo offline...")
+        else:
+            st.error("❌ LLM indisponível. Usando modo offline...")
+        result = offline_agent.invoke({"input": prompt})
+        answered_by_llm = False
+    
+    return result, answered_by_llm
+
+
+def _schedule_speculation(prompt: str, result: dict, compact: bool) -> None:
+    """Agenda as ferramentas seguintes prováveis para as colunas discutidas na resposta."""
+    from agents.offline_agent import offline_agent
+    
+    df = st.session_state.get('df')
+    if df is None:
+        return
+    if result.get('routed_by'):
+        tool_name, params = result['routed_by']['tool'], result['routed_by']['params']
+    elif result.get('intermediate_steps'):
+        action = result['intermediate_steps'][-1][0]
+        tool_name = getattr(action, 'tool', None)
+        params = getattr(action, 'tool_input', None)
+        params = params if isinstance(params, dict) else {}
+    else:
+        return
+    try:
+        columns = offline_agent.scan(prompt, df).columns(whole_words=True)
+        speculative_scheduler.schedule(st.session_state.session_id, df, tool_name, params, columns,
+                                       compact=compact)
+    except Exception as e:
+        logger.warning(f"Could not schedule speculative analyses: {e}")
+
+
+def _remember_routed_answer(prompt: str, result: dict) -> None:
+    """Registra na memória do agente a resposta dada pelo roteador, como o invoke faria."""
+    import plotly.graph_objects as go
+    
+    memory = st.session_state.agent_memory
+    if memory is None:
+        return
+    output = result.get('output', '')
+    if isinstance(output, go.Figure):
+        decision = result['routed_by']
+        params = ", ".join(f"{key}={value}" for key, value in decision['params'].items())
+        output = f"[Gráfico exibido: {decision['tool']}({params})]"
+    memory.save_context({"input": prompt}, {"output": str(output)})
+
+
+def _run_agent(inputs: dict, callbacks: list, executor=None) -> dict:
+    """Executa o agente (por padrão, o da sessão): no event loop compartilhado ou de forma síncrona."""
+    executor = executor or st.session_state.agent_executor
+    if settings.ASYNC_CONFIG["enabled"]:
+        return async_agent_runner.invoke(executor, inputs, callbacks)
+    return executor.invoke(inputs, {"callbacks": callbacks})
+
+
+def _reroute_after_provider_error(prompt: str, callbacks: list, error):
+    """
+    Recria o agente com o próximo provider disponível (fallback automático)
+    ou usa o modo offline quando o modelo foi selecionado manualmente.
+    
+    Args:
+        error: `RateLimitExceeded` ou `CircuitOpenError` do provider atual
+    
+    Returns:
+        Tupla (resultado, True se a resposta veio do LLM)
+    """
+    from agents.offline_agent import offline_agent
+    
+    rate_limited = isinstance(error, RateLimitExceeded)
+    if rate_limited and error.__cause__ is not None:
+        # 429 real do provider (não apenas o orçamento local): período de cooldown
+        llm_fallback_manager.report_rate_limit(error.provider)
+    
+    if st.session_state.selected_model_index is None:
+        try:
+            # Mantém a memória da sessão; get_llm pula providers indisponíveis
+            st.session_state.agent_executor = create_eda_agent(memory=st.session_state.agent_memory)
+            provider_name = llm_fallback_manager.get_current_provider_info()['name']
+            if provider_name != error.provider:
+                reason = "sem orçamento de requisições" if rate_limited else "com falhas seguidas"
+                st.warning(f"⏱️ {error.provider} {reason}. Usando {provider_name}...")
+                return _run_agent({"input": prompt}, callbacks), True
+        except Exception as e:
+            logger.error(f"Rerouting after provider error failed: {e}")
+    
+    if rate_limited:
+        st.error(f"⚠️ Limite de requisições de {error.provider} atingido "
+                 f"(disponível em {error.retry_after:.0f}s). Usando modo offline...")
+    else:
+        st.error(f"⚠️ {error.provider} indisponível após falhas seguidas "
+                 f"(nova tentativa em {error.retry_after:.0f}s). Usando modo offline...")
+    return offline_agent.invoke({"input": prompt}), False
+
+
 def render_suggestions():
     """Renderiza sugestões de perguntas organizadas por categoria."""
     with st.expander("💡 Sugestões de Perguntas", expanded=False):
@@ -582,3 +902,13 @@ def render_history():
                 timestamp = analysis.get('timestamp', 'Não registrado')
                 st.write(f"- Timestamp: {timestamp}")
                 st.markdown("---")
+
+            # Uso de memória do histórico da sessão
+            if 'history_budget' in st.session_state:
+                stats = st.session_state.history_budget.get_stats().values()
+                in_memory = sum(s['memory_bytes'] + s['compressed_bytes'] for s in stats)
+                st.caption(
+                    f"💾 Histórico da sessão: {in_memory / 1024**2:.1f} MB em memória, "
+                    f"{sum(s['compressed'] for s in stats)} entradas comprimidas, "
+                    f"{sum(s['on_disk'] for s in stats)} em disco"
+                )
@@ -0,0 +1,159 @@
+"""
+Execução assíncrona do agente em um event loop compartilhado pelo processo.
+
+Com `ASYNC_CONFIG["enabled"]`, as perguntas são executadas via `ainvoke` em um
+único event loop em segundo plano: as chamadas HTTP aos LLMs de todas as
+sessões são multiplexadas no loop, em vez de ocuparem uma thread cada durante
+a espera. A thread do script do Streamlit apenas drena a fila de eventos de
+callback (que só podem ser exibidos nela) e pode cancelar a execução, por
+exemplo quando o usuário interrompe ou reenvia a pergunta.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from config.settings import settings
+from tools.context import get_active_context, use_data_context
+
+logger = logging.getLogger(__name__)
+
+# Contexto de script do Streamlit da sessão que disparou a execução assíncrona
+_script_ctx: contextvars.ContextVar = contextvars.ContextVar('script_run_ctx', default=None)
+
+
+def run_with_script_context(script_ctx, func, *args, **kwargs):
+    """Executa `func` na thread atual associada ao contexto de script da sessão."""
+    if script_ctx is not None:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx
+        add_script_run_ctx(threading.current_thread(), script_ctx)
+    return func(*args, **kwargs)
+
+
+def with_async_support(tools: list) -> list:
+    """
+    Retorna cópias das ferramentas com uma versão assíncrona.
+
+    A versão assíncrona executa a função síncrona no pool de ferramentas, com o
+    contexto de script da sessão, para que `st.session_state` continue acessível.
+    """
+    return [tool.model_copy(update={'coroutine': _make_coroutine(tool.func)})
+            if getattr(tool, 'func', None) and getattr(tool, 'coroutine', None) is None else tool
+            for tool in tools]
+
+
+def _make_coroutine(func):
+    @functools.wraps(func)
+    async def coroutine(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        call = functools.partial(run_with_script_context, _script_ctx.get(), func, *args, **kwargs)
+        return await loop.run_in_executor(async_agent_runner.tool_pool, contextvars.copy_context().run, call)
+    return coroutine
+
+
+class QueueingCallbackHandler(BaseCallbackHandler):
+    """Enfileira os eventos de callback para reexecutá-los na thread do script."""
+
+    run_inline = True
+
+    _EVENTS = ('on_llm_start', 'on_llm_new_token', 'on_llm_end', 'on_tool_start', 'on_tool_end',
+               'on_chain_start', 'on_agent_action', 'on_agent_finish')
+
+    def __init__(self, handlers: List[BaseCallbackHandler]):
+        self.handlers = handlers
+        self.events: "queue.Queue" = queue.Queue()
+        for name in self._EVENTS:
+            setattr(self, name, functools.partial(self._enqueue, name))
+
+    def _enqueue(self, name: str, *args, **kwargs) -> None:
+        self.events.put((name, args, kwargs))
+
+    def drain(self) -> None:
+        """Repassa os eventos pendentes aos handlers originais (na thread do script)."""
+        while True:
+            try:
+                name, args, kwargs = self.events.get_nowait()
+            except queue.Empty:
+                return
+            for handler in self.handlers:
+                try:
+                    getattr(handler, name)(*args, **kwargs)
+                except Exception as e:
+                    logger.warning(f"Callback {name} failed: {e}")
+
+
+class AsyncAgentRunner:
+    """Event loop em segundo plano que executa os agentes de todas as sessões."""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = config or settings.ASYNC_CONFIG
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self.tool_pool = ThreadPoolExecutor(max_workers=self.config["tool_workers"],
+                                            thread_name_prefix="async-tool")
+        self.in_flight = 0
+
+    @property
+    def loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        """Event loop em segundo plano, se já iniciado."""
+        return self._loop
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="agent-event-loop",
+                                 daemon=True).start()
+                logger.info("Started background event loop for async agent runs")
+            return self._loop
+
+    async def _run(self, executor, inputs: Dict[str, Any], callbacks: list, script_ctx, data_context,
+                   timeout: float):
+        _script_ctx.set(script_ctx)
+        self.in_flight += 1
+        try:
+            # O contexto de dados segue para as threads das ferramentas junto com o restante
+            with use_data_context(data_context):
+                return await asyncio.wait_for(executor.ainvoke(inputs, {"callbacks": callbacks}), timeout)
+        finally:
+            self.in_flight -= 1
+
+    def submit(self, executor, inputs: Dict[str, Any], callbacks: list = None, timeout: float = None):
+        """Agenda a execução no loop e retorna um `concurrent.futures.Future`."""
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        coroutine = self._run(executor, inputs, callbacks or [], get_script_run_ctx(suppress_warning=True),
+                              get_active_context(), timeout or self.config["timeout"])
+        return asyncio.run_coroutine_threadsafe(coroutine, self._get_loop())
+
+    def invoke(self, executor, inputs: Dict[str, Any], callbacks: list = None,
+               timeout: float = None) -> Dict[str, Any]:
+        """
+        Executa o agente no loop, exibindo os callbacks na thread atual.
+
+        Se a thread for interrompida (ex.: rerun do Streamlit), a execução é
+        cancelada no loop. Estouro de `timeout` levanta `TimeoutError`.
+        """
+        proxy = QueueingCallbackHandler(callbacks or [])
+        future = self.submit(executor, inputs, [proxy], timeout)
+        try:
+            while not future.done():
+                proxy.drain()
+                time.sleep(self.config["poll_interval"])
+            proxy.drain()
+            return future.result()
+        except BaseException:
+            if future.cancel():
+                logger.info("Async agent run cancelled")
+            raise
+
+
+# Instância global
+async_agent_runner = AsyncAgentRunner()
@@ -3,6 +3,7 @@ Callbacks personalizados para o EDA Agent.
 """
 
 import streamlit as st
+import time
 from datetime import datetime
 from typing import Dict, Any, List
 import logging
@@ -130,3 +131,61 @@ class StreamlitCallbackHandler(BaseCallbackHandler):
         """Limpa os passos armazenados."""
         self.steps = []
         self.container.empty()
+
+
+class StreamingAnswerHandler(BaseCallbackHandler):
+    """Callback handler que exibe a resposta do LLM token a token no Streamlit."""
+    
+    def __init__(self, placeholder, render_interval: float = 0.1):
+        """
+        Inicializa o handler de streaming.
+        
+        Args:
+            placeholder: Placeholder do Streamlit (st.empty) da mensagem do assistente
+            render_interval: Intervalo mínimo em segundos entre atualizações da tela
+        """
+        self.placeholder = placeholder
+        self.render_interval = render_interval
+        self.text = ""
+        self.started_at = time.perf_counter()
+        self.first_token_at = None
+        self.tokens = 0
+        self._last_render = 0.0
+        self._run_id = None
+    
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs) -> None:
+        """Cada chamada ao LLM (passo do agente) começa um novo texto parcial."""
+        self.text = ""
+        self._run_id = kwargs.get('run_id')
+    
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        """Acrescenta o token ao texto parcial (chunks de chamadas de ferramenta vêm vazios)."""
+        # Com hedging, duas chamadas podem gerar tokens ao mesmo tempo: exibir só a mais recente
+        if not token or kwargs.get('run_id') != self._run_id:
+            return
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+            logger.info(f"Time to first token: {now - self.started_at:.2f}s")
+        self.tokens += 1
+        self.text += token
+        if now - self._last_render >= self.render_interval:
+            self._last_render = now
+            self.placeholder.markdown(self.text + "▌")
+    
+    def on_llm_end(self, response, **kwargs) -> None:
+        if self.text:
+            self.placeholder.markdown(self.text)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Retorna tempo até o primeiro token, latência total e tokens recebidos."""
+        return {
+            'time_to_first_token': (self.first_token_at - self.started_at
+                                    if self.first_token_at is not None else None),
+            'total_latency': time.perf_counter() - self.started_at,
+            'tokens': self.tokens
+        }
+    
+    def clear(self):
+        """Remove o texto parcial (a resposta final é exibida no lugar)."""
+        self.placeholder.empty()
@@ -0,0 +1,266 @@
+"""
+Índice aproximado de nomes de colunas.
+
+Resolve referências a colunas que não coincidem com o nome exato: "valor da
+transação" → `transaction_amount`, "Transaction Amount" → `transactionAmount`,
+"idade cliente" → `customer_age`. Os nomes são quebrados em palavras
+(underscore, hífen, camelCase), sem acentos e no singular; cada palavra é
+indexada por n-gramas de caracteres e por um pequeno dicionário de sinônimos
+português/inglês. Uma consulta visita apenas as colunas que compartilham alguma
+palavra (exata, sinônima ou parecida) com o texto, e as candidatas são
+ordenadas pela fração ponderada (IDF) do nome coberta pela consulta.
+"""
+
+import logging
+import math
+import re
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import pandas as pd
+
+from config.settings import settings
+from utils.dataset_cache import dataset_cache
+from utils.semantic_cache import STOPWORDS, fold_text
+
+logger = logging.getLogger(__name__)
+
+# Sinônimos comuns em nomes de colunas (sem acentos, no singular); aplicados nos dois sentidos
+COLUMN_SYNONYMS = {
+    'valor': ('amount', 'value'), 'quantia': ('amount',), 'montante': ('amount', 'total'),
+    'transacao': ('transaction',), 'quantidade': ('quantity', 'qty', 'count'),
+    'preco': ('price',), 'custo': ('cost',), 'data': ('date',), 'tempo': ('time',),
+    'hora': ('hour', 'time'), 'dia': ('day',), 'mes': ('month',), 'ano': ('year',),
+    'idade': ('age',), 'classe': ('class', 'label'), 'rotulo': ('label',),
+    'categoria': ('category',), 'tipo': ('type',), 'nome': ('name',),
+    'cliente': ('customer', 'client'), 'usuario': ('user',), 'produto': ('product',),
+    'venda': ('sale',), 'receita': ('revenue',), 'lucro': ('profit',),
+    'desconto': ('discount',), 'saldo': ('balance',), 'renda': ('income',),
+    'salario': ('salary',), 'peso': ('weight',), 'altura': ('height',),
+    'sexo': ('sex', 'gender'), 'genero': ('gender',), 'cidade': ('city',),
+    'estado': ('state',), 'pai': ('country',), 'regiao': ('region',),
+    'fraude': ('fraud',), 'taxa': ('rate',), 'pontuacao': ('score',),
+    'nota': ('score', 'rating'), 'duracao': ('duration',), 'distancia': ('distance',),
+    'temperatura': ('temperature',), 'identificador': ('id',),
+}
+
+_CAMEL_RE = re.compile(r'(?<=[a-z])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])')
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Palavras em mais colunas do que isso não geram candidatas sozinhas
+_COMMON_POSTINGS = 256
+
+
+def _singular(word: str) -> str:
+    """Singular aproximado (português e inglês), aplicado igualmente a colunas e consultas."""
+    if len(word) <= 3 or not word.isalpha():
+        return word
+    if word.endswith('oes') or word.endswith('aes'):
+        return word[:-3] + 'ao'
+    if word.endswith('ais'):
+        return word[:-3] + 'al'
+    if word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def split_name(text: str, drop_stopwords: bool = False) -> List[str]:
+    """Palavras normalizadas de um nome de coluna ou trecho de pergunta."""
+    words = _TOKEN_RE.findall(fold_text(_CAMEL_RE.sub(' ', str(text))))
+    if drop_stopwords:
+        words = [word for word in words if word not in STOPWORDS]
+    return [_singular(word) for word in words]
+
+
+def _synonyms() -> Dict[str, Set[str]]:
+    table = defaultdict(set)
+    for word, equivalents in COLUMN_SYNONYMS.items():
+        for equivalent in equivalents:
+            table[word].add(equivalent)
+            table[equivalent].add(word)
+    return table
+
+
+_SYNONYMS = _synonyms()
+
+
+class ColumnMatch(NamedTuple):
+    column: Any
+    score: float  # Fração ponderada do nome da coluna coberta pela consulta
+    query_coverage: float  # Fração das palavras da consulta usadas pela coluna
+    position: int  # Posição (em palavras) da primeira palavra da consulta que casou
+
+
+class ColumnIndex:
+    """Índice de n-gramas e palavras sobre os nomes das colunas de um dataset."""
+
+    def __init__(self, columns: Iterable[Any], config: Dict[str, Any] = None):
+        started = time.perf_counter()
+        self.config = config or settings.COLUMN_INDEX_CONFIG
+        self.columns = list(columns)
+        self._column_tokens: List[Tuple[str, ...]] = []
+        self._column_token_sets: List[frozenset] = []
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        self._compact: Dict[str, List[int]] = defaultdict(list)
+        for i, column in enumerate(self.columns):
+            # Palavras vazias do nome (ex.: "de" em numeroDeParcelas) não precisam ser citadas
+            tokens = tuple(dict.fromkeys(split_name(column, drop_stopwords=True) or split_name(column)))
+            self._column_tokens.append(tokens)
+            self._column_token_sets.append(frozenset(tokens))
+            for token in tokens:
+                self._postings[token].append(i)
+            self._compact[''.join(split_name(column))].append(i)
+
+        n = max(len(self.columns), 1)
+        self._idf = {token: math.log(1 + n / len(cols)) for token, cols in self._postings.items()}
+        self._weights = [sum(self._idf[t] for t in tokens) or 1.0 for tokens in self._column_tokens]
+
+        self._grams: Dict[str, Set[str]] = defaultdict(set)
+        self._token_grams: Dict[str, Set[str]] = {}
+        for token in self._postings:
+            if token.isalpha() and len(token) >= 3:
+                grams = self._ngrams(token)
+                self._token_grams[token] = grams
+                for gram in grams:
+                    self._grams[gram].add(token)
+        self._similar_cache: Dict[str, List[Tuple[str, float]]] = {}
+        self.build_seconds = time.perf_counter() - started
+        logger.info(f"Built column index over {len(self.columns)} columns "
+                    f"({len(self._postings)} words) in {self.build_seconds * 1000:.0f} ms")
+
+    def _ngrams(self, word: str) -> Set[str]:
+        n = self.config["ngram_size"]
+        padded = f" {word} "
+        return {padded[i:i + n] for i in range(max(len(padded) - n + 1, 1))}
+
+    def _similar(self, word: str) -> List[Tuple[str, float]]:
+        """Palavras do índice equivalentes a `word`: exata (1.0), sinônima (0.9) ou parecida."""
+        cached = self._similar_cache.get(word)
+        if cached is not None:
+            return cached
+        similar = {}
+        if word in self._postings:
+            similar[word] = 1.0
+        for synonym in _SYNONYMS.get(word, ()):
+            if synonym in self._postings:
+                similar.setdefault(synonym, 0.9)
+        if word.isalpha() and len(word) >= 3:
+            grams = self._ngrams(word)
+            shared = Counter(token for gram in grams for token in self._grams.get(gram, ()))
+            for token, count in shared.items():
+                score = 2 * count / (len(grams) + len(self._token_grams[token]))
+                short, long_ = sorted((word, token), key=len)
+                if len(short) >= 4 and long_.startswith(short):
+                    score = max(score, 0.8)
+                if score >= self.config["min_similarity"]:
+                    similar[token] = max(similar.get(token, 0.0), min(score, 0.85))
+        result = sorted(similar.items(), key=lambda item: -item[1])
+        if len(self._similar_cache) < 4096:
+            self._similar_cache[word] = result
+        return result
+
+    def rank(self, text: str, among: Optional[Set[Any]] = None) -> List[ColumnMatch]:
+        """
+        Colunas candidatas para um trecho de texto, da melhor para a pior.
+
+        Args:
+            text: Pergunta ou nome de coluna informado
+            among: Restringe a busca a estas colunas (ex.: apenas numéricas)
+        """
+        words = split_name(text, drop_stopwords=True)
+        if not words:
+            return []
+        matched: Dict[int, Dict[str, Tuple[float, int]]] = defaultdict(dict)
+        used: Dict[int, Set[int]] = defaultdict(set)
+
+        def add(i: int, token: str, similarity: float, position: int) -> None:
+            current = matched[i].get(token)
+            if current is None or similarity > current[0]:
+                matched[i][token] = (similarity, position if current is None else current[1])
+            used[i].add(position)
+
+        # Palavras presentes em muitas colunas (ex.: "feature" em feature_1..feature_5000)
+        # não identificam uma coluna: só reforçam as candidatas trazidas por palavras raras
+        common = []
+        for position, word in enumerate(words):
+            for token, similarity in self._similar(word):
+                postings = self._postings[token]
+                if len(postings) > _COMMON_POSTINGS:
+                    common.append((token, similarity, position))
+                    continue
+                for i in postings:
+                    if among is None or self.columns[i] in among:
+                        add(i, token, similarity, position)
+        for token, similarity, position in common:
+            for i in list(matched):
+                if token in self._column_token_sets[i]:
+                    add(i, token, similarity, position)
+
+        candidates = []
+        for i, tokens in matched.items():
+            # Média geométrica da cobertura ponderada (IDF) e da cobertura simples do nome:
+            # uma palavra rara sozinha (ex.: "17" em feature_17) não basta
+            weighted = sum(self._idf[t] * similarity for t, (similarity, _) in tokens.items()) / self._weights[i]
+            plain = sum(similarity for similarity, _ in tokens.values()) / len(self._column_tokens[i])
+            position = min(pos for _, pos in tokens.values())
+            candidates.append(ColumnMatch(self.columns[i], math.sqrt(weighted * plain),
+                                          len(used[i]) / len(words), position))
+        candidates.sort(key=lambda match: (-match.score, match.position))
+        return candidates
+
+    def search(self, text: str, among: Optional[Set[Any]] = None, limit: int = None) -> List[ColumnMatch]:
+        """Colunas citadas (aproximadamente) em uma pergunta, acima de `min_score`."""
+        limit = limit or self.config["max_candidates"]
+        return [match for match in self.rank(text, among) if match.score >= self.config["min_score"]][:limit]
+
+    def resolve(self, name: str, among: Optional[Set[Any]] = None) -> Optional[Any]:
+        """
+        Coluna correspondente a um nome informado (pelo usuário ou pelo LLM).
+
+        Aceita o nome exato, variações de caixa/separadores/acentos e, por fim, a
+        melhor candidata aproximada, desde que não haja empate próximo.
+        """
+        if name in self.columns and (among is None or name in among):
+            return name
+        compact = [self.columns[i] for i in self._compact.get(''.join(split_name(name)), ())
+                   if among is None or self.columns[i] in among]
+        if len(compact) == 1:
+            return compact[0]
+
+        ranked = sorted(((match.score + match.query_coverage) / 2, match.column)
+                        for match in self.rank(name, among))[::-1]
+        if not ranked or ranked[0][0] < self.config["min_score"]:
+            return None
+        if len(ranked) > 1 and ranked[0][0] - ranked[1][0] < self.config["resolve_margin"]:
+            return None
+        return ranked[0][1]
+
+    def suggest(self, name: str, limit: int = 3) -> List[Any]:
+        """Colunas mais parecidas com um nome inexistente, para mensagens de erro."""
+        return [match.column for match in self.rank(name)[:limit]]
+
+
+def get_column_index(df: pd.DataFrame) -> ColumnIndex:
+    """Retorna o índice de colunas do dataset (construído uma vez por dataset)."""
+    return dataset_cache.get_or_compute(df, 'column_index', lambda: ColumnIndex(df.columns))
+
+
+def resolve_column(df: pd.DataFrame, name: Optional[str]) -> Optional[Any]:
+    """Nome exato da coluna citada por `name`, ou None se não houver correspondência segura."""
+    if name is None or name in df.columns:
+        return name
+    if not settings.COLUMN_INDEX_CONFIG["enabled"]:
+        return None
+    column = get_column_index(df).resolve(str(name))
+    if column is not None:
+        logger.info(f"Resolved column name '{name}' to '{column}'")
+    return column
+
+
+def column_suggestions(df: pd.DataFrame, name: str) -> str:
+    """Trecho de mensagem de erro com as colunas mais parecidas (vazio se não houver)."""
+    if not settings.COLUMN_INDEX_CONFIG["enabled"]:
+        return ""
+    similar = get_column_index(df).suggest(str(name))
+    return f" Colunas parecidas: {', '.join(map(str, similar))}." if similar else ""
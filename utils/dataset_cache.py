@@ -0,0 +1,249 @@
+"""
+Cache de resultados derivados do dataset carregado.
+
+Estatísticas por coluna (média, desvio, quantis, cercas de outliers) são
+calculadas uma única vez por dataset e reaproveitadas por todas as ferramentas
+e sessões do processo, evitando cópias e varreduras repetidas do DataFrame.
+"""
+
+import hashlib
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable
+
+import numpy as np
+import pandas as pd
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_fingerprints: Dict[int, tuple] = {}
+_fingerprints_lock = threading.Lock()
+
+
+def dataset_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Calcula um identificador estável do DataFrame.
+
+    Usa dimensões, colunas, tipos e o hash de todas as linhas: datasets que
+    diferem em qualquer valor têm fingerprints distintos (o cache é compartilhado
+    pelas sessões do processo). O resultado é memorizado por objeto, então a
+    varredura acontece uma vez por upload; o DataFrame carregado é tratado como
+    imutável.
+
+    Args:
+        df: DataFrame a identificar
+
+    Returns:
+        str: Fingerprint hexadecimal
+    """
+    with _fingerprints_lock:
+        cached = _fingerprints.get(id(df))
+        if cached is not None and cached[0]() is df:
+            return cached[1]
+
+    digest = hashlib.sha1()
+    digest.update(repr(df.shape).encode())
+    digest.update(repr(list(zip(map(str, df.columns), map(str, df.dtypes)))).encode())
+    if len(df) > 0:
+        digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    fingerprint = digest.hexdigest()
+
+    with _fingerprints_lock:
+        key = id(df)
+        _fingerprints[key] = (weakref.ref(df), fingerprint)
+        weakref.finalize(df, _fingerprints.pop, key, None)
+    return fingerprint
+
+
+class DatasetCache:
+    """Cache LRU de resultados por dataset, seguro para uso entre threads."""
+
+    def __init__(self, max_datasets: int = None):
+        """
+        Inicializa o cache.
+
+        Args:
+            max_datasets: Número máximo de datasets mantidos
+        """
+        self.max_datasets = max_datasets or settings.DATASET_CACHE_CONFIG["max_datasets"]
+        self._data: "OrderedDict[str, Dict[Hashable, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get_or_compute(self, df: pd.DataFrame, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Retorna o valor em cache para o dataset ou calcula e armazena.
+
+        Args:
+            df: DataFrame ao qual o valor se refere
+            key: Chave do resultado (ex.: ('summary', 'Amount'))
+            compute: Função sem argumentos que calcula o valor
+
+        Returns:
+            Any: Valor em cache ou recém-calculado
+        """
+        fingerprint = dataset_fingerprint(df)
+        with self._lock:
+            entries = self._data.get(fingerprint)
+            if entries is not None:
+                self._data.move_to_end(fingerprint)
+                if key in entries:
+                    return entries[key]
+
+        # Calcular fora do lock para não serializar ferramentas concorrentes
+        value = compute()
+
+        with self._lock:
+            entries = self._data.setdefault(fingerprint, {})
+            self._data.move_to_end(fingerprint)
+            entries[key] = value
+            while len(self._data) > self.max_datasets:
+                evicted, _ = self._data.popitem(last=False)
+                logger.info(f"Evicted dataset {evicted[:10]} from dataset cache")
+        return value
+
+    def contains(self, df: pd.DataFrame, key: Hashable) -> bool:
+        """Verifica se o resultado já está em cache."""
+        fingerprint = dataset_fingerprint(df)
+        with self._lock:
+            return key in self._data.get(fingerprint, {})
+
+    def invalidate(self, df: pd.DataFrame = None) -> None:
+        """Remove os resultados de um dataset (ou de todos, se nenhum for informado)."""
+        with self._lock:
+            if df is None:
+                self._data.clear()
+            else:
+                self._data.pop(dataset_fingerprint(df), None)
+
+
+# Instância global
+dataset_cache = DatasetCache()
+
+
+def get_column_summary(df: pd.DataFrame, column: str) -> Dict[str, float]:
+    """
+    Retorna o resumo de uma coluna numérica: momentos, quantis e outliers (IQR).
+
+    Args:
+        df: DataFrame com os dados
+        column: Nome da coluna numérica
+
+    Returns:
+        Dict[str, float]: count, mean, std (populacional), min, q1, median, q3,
+        max, iqr, lower_fence, upper_fence, whisker_low, whisker_high, n_outliers,
+        e as listas extremes_low/extremes_high com os outliers mais extremos de
+        cada lado (até VISUALIZATION_CONFIG["boxplot_outlier_points"])
+    """
+    return dataset_cache.get_or_compute(df, ('summary', column), lambda: summarize_series(df[column]))
+
+
+def get_column_summaries(df: pd.DataFrame, columns: Iterable[str]) -> Dict[str, Dict[str, float]]:
+    """Retorna o resumo de várias colunas, calculando apenas as que faltam no cache."""
+    return {col: get_column_summary(df, col) for col in columns}
+
+
+def summarize_series(series: pd.Series) -> Dict[str, float]:
+    """Calcula o resumo (ver get_column_summary) de uma série numérica, sem cache."""
+    values = series.to_numpy(dtype=float, na_value=np.nan)
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        summary = dict.fromkeys(['mean', 'std', 'min', 'q1', 'median', 'q3', 'max', 'iqr',
+                                 'lower_fence', 'upper_fence', 'whisker_low', 'whisker_high'],
+                                float('nan'))
+        summary.update(count=0, n_outliers=0, extremes_low=[], extremes_high=[])
+        return summary
+
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    lower_fence = q1 - 1.5 * iqr
+    upper_fence = q3 + 1.5 * iqr
+    below = values < lower_fence
+    above = values > upper_fence
+    n_outliers = int(below.sum() + above.sum())
+    inside = values[~(below | above)] if n_outliers else values
+    max_points = settings.VISUALIZATION_CONFIG["boxplot_outlier_points"]
+
+    return {
+        'count': int(values.size),
+        'mean': float(values.mean()),
+        'std': float(values.std()),
+        'min': float(values.min()),
+        'q1': float(q1),
+        'median': float(median),
+        'q3': float(q3),
+        'max': float(values.max()),
+        'iqr': float(iqr),
+        'lower_fence': float(lower_fence),
+        'upper_fence': float(upper_fence),
+        'whisker_low': float(inside.min()),
+        'whisker_high': float(inside.max()),
+        'n_outliers': n_outliers,
+        'extremes_low': _extremes(values[below], max_points, lowest=True),
+        'extremes_high': _extremes(values[above], max_points, lowest=False)
+    }
+
+
+def _extremes(values: np.ndarray, k: int, lowest: bool) -> list:
+    """Os k valores mais afastados da caixa (menores ou maiores), sem ordenar a série toda."""
+    if values.size > k:
+        values = np.partition(values, k - 1)[:k] if lowest else np.partition(values, -k)[-k:]
+    return values.tolist()
+
+
+def get_correlation_matrix(df: pd.DataFrame) -> pd.DataFrame:
+    """Retorna a matriz de correlação de Pearson das colunas numéricas, em cache."""
+    return dataset_cache.get_or_compute(
+        df, ('correlation',), lambda: df.select_dtypes(include=[np.number]).corr()
+    )
+
+
+def get_correlation_order(df: pd.DataFrame) -> list:
+    """
+    Retorna as colunas numéricas ordenadas por clustering hierárquico das correlações.
+
+    Usa a distância 1 - |r| com ligação média, de modo que variáveis fortemente
+    correlacionadas (positiva ou negativamente) fiquem adjacentes no heatmap.
+    """
+    def compute():
+        from scipy.cluster.hierarchy import leaves_list, linkage
+        from scipy.spatial.distance import squareform
+
+        corr = get_correlation_matrix(df)
+        if len(corr.columns) < 3:
+            return list(corr.columns)
+        distance = 1 - np.abs(np.nan_to_num(corr.values, nan=0.0))
+        np.fill_diagonal(distance, 0)
+        condensed = squareform(np.clip(distance, 0, None), checks=False)
+        order = leaves_list(linkage(condensed, method='average'))
+        return [corr.columns[i] for i in order]
+
+    return dataset_cache.get_or_compute(df, ('correlation_order',), compute)
+
+
+def get_histogram_bins(df: pd.DataFrame, column: str, nbins: int) -> tuple:
+    """Retorna (contagens, bordas) do histograma de uma coluna numérica, em cache."""
+    def compute():
+        values = df[column].to_numpy(dtype=float, na_value=np.nan)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return np.zeros(0, dtype=int), np.zeros(0)
+        return np.histogram(values, bins=nbins)
+
+    return dataset_cache.get_or_compute(df, ('histogram', column, nbins), compute)
+
+
+def get_ecdf_points(df: pd.DataFrame, column: str, n_points: int) -> tuple:
+    """Retorna (valores, proporções) da ECDF de uma coluna amostrada em quantis, em cache."""
+    def compute():
+        values = df[column].to_numpy(dtype=float, na_value=np.nan)
+        values = values[~np.isnan(values)]
+        probabilities = np.linspace(0, 1, n_points)
+        if values.size == 0:
+            return np.zeros(0), np.zeros(0)
+        return np.quantile(values, probabilities), probabilities
+
+    return dataset_cache.get_or_compute(df, ('ecdf', column, n_points), compute)
@@ -0,0 +1,392 @@
+"""
+Armazenamento do histórico da sessão com cota de memória e spill para disco.
+
+As listas `messages`, `chat_history` e `analysis_history` do session_state crescem
+a cada pergunta e guardam figuras Plotly e saídas completas das ferramentas. Este
+módulo substitui essas listas por `SessionHistoryStore`, que mantém em memória
+apenas as entradas recentes, comprime as antigas e, quando a cota da sessão é
+excedida, grava-as em um arquivo SQLite local, recarregando-as sob demanda.
+O tamanho das entradas é estimado sem serializá-las; a serialização só ocorre
+quando a entrada é comprimida. Um histórico pode manter também um resumo leve
+de cada entrada (ex.: papel e pergunta das mensagens), sempre em memória, para
+consultas que não precisam recarregar as entradas.
+"""
+
+import atexit
+import logging
+import os
+import pickle
+import sqlite3
+import sys
+import tempfile
+import threading
+import weakref
+import zlib
+from collections import OrderedDict
+from collections.abc import Sequence
+from itertools import count
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Níveis em que uma entrada pode estar
+_HOT = 0  # objeto Python em memória
+_COMPRESSED = 1  # bytes comprimidos em memória
+_DISK = 2  # gravada no SQLite
+
+_sequence = count()
+
+
+def _estimate_size(value: Any, depth: int = 0) -> int:
+    """Tamanho aproximado em bytes de uma entrada, sem serializá-la."""
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(np.sum(value.memory_usage(index=True)))
+    if depth > 8:
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return 64 + sum(_estimate_size(k, depth + 1) + _estimate_size(v, depth + 1) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return 56 + sum(_estimate_size(item, depth + 1) for item in value)
+    if hasattr(value, '_data') and hasattr(value, '_layout'):
+        # Figura Plotly: os traços e o layout já são dicts/arrays (to_dict faria cópias profundas)
+        return _estimate_size(value._data, depth + 1) + _estimate_size(value._layout, depth + 1)
+    content = getattr(value, 'content', None)
+    if isinstance(content, str):
+        # Mensagens do LangChain
+        return 64 + len(content)
+    return sys.getsizeof(value)
+
+
+def message_summary(message: Any) -> Dict[str, str]:
+    """Resumo de uma mensagem do chat: o papel e, nas do usuário, a pergunta."""
+    if not isinstance(message, dict):
+        return {'role': '', 'content': ''}
+    role = message.get('role', '')
+    content = message.get('content', '') if role == 'user' else ''
+    return {'role': role, 'content': content if isinstance(content, str) else ''}
+
+
+class _SpillDatabase:
+    """Banco SQLite do processo onde as entradas antigas de todas as sessões são gravadas."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            "store_key TEXT NOT NULL, idx INTEGER NOT NULL, blob BLOB NOT NULL, "
+            "PRIMARY KEY (store_key, idx))"
+        )
+        self._conn.commit()
+
+    def write(self, store_key: str, idx: int, blob: bytes) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO history (store_key, idx, blob) VALUES (?, ?, ?)",
+                (store_key, idx, blob)
+            )
+            self._conn.commit()
+
+    def read(self, store_key: str, indexes: List[int]) -> Dict[int, bytes]:
+        if not indexes:
+            return {}
+        placeholders = ",".join("?" * len(indexes))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT idx, blob FROM history WHERE store_key = ? AND idx IN ({placeholders})",
+                (store_key, *indexes)
+            ).fetchall()
+        return {idx: blob for idx, blob in rows}
+
+    def delete(self, store_key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM history WHERE store_key = ?", (store_key,))
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Fecha a conexão e apaga o arquivo do banco."""
+        with self._lock:
+            self._conn.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+_database: Optional[_SpillDatabase] = None
+_database_lock = threading.Lock()
+
+
+def _get_database() -> _SpillDatabase:
+    """Retorna o banco de spill do processo, criando-o na primeira chamada."""
+    global _database
+    with _database_lock:
+        if _database is None:
+            spill_dir = settings.HISTORY_CONFIG["spill_dir"] or tempfile.gettempdir()
+            os.makedirs(spill_dir, exist_ok=True)
+            path = os.path.join(spill_dir, f"eda_agent_history_{os.getpid()}.sqlite3")
+            _database = _SpillDatabase(path)
+            atexit.register(_close_database)
+            logger.info(f"History spill database at {path}")
+        return _database
+
+
+def _close_database() -> None:
+    """Fecha e apaga o banco de spill ao encerrar o processo."""
+    global _database
+    with _database_lock:
+        database, _database = _database, None
+    if database is not None:
+        try:
+            database.close()
+        except Exception as e:
+            logger.warning(f"Could not remove history spill database {database.path}: {e}")
+
+
+class SessionMemoryBudget:
+    """Cota de memória compartilhada pelos históricos de uma mesma sessão."""
+
+    def __init__(self, session_id: str, memory_quota_bytes: Optional[int] = None,
+                 compressed_quota_bytes: Optional[int] = None):
+        """
+        Inicializa a cota da sessão.
+
+        Args:
+            session_id: Identificador da sessão do Streamlit
+            memory_quota_bytes: Bytes máximos de entradas não comprimidas
+            compressed_quota_bytes: Bytes máximos de entradas comprimidas em memória
+        """
+        config = settings.HISTORY_CONFIG
+        self.session_id = session_id
+        self.memory_quota_bytes = memory_quota_bytes or config["memory_quota_mb"] * 1024 ** 2
+        self.compressed_quota_bytes = compressed_quota_bytes or config["compressed_quota_mb"] * 1024 ** 2
+        self._stores = weakref.WeakSet()
+        self._lock = threading.RLock()
+
+    def register(self, store: "SessionHistoryStore") -> None:
+        self._stores.add(store)
+
+    def enforce(self) -> None:
+        """Comprime e grava em disco as entradas mais antigas até respeitar a cota."""
+        with self._lock:
+            stores = list(self._stores)
+            while sum(s.hot_bytes for s in stores) > self.memory_quota_bytes:
+                store = self._oldest(stores, _HOT)
+                if store is None:
+                    break
+                store._demote_oldest(_HOT)
+            while sum(s.compressed_bytes for s in stores) > self.compressed_quota_bytes:
+                store = self._oldest(stores, _COMPRESSED)
+                if store is None:
+                    break
+                store._demote_oldest(_COMPRESSED)
+
+    @staticmethod
+    def _oldest(stores, tier: int) -> Optional["SessionHistoryStore"]:
+        candidates = [(s._oldest_sequence(tier), s) for s in stores]
+        candidates = [c for c in candidates if c[0] is not None]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda c: c[0])[1]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna o uso de memória e disco de cada histórico da sessão."""
+        return {store.name: store.get_stats() for store in list(self._stores)}
+
+
+class SessionHistoryStore(Sequence):
+    """
+    Lista append-only de entradas do histórico com níveis de armazenamento.
+
+    Suporta `append`, `extend`, `len`, indexação, fatias e iteração, de modo que
+    o código que usava listas no session_state continua funcionando. Entradas
+    recarregadas do disco são cópias: o histórico deve ser tratado como imutável.
+    """
+
+    def __init__(self, name: str, budget: SessionMemoryBudget,
+                 summarize: Optional[Callable[[Any], Any]] = None):
+        """
+        Inicializa o histórico.
+
+        Args:
+            name: Nome do histórico (ex.: 'messages')
+            budget: Cota de memória da sessão à qual o histórico pertence
+            summarize: Função que extrai o resumo leve de cada entrada, mantido em memória
+        """
+        config = settings.HISTORY_CONFIG
+        self.name = name
+        self.store_key = f"{budget.session_id}:{name}"
+        self._budget = budget
+        self._min_hot = config["min_hot_entries"]
+        self._level = config["compression_level"]
+        self._decoded_size = config["decoded_cache_size"]
+        # Cada entrada: [nível, conteúdo, bytes, sequência]
+        self._entries: List[list] = []
+        self._summarize = summarize
+        self._summaries: List[Any] = []
+        self._decoded: "OrderedDict[int, Any]" = OrderedDict()
+        self._spilled = False
+        self._lock = threading.RLock()
+        self.hot_bytes = 0
+        self.compressed_bytes = 0
+        budget.register(self)
+        weakref.finalize(self, _drop_spilled, self.store_key)
+
+    # Escrita
+
+    def append(self, entry: Any) -> None:
+        """Adiciona uma entrada ao final do histórico."""
+        size = _estimate_size(entry)
+        with self._lock:
+            self._entries.append([_HOT, entry, size, next(_sequence)])
+            if self._summarize is not None:
+                self._summaries.append(self._summarize(entry))
+            self.hot_bytes += size
+        self._budget.enforce()
+
+    def extend(self, entries) -> None:
+        for entry in entries:
+            self.append(entry)
+
+    def clear(self) -> None:
+        """Remove todas as entradas, inclusive as gravadas em disco."""
+        with self._lock:
+            self._entries.clear()
+            self._summaries.clear()
+            self._decoded.clear()
+            self.hot_bytes = 0
+            self.compressed_bytes = 0
+            if self._spilled:
+                _get_database().delete(self.store_key)
+                self._spilled = False
+
+    # Leitura
+
+    def summaries(self) -> List[Any]:
+        """Resumos das entradas, na ordem do histórico, sem recarregá-las (vazio sem `summarize`)."""
+        with self._lock:
+            return list(self._summaries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._load(range(len(self._entries))[index])
+        if index < 0:
+            index += len(self._entries)
+        if not 0 <= index < len(self._entries):
+            raise IndexError("history index out of range")
+        return self._load([index])[0]
+
+    def __iter__(self) -> Iterator[Any]:
+        # Carregar em blocos para não trazer todo o histórico do disco de uma vez
+        for start in range(0, len(self._entries), 32):
+            yield from self._load(range(start, min(start + 32, len(self._entries))))
+
+    def __reversed__(self) -> Iterator[Any]:
+        for start in range(len(self._entries), 0, -32):
+            yield from reversed(self._load(range(max(0, start - 32), start)))
+
+    def __repr__(self) -> str:
+        return f"SessionHistoryStore({self.name!r}, entries={len(self)})"
+
+    def _load(self, indexes) -> List[Any]:
+        with self._lock:
+            indexes = list(indexes)
+            on_disk = [i for i in indexes
+                       if self._entries[i][0] == _DISK and i not in self._decoded]
+            blobs = _get_database().read(self.store_key, on_disk) if on_disk else {}
+            result = []
+            for i in indexes:
+                tier, payload = self._entries[i][0], self._entries[i][1]
+                if tier == _HOT:
+                    result.append(payload)
+                    continue
+                if i in self._decoded:
+                    self._decoded.move_to_end(i)
+                    result.append(self._decoded[i])
+                    continue
+                blob = payload if tier == _COMPRESSED else blobs[i]
+                value = pickle.loads(zlib.decompress(blob))
+                self._decoded[i] = value
+                if len(self._decoded) > self._decoded_size:
+                    self._decoded.popitem(last=False)
+                result.append(value)
+            return result
+
+    # Gerenciamento de níveis (chamado pela cota da sessão)
+
+    def _oldest_sequence(self, tier: int) -> Optional[int]:
+        evictable = len(self._entries) - self._min_hot if tier == _HOT else len(self._entries)
+        for entry in self._entries[:max(evictable, 0)]:
+            if entry[0] == tier:
+                return entry[3]
+        return None
+
+    def _demote_oldest(self, tier: int) -> None:
+        with self._lock:
+            for idx, entry in enumerate(self._entries):
+                if entry[0] != tier:
+                    continue
+                if tier == _HOT:
+                    blob = zlib.compress(
+                        pickle.dumps(entry[1], protocol=pickle.HIGHEST_PROTOCOL), self._level
+                    )
+                    self.hot_bytes -= entry[2]
+                    self.compressed_bytes += len(blob)
+                    entry[0], entry[1] = _COMPRESSED, blob
+                else:
+                    _get_database().write(self.store_key, idx, entry[1])
+                    self.compressed_bytes -= len(entry[1])
+                    self._spilled = True
+                    entry[0], entry[1] = _DISK, None
+                return
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna contagens e bytes de cada nível de armazenamento."""
+        tiers = [entry[0] for entry in self._entries]
+        return {
+            'entries': len(tiers),
+            'in_memory': tiers.count(_HOT),
+            'compressed': tiers.count(_COMPRESSED),
+            'on_disk': tiers.count(_DISK),
+            'memory_bytes': self.hot_bytes,
+            'compressed_bytes': self.compressed_bytes
+        }
+
+
+def _drop_spilled(store_key: str) -> None:
+    """Remove do disco as entradas de um histórico descartado."""
+    if _database is not None:
+        try:
+            _database.delete(store_key)
+        except Exception as e:
+            logger.warning(f"Could not drop spilled history {store_key}: {e}")
+
+
+def create_session_history(name: str, budget: SessionMemoryBudget,
+                           summarize: Optional[Callable[[Any], Any]] = None) -> SessionHistoryStore:
+    """
+    Cria um histórico da sessão associado à cota informada.
+
+    Args:
+        name: Nome do histórico
+        budget: Cota de memória da sessão
+        summarize: Função que extrai o resumo leve de cada entrada (ex.: `message_summary`)
+
+    Returns:
+        SessionHistoryStore: Histórico vazio
+    """
+    logger.info(f"Creating session history '{name}' for session {budget.session_id}")
+    return SessionHistoryStore(name, budget, summarize)
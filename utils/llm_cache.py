@@ -0,0 +1,188 @@
+"""
+Cache de respostas do agente para reduzir chamadas à API dos LLMs.
+
+Implementa o `CACHE_CONFIG` de `config/settings_alternatives.py`: respostas são
+indexadas pela pergunta normalizada, pelo fingerprint do dataset, pelo modelo e
+pelo histórico da conversa visto pelo agente (`conversation_digest`; perguntas
+de acompanhamento como "e o boxplot dela?" só são reaproveitadas na mesma
+conversa, e primeiras perguntas entre sessões), expiram após `ttl` segundos e são descartadas em ordem LRU acima de `max_size`.
+Com `cache_similar_queries`, perguntas equivalentes escritas de outra forma são
+resolvidas pelo índice de similaridade de `utils/semantic_cache.py`. O cache é
+do processo e, portanto, compartilhado entre as sessões.
+"""
+
+import copy
+import hashlib
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from langchain_core.messages import get_buffer_string
+
+from config.settings_alternatives import alternative_settings
+from utils.semantic_cache import SemanticQueryIndex, extract_entities
+
+logger = logging.getLogger(__name__)
+
+# Ferramentas cujo resultado depende do histórico da sessão e não deve ser reaproveitado
+SESSION_DEPENDENT_TOOLS = {'generate_insights_and_conclusions', 'get_previous_answer'}
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Normaliza a pergunta: Unicode, caixa, espaços e pontuação final."""
+    text = unicodedata.normalize('NFKC', prompt).lower().strip()
+    text = re.sub(r'\s+', ' ', text)
+    return text.rstrip(' ?!.;:')
+
+
+def conversation_digest(memory) -> str:
+    """Identificador do histórico que o agente recebe com a pergunta ('' sem histórico)."""
+    if memory is None:
+        return ""
+    history = memory.load_memory_variables({}).get(getattr(memory, 'memory_key', 'chat_history'))
+    if not history:
+        return ""
+    text = get_buffer_string(history) if isinstance(history, list) else str(history)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+class ResponseCache:
+    """Cache LRU com TTL das respostas do agente."""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        """
+        Inicializa o cache.
+
+        Args:
+            config: Configuração no formato de CACHE_CONFIG
+        """
+        config = config or alternative_settings.CACHE_CONFIG
+        self.enabled = config.get('enabled', True)
+        self.ttl = config.get('ttl', 3600)
+        self.max_size = config.get('max_size', 100)
+        self._entries: "OrderedDict[Tuple[str, str, str, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.semantic_index = None
+        if config.get('cache_similar_queries', False):
+            self.semantic_index = SemanticQueryIndex(threshold=config.get('similarity_threshold', 0.8))
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(prompt: str, dataset_fingerprint: str, model: str,
+                 conversation: str = "") -> Tuple[str, str, str, str]:
+        return normalize_prompt(prompt), dataset_fingerprint, model, conversation
+
+    def get(self, prompt: str, dataset_fingerprint: str, model: str,
+            columns: Iterable[str] = (), conversation: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Busca uma resposta em cache (exata e, se habilitado, por similaridade).
+
+        Args:
+            prompt: Pergunta do usuário
+            dataset_fingerprint: Fingerprint do dataset carregado
+            model: Nome do modelo em uso
+            columns: Colunas do dataset, usadas para evitar falsos acertos por similaridade
+            conversation: `conversation_digest` da memória antes da pergunta
+
+        Returns:
+            Cópia do resultado do agente em cache ou None
+        """
+        if not self.enabled:
+            return None
+        key = self.make_key(prompt, dataset_fingerprint, model, conversation)
+        with self._lock:
+            entry = self._lookup_locked(key)
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+            logger.info(f"Response cache hit for: {key[0][:60]}")
+            return copy.deepcopy(entry[1])
+
+        if self.semantic_index is not None:
+            match = self.semantic_index.query(
+                prompt, (dataset_fingerprint, model, conversation), extract_entities(prompt, columns)
+            )
+            if match is not None:
+                with self._lock:
+                    entry = self._lookup_locked(match[0])
+                    if entry is not None:
+                        self.hits += 1
+                        self.semantic_hits += 1
+                if entry is not None:
+                    logger.info(f"Response cache similar hit ({match[1]:.2f}): "
+                                f"'{key[0][:60]}' ~ '{match[0][0][:60]}'")
+                    return copy.deepcopy(entry[1])
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _lookup_locked(self, key: Tuple[str, str, str, str]) -> Optional[Tuple[float, Dict[str, Any]]]:
+        entry = self._entries.get(key)
+        if entry is not None and time.time() - entry[0] > self.ttl:
+            self._evict_locked(key)
+            return None
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _evict_locked(self, key: Tuple[str, str, str, str]) -> None:
+        self._entries.pop(key, None)
+        if self.semantic_index is not None:
+            self.semantic_index.remove(key)
+
+    def put(self, prompt: str, dataset_fingerprint: str, model: str, result: Dict[str, Any],
+            columns: Iterable[str] = (), conversation: str = "") -> bool:
+        """
+        Armazena uma resposta do agente, se ela puder ser reaproveitada.
+
+        Respostas que não consultaram os dados ou que usaram ferramentas
+        dependentes do histórico da sessão não são armazenadas.
+
+        Returns:
+            bool: True se a resposta foi armazenada
+        """
+        if not self.enabled:
+            return False
+        steps = result.get('intermediate_steps', [])
+        tools_used = {getattr(step[0], 'tool', None) for step in steps}
+        if not steps or tools_used & SESSION_DEPENDENT_TOOLS:
+            return False
+
+        key = self.make_key(prompt, dataset_fingerprint, model, conversation)
+        with self._lock:
+            self._entries[key] = (time.time(), copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._evict_locked(next(iter(self._entries)))
+        if self.semantic_index is not None:
+            self.semantic_index.add(key, prompt, (dataset_fingerprint, model, conversation),
+                                    extract_entities(prompt, columns))
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._evict_locked(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna acertos (totais e por similaridade), falhas, taxa de acerto e tamanho do cache."""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'semantic_hits': self.semantic_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': len(self._entries),
+            'max_size': self.max_size
+        }
+
+
+# Instância global
+llm_response_cache = ResponseCache()
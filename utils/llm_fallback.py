@@ -5,10 +5,14 @@ Sistema de fallback para LLMs com rate limiting.
 import logging
 import time
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import streamlit as st
-from langchain_openai import ChatOpenAI
 from config.settings_alternatives import alternative_settings
+from utils.llm_pool import llm_client_pool
+from utils.llm_wrappers import HedgedChatModel, ResilientChatModel
+from utils.provider_metrics import provider_metrics
+from utils.rate_limiter import rate_limiter_registry
+from utils.resilience import circuit_breakers
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +26,8 @@ class LLMFallbackManager:
         self.last_error_time = {}
         self.current_provider_name = None
         self.current_provider_info = None
+        self.last_routing_decision = None
+        self._round_robin_next = 0
         
     def get_llm(self, force_provider: Optional[int] = None):
         """
@@ -50,6 +56,14 @@ class LLMFallbackManager:
             # Armazenar informações do provider forçado
             self.current_provider_name = provider['name']
             self.current_provider_info = provider
+            self.last_routing_decision = {
+                'policy': 'manual',
+                'chosen': provider['name'],
+                'reason': "selecionado manualmente",
+                'candidates': [provider['name']],
+                'skipped': {},
+                'time': datetime.now()
+            }
             
             logger.info(f"Forçando uso do provider: {provider['name']}")
             
@@ -65,28 +79,24 @@ class LLMFallbackManager:
             
             return self._create_llm(provider)
         
-        # Tentar cada provider em ordem
-        for i, provider in enumerate(providers):
+        # Tentar cada provider saudável, na ordem da política de roteamento
+        ranked = self._rank_providers(providers)
+        for i, provider in enumerate(ranked):
             try:
-                # Verificar se está em cooldown
-                if self._is_in_cooldown(provider['name']):
-                    logger.info(f"Provider {provider['name']} está em cooldown")
-                    continue
-                
-                # Verificar se requer configuração especial
-                if provider.get('requires_key') and not provider['config'].get('api_key'):
-                    logger.info(f"Provider {provider['name']} requer API key")
-                    continue
-                    
-                
                 # Criar e testar LLM
                 llm = self._create_llm(provider)
                 
+                # Hedging: o próximo provider saudável atua como reserva
+                if alternative_settings.HEDGING_CONFIG['enabled'] and i + 1 < len(ranked):
+                    llm = self._create_hedged_llm(provider, ranked[i + 1], llm)
+                
                 # Armazenar informações do provider atual
                 self.current_provider_name = provider['name']
                 self.current_provider_info = provider
+                if self.last_routing_decision['chosen'] != provider['name']:
+                    self.last_routing_decision.update(chosen=provider['name'], reason="fallback após erro")
                 
-                logger.info(f"Usando provider: {provider['name']}")
+                logger.info(f"Usando provider: {provider['name']} ({self.last_routing_decision['reason']})")
                 
                 # Mostrar notificação no Streamlit
                 if hasattr(st, 'info'):
@@ -102,40 +112,142 @@ class LLMFallbackManager:
         # Se todos falharam, retornar erro
         raise Exception("Todos os providers de LLM falharam. Verifique as configurações.")
     
+    def _rank_providers(self, providers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Filtra os providers indisponíveis e ordena os saudáveis pela política
+        de ROUTING_CONFIG ("fastest", "cheapest", "round_robin" ou "priority").
+        A decisão fica registrada em `last_routing_decision`.
+        """
+        config = alternative_settings.ROUTING_CONFIG
+        policy = config['policy']
+        healthy = []
+        skipped = {}
+        for provider in providers:
+            name = provider['name']
+            summary = provider_metrics.get_summary(name)
+            limiter = rate_limiter_registry.get(name)
+            breaker = circuit_breakers.get(name)
+            if self._is_in_cooldown(name):
+                skipped[name] = "cooldown"
+            elif not breaker.is_available():
+                skipped[name] = f"circuito aberto (nova tentativa em {breaker.retry_after():.0f}s)"
+            elif provider.get('requires_key') and not provider['config'].get('api_key'):
+                skipped[name] = "sem API key"
+            elif limiter is not None and not limiter.has_capacity():
+                # Pular providers sem orçamento local antes de receber um 429
+                skipped[name] = f"sem orçamento (disponível em {limiter.retry_after():.0f}s)"
+            elif summary['samples'] >= config['min_samples'] and summary['error_rate'] > config['max_error_rate']:
+                skipped[name] = f"taxa de erro {summary['error_rate']:.0%}"
+            else:
+                healthy.append((provider, summary))
+        
+        for name, reason in skipped.items():
+            logger.info(f"Provider {name} ignorado: {reason}")
+        
+        if policy == "fastest":
+            # Providers sem amostras suficientes ficam depois, na ordem de prioridade
+            def latency(item):
+                summary = item[1]
+                known = summary['samples'] >= config['min_samples'] and summary['p50'] is not None
+                return summary['p50'] if known else float('inf')
+            healthy.sort(key=latency)
+        elif policy == "cheapest":
+            healthy.sort(key=lambda item: not item[0].get('is_free', False))
+        elif policy == "round_robin" and healthy:
+            start = self._round_robin_next % len(healthy)
+            healthy = healthy[start:] + healthy[:start]
+            self._round_robin_next += 1
+        
+        if healthy:
+            best, summary = healthy[0]
+            if policy == "fastest" and summary['p50'] is not None and summary['samples'] >= config['min_samples']:
+                reason = f"mais rápido: p50 {summary['p50']:.1f}s em {summary['samples']} chamadas"
+            elif policy == "fastest":
+                reason = "sem histórico de latência; ordem de prioridade"
+            else:
+                reason = f"política {policy}"
+            self.last_routing_decision = {
+                'policy': policy,
+                'chosen': best['name'],
+                'reason': reason,
+                'candidates': [item[0]['name'] for item in healthy],
+                'skipped': skipped,
+                'time': datetime.now()
+            }
+        return [item[0] for item in healthy]
+    
     def _create_llm(self, provider: Dict[str, Any]):
-        """Cria uma instância de LLM com a configuração do provider."""
+        """Obtém o cliente (compartilhado entre sessões) com a configuração do provider."""
         config = provider['config'].copy()
         
         # Remover campos vazios
         config = {k: v for k, v in config.items() if v}
         
-        return ChatOpenAI(**config)
+        # Limitador compartilhado entre sessões (aguarda na fila ou sinaliza o próximo provider)
+        limiter = rate_limiter_registry.get(provider['name'])
+        if limiter is not None:
+            config['rate_limiter'] = limiter
+        
+        # Latência, primeiro token e erros de cada chamada alimentam o roteamento
+        config['callbacks'] = [provider_metrics.handler(provider['name'])]
+        
+        # As novas tentativas ficam com o ResilientChatModel (backoff + circuit breaker)
+        config['max_retries'] = 0
+        
+        llm = llm_client_pool.get_llm(provider['name'], config)
+        return llm_client_pool.get_wrapper(
+            ('resilient', *llm_client_pool.make_key(provider['name'], config)),
+            lambda: ResilientChatModel(llm, provider['name'])
+        )
+    
+    def _create_hedged_llm(self, primary: Dict[str, Any], backup: Dict[str, Any], primary_llm):
+        """Combina o provider principal e o reserva em um modelo com hedging."""
+        names = [primary['name'], backup['name']]
+        return llm_client_pool.get_wrapper(
+            ('hedged', *names),
+            lambda: HedgedChatModel([primary_llm, self._create_llm(backup)], names)
+        )
     
     def _is_in_cooldown(self, provider_name: str) -> bool:
-        """Verifica se o provider está em período de cooldown."""
-        if provider_name not in self.last_error_time:
+        """Verifica se o provider está em período de cooldown após um rate limit."""
+        if provider_name not in self.rate_limit_tracker:
             return False
         
-        cooldown_until = self.last_error_time[provider_name] + timedelta(
+        cooldown_until = self.rate_limit_tracker[provider_name] + timedelta(
             minutes=alternative_settings.RATE_LIMIT_CONFIG['cooldown_minutes']
         )
         
         return datetime.now() < cooldown_until
     
     def _mark_error(self, provider_name: str):
-        """Marca um erro para o provider."""
+        """Marca um erro para o provider (conta para o circuit breaker compartilhado)."""
         self.last_error_time[provider_name] = datetime.now()
+        circuit_breakers.get(provider_name).record_failure()
+    
+    def report_rate_limit(self, provider_name: str = None):
+        """Registra um 429 do provider: cooldown e orçamento do minuto zerado."""
+        provider_name = provider_name or self.current_provider_name
+        if provider_name is None:
+            return
+        self.last_error_time[provider_name] = self.rate_limit_tracker[provider_name] = datetime.now()
+        limiter = rate_limiter_registry.get(provider_name)
+        if limiter is not None:
+            limiter.drain('minuto')
     
     def get_status(self) -> Dict[str, Any]:
         """Retorna o status dos providers."""
         status = {}
         for provider in alternative_settings.get_fallback_configs():
             name = provider['name']
+            circuit = circuit_breakers.get_status(name)
             status[name] = {
-                'available': not self._is_in_cooldown(name),
+                'available': not self._is_in_cooldown(name) and circuit['retry_after'] <= 0,
+                'circuit': circuit,
                 'rate_limit': provider.get('rate_limit'),
                 'is_free': provider.get('is_free', False),
-                'last_error': self.last_error_time.get(name)
+                'last_error': self.last_error_time.get(name),
+                'remaining': rate_limiter_registry.get_remaining(name),
+                'metrics': provider_metrics.get_summary(name)
             }
         return status
     
@@ -147,7 +259,8 @@ class LLMFallbackManager:
                 'model': self.current_provider_info['config']['model_name'],
                 'rate_limit': self.current_provider_info.get('rate_limit'),
                 'is_free': self.current_provider_info.get('is_free', False),
-                'context_length': self.current_provider_info.get('context_length', 'N/A')
+                'context_length': self.current_provider_info.get('context_length', 'N/A'),
+                'remaining': rate_limiter_registry.get_remaining(self.current_provider_name)
             }
         return {'name': 'Nenhum', 'model': 'N/A'}
 
@@ -0,0 +1,160 @@
+"""
+Pool de clientes LLM e agentes compartilhados entre sessões.
+
+Cada combinação de provider/modelo/credencial tem um único `ChatOpenAI` por
+processo, e todos os clientes de uma mesma `base_url` compartilham um pool
+HTTP com keep-alive, evitando um novo handshake TLS a cada sessão ou troca de
+modelo. O agente (prompt + ferramentas) também é construído uma vez por
+cliente; cada sessão apenas associa a sua memória ao executor.
+"""
+
+import asyncio
+import atexit
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+from langchain_openai import ChatOpenAI
+
+from config.settings import settings
+from config.settings_alternatives import alternative_settings
+
+logger = logging.getLogger(__name__)
+
+
+class LLMClientPool:
+    """Clientes `ChatOpenAI` reutilizáveis com pools HTTP compartilhados."""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        """
+        Inicializa o pool.
+
+        Args:
+            config: Configuração no formato de CLIENT_POOL_CONFIG
+        """
+        self.config = config or alternative_settings.CLIENT_POOL_CONFIG
+        self._http_clients: Dict[str, tuple] = {}
+        self._llms: Dict[tuple, ChatOpenAI] = {}
+        self._agents: Dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(name: str, config: Dict[str, Any]) -> tuple:
+        """Chave do cliente; a API key entra apenas como hash."""
+        api_key = str(config.get('api_key') or '')
+        return (
+            name,
+            config.get('model_name'),
+            config.get('base_url'),
+            hashlib.sha1(api_key.encode()).hexdigest()[:12],
+            config.get('temperature'),
+            config.get('max_tokens'),
+            config.get('streaming')
+        )
+
+    def _get_http_clients(self, base_url: Optional[str]) -> tuple:
+        """Retorna (cliente síncrono, cliente assíncrono) httpx da base_url."""
+        key = base_url or 'default'
+        clients = self._http_clients.get(key)
+        if clients is None:
+            limits = httpx.Limits(
+                max_connections=self.config['max_connections'],
+                max_keepalive_connections=self.config['max_keepalive_connections'],
+                keepalive_expiry=self.config['keepalive_expiry']
+            )
+            timeout = httpx.Timeout(self.config['timeout'])
+            clients = (httpx.Client(limits=limits, timeout=timeout),
+                       httpx.AsyncClient(limits=limits, timeout=timeout))
+            self._http_clients[key] = clients
+            logger.info(f"Created shared HTTP connection pool for {key}")
+        return clients
+
+    def get_llm(self, name: str, config: Dict[str, Any]) -> ChatOpenAI:
+        """
+        Retorna o cliente do provider, criando-o na primeira chamada.
+
+        Args:
+            name: Nome do provider
+            config: Parâmetros do ChatOpenAI (podem incluir `rate_limiter`)
+
+        Returns:
+            ChatOpenAI: Cliente compartilhado
+        """
+        # Streaming habilita os callbacks de novos tokens usados pelo chat
+        config = {'streaming': settings.STREAMING_CONFIG["enabled"], **config}
+        key = self.make_key(name, config)
+        with self._lock:
+            llm = self._llms.get(key)
+            if llm is not None:
+                self.hits += 1
+                return llm
+            self.misses += 1
+            http_client, http_async_client = self._get_http_clients(config.get('base_url'))
+            llm = ChatOpenAI(**config, http_client=http_client, http_async_client=http_async_client)
+            self._llms[key] = llm
+            logger.info(f"Created pooled LLM client for {name} ({config.get('model_name')})")
+            return llm
+
+    def get_wrapper(self, key: tuple, factory: Callable[[], Any]) -> Any:
+        """Retorna uma camada sobre clientes do pool (ex.: hedging), criando-a uma vez."""
+        with self._lock:
+            wrapper = self._llms.get(key)
+            if wrapper is None:
+                wrapper = self._llms[key] = factory()
+            return wrapper
+
+    def get_agent(self, llm: ChatOpenAI, factory: Callable[[ChatOpenAI], Any]) -> Any:
+        """Retorna o agente (sem memória) do cliente, construindo-o com `factory` uma vez."""
+        key = id(llm)
+        with self._lock:
+            agent = self._agents.get(key)
+            if agent is not None and agent[0] is llm:
+                return agent[1]
+        built = factory(llm)
+        with self._lock:
+            # Guardar o cliente junto evita reaproveitar um id de objeto já coletado
+            self._agents[key] = (llm, built)
+        return built
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'clients': len(self._llms),
+            'http_pools': len(self._http_clients),
+            'agents': len(self._agents),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+    def _close_async_client(self, http_async_client: httpx.AsyncClient) -> None:
+        """Fecha o cliente assíncrono no loop compartilhado, onde as conexões foram abertas."""
+        from utils.async_runner import async_agent_runner
+        loop = async_agent_runner.loop
+        try:
+            if loop is not None and loop.is_running():
+                asyncio.run_coroutine_threadsafe(http_async_client.aclose(), loop).result(
+                    timeout=self.config['timeout'])
+            else:
+                asyncio.run(http_async_client.aclose())
+        except Exception as e:
+            logger.warning(f"Closing async HTTP connection pool failed: {e}")
+
+    def close(self) -> None:
+        """Fecha os pools HTTP e descarta os clientes (ex.: ao encerrar o processo)."""
+        with self._lock:
+            for http_client, http_async_client in self._http_clients.values():
+                http_client.close()
+                self._close_async_client(http_async_client)
+            self._http_clients.clear()
+            self._llms.clear()
+            self._agents.clear()
+
+
+# Instância global
+llm_client_pool = LLMClientPool()
+# Ao encerrar o processo, o loop do AsyncAgentRunner (thread daemon) ainda está ativo
+# durante os handlers do atexit: os clientes assíncronos são fechados nele
+atexit.register(llm_client_pool.close)
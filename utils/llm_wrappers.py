@@ -0,0 +1,362 @@
+"""
+Camadas sobre os clientes LLM dos providers.
+
+As camadas expõem `bind_tools` (exigido por `create_tool_calling_agent`) e
+repassam a mesma configuração de callbacks aos clientes internos, de modo que
+streaming, métricas por provider e rate limiting continuam funcionando.
+
+- `ResilientChatModel`: repete erros transitórios com espera exponencial,
+  converte 429 em `RateLimitExceeded` e respeita o circuit breaker do provider.
+- `HedgedChatModel`: se o provider principal não responder dentro de um prazo
+  baseado no seu p95, a mesma requisição é enviada ao provider reserva e vence
+  a primeira resposta; a outra é cancelada. Requisições duplicadas são
+  limitadas por um orçamento (fração do tráfego). O reserva roda com callbacks
+  próprios, que só são repassados aos da requisição (streaming no chat) se ele
+  vencer.
+"""
+
+import asyncio
+import contextvars
+import inspect
+import logging
+import threading
+import time
+from abc import abstractmethod
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler, BaseCallbackManager
+from langchain_core.runnables import Runnable
+
+from config.settings_alternatives import alternative_settings
+from utils.async_runner import run_with_script_context
+from utils.provider_metrics import provider_metrics
+from utils.rate_limiter import RateLimitExceeded, rate_limiter_registry
+from utils.resilience import (PERMANENT, RATE_LIMIT, CircuitOpenError, backoff_delay,
+                              circuit_breakers, classify_error, retry_after_hint)
+
+logger = logging.getLogger(__name__)
+
+_hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-hedge")
+
+
+class DelegatingRunnable(Runnable):
+    """Base das camadas: delega `bind_tools` a todos os clientes internos."""
+
+    def __init__(self, runnables: List[Runnable], names: List[str]):
+        self.runnables = runnables
+        self.names = names
+
+    def bind_tools(self, tools, **kwargs) -> "DelegatingRunnable":
+        return self._rebind([r.bind_tools(tools, **kwargs) for r in self.runnables])
+
+    @abstractmethod
+    def _rebind(self, runnables: List[Runnable]) -> "DelegatingRunnable":
+        """Nova camada do mesmo tipo sobre os clientes informados."""
+
+
+class ResilientChatModel(DelegatingRunnable):
+    """Cliente de um provider com novas tentativas e circuit breaker."""
+
+    def __init__(self, runnable: Runnable, name: str):
+        super().__init__([runnable], [name])
+
+    def _rebind(self, runnables: List[Runnable]) -> "ResilientChatModel":
+        return ResilientChatModel(runnables[0], self.names[0])
+
+    def _acquire(self, breaker, last_error: Optional[BaseException]) -> None:
+        if not breaker.allow_request():
+            raise CircuitOpenError(self.names[0], breaker.retry_after()) from last_error
+
+    def _handle_error(self, error: Exception, attempt: int, breaker) -> float:
+        """Registra o erro e retorna a espera antes da próxima tentativa (ou levanta)."""
+        name = self.names[0]
+        kind = classify_error(error)
+        if kind == RATE_LIMIT:
+            # Provider saudável, apenas sem cota: o orçamento local é zerado e o
+            # chamador passa ao próximo provider
+            breaker.release()
+            if isinstance(error, RateLimitExceeded):
+                raise error
+            limiter = rate_limiter_registry.get(name)
+            if limiter is not None:
+                limiter.drain('minuto')
+            retry_after = retry_after_hint(error)
+            if retry_after is None:
+                retry_after = limiter.retry_after() if limiter is not None else 60.0
+            logger.warning(f"{name} returned a rate limit error: {error}")
+            raise RateLimitExceeded(name, retry_after) from error
+        if kind == PERMANENT:
+            # Erro da requisição, não do provider: não conta para o circuito
+            breaker.release()
+            raise error
+
+        breaker.record_failure()
+        if not breaker.is_available():
+            # O circuito abriu com esta falha: o chamador passa ao próximo provider
+            raise CircuitOpenError(name, breaker.retry_after()) from error
+        config = alternative_settings.RESILIENCE_CONFIG
+        if attempt >= config["max_retries"]:
+            logger.error(f"{name} failed after {attempt + 1} attempts: {error}")
+            raise error
+        delay = backoff_delay(attempt, config["backoff_base_seconds"], config["backoff_max_seconds"])
+        logger.warning(f"Transient error from {name} ({error}); retrying in {delay:.1f}s")
+        return delay
+
+    def invoke(self, input, config=None, **kwargs):
+        breaker = circuit_breakers.get(self.names[0])
+        attempt, last_error = 0, None
+        while True:
+            self._acquire(breaker, last_error)
+            try:
+                result = self.runnables[0].invoke(input, config, **kwargs)
+            except Exception as e:
+                time.sleep(self._handle_error(e, attempt, breaker))
+                attempt, last_error = attempt + 1, e
+                continue
+            except BaseException:
+                breaker.release()
+                raise
+            breaker.record_success()
+            return result
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        breaker = circuit_breakers.get(self.names[0])
+        attempt, last_error = 0, None
+        while True:
+            self._acquire(breaker, last_error)
+            try:
+                result = await self.runnables[0].ainvoke(input, config, **kwargs)
+            except Exception as e:
+                await asyncio.sleep(self._handle_error(e, attempt, breaker))
+                attempt, last_error = attempt + 1, e
+                continue
+            except BaseException:
+                # Cancelamento (ex.: perdedor de um hedge) não indica a saúde do provider
+                breaker.release()
+                raise
+            breaker.record_success()
+            return result
+
+
+class HedgeBudget:
+    """Orçamento de requisições duplicadas: cada requisição rende `ratio` de crédito."""
+
+    def __init__(self, ratio: float, burst: float):
+        self.ratio = ratio
+        self.burst = burst
+        self.credit = burst
+        self._lock = threading.Lock()
+
+    def on_request(self) -> None:
+        with self._lock:
+            self.credit = min(self.burst, self.credit + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.credit >= 1:
+                self.credit -= 1
+                return True
+            return False
+
+
+class HedgeStats:
+    """Contadores do hedging, compartilhados por todas as sessões."""
+
+    def __init__(self):
+        self.requests = 0
+        self.hedged = 0
+        self.backup_wins = 0
+        self.denied = 0
+        self.backup_win_seconds = 0.0  # Soma das latências das respostas vencidas pelo reserva
+        self._lock = threading.Lock()
+
+    def add(self, **increments) -> None:
+        with self._lock:
+            for name, value in increments.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'hedged': self.hedged,
+                'hedge_rate': self.hedged / self.requests if self.requests else 0.0,
+                'backup_wins': self.backup_wins,
+                'denied': self.denied,
+                'avg_backup_win_seconds': (self.backup_win_seconds / self.backup_wins
+                                           if self.backup_wins else None)
+            }
+
+
+hedge_stats = HedgeStats()
+_hedge_budget: Optional[HedgeBudget] = None
+
+
+def _get_budget() -> HedgeBudget:
+    global _hedge_budget
+    if _hedge_budget is None:
+        config = alternative_settings.HEDGING_CONFIG
+        _hedge_budget = HedgeBudget(config["max_hedge_ratio"], config["budget_burst"])
+    return _hedge_budget
+
+
+class _RecordingHandler(BaseCallbackHandler):
+    """Grava os eventos da chamada reserva para repassá-los aos callbacks da requisição se ela vencer."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.events: List[tuple] = []
+
+    def on_llm_start(self, *args, **kwargs) -> None:
+        self.events.append(('on_llm_start', args, kwargs))
+
+    def on_llm_new_token(self, *args, **kwargs) -> None:
+        self.events.append(('on_llm_new_token', args, kwargs))
+
+    def on_llm_end(self, *args, **kwargs) -> None:
+        self.events.append(('on_llm_end', args, kwargs))
+
+    def on_llm_error(self, *args, **kwargs) -> None:
+        self.events.append(('on_llm_error', args, kwargs))
+
+    def _calls(self, config):
+        callbacks = (config or {}).get('callbacks')
+        handlers = callbacks.handlers if isinstance(callbacks, BaseCallbackManager) else list(callbacks or [])
+        for name, args, kwargs in self.events:
+            for handler in handlers:
+                if not getattr(handler, 'ignore_llm', False):
+                    yield name, handler, args, kwargs
+
+    def replay(self, config) -> None:
+        for name, handler, args, kwargs in self._calls(config):
+            try:
+                getattr(handler, name)(*args, **kwargs)
+            except Exception as e:
+                logger.warning(f"Replaying {name} to {type(handler).__name__} failed: {e}")
+
+    async def areplay(self, config) -> None:
+        for name, handler, args, kwargs in self._calls(config):
+            try:
+                result = getattr(handler, name)(*args, **kwargs)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.warning(f"Replaying {name} to {type(handler).__name__} failed: {e}")
+
+
+def _backup_config(config, recorder: _RecordingHandler) -> Dict[str, Any]:
+    """Configuração do reserva: mesma requisição, mas com os eventos gravados em vez de exibidos."""
+    return {**(config or {}), 'callbacks': [recorder]}
+
+
+class HedgedChatModel(DelegatingRunnable):
+    """Envia a requisição ao reserva quando o principal passa do prazo."""
+
+    def _rebind(self, runnables: List[Runnable]) -> "HedgedChatModel":
+        return HedgedChatModel(runnables, self.names)
+
+    def deadline(self) -> float:
+        """Prazo antes de acionar o reserva: p95 recente do principal, ou o padrão."""
+        config = alternative_settings.HEDGING_CONFIG
+        summary = provider_metrics.get_summary(self.names[0])
+        if summary['p95'] is not None and summary['samples'] >= alternative_settings.ROUTING_CONFIG['min_samples']:
+            return max(config["min_deadline_seconds"], summary['p95'])
+        return config["default_deadline_seconds"]
+
+    def _may_hedge(self) -> bool:
+        limiter = rate_limiter_registry.get(self.names[1])
+        if limiter is not None and limiter.retry_after() > 0:
+            return False
+        if not circuit_breakers.get(self.names[1]).is_available():
+            return False
+        if not _get_budget().try_spend():
+            hedge_stats.add(denied=1)
+            return False
+        return True
+
+    def _log_hedge(self, deadline: float) -> None:
+        hedge_stats.add(hedged=1)
+        logger.info(f"{self.names[0]} did not answer within {deadline:.1f}s; hedging to {self.names[1]}")
+
+    def invoke(self, input, config=None, **kwargs):
+        hedge_stats.add(requests=1)
+        _get_budget().on_request()
+        deadline = self.deadline()
+        primary, backup = self.runnables
+
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        script_ctx = get_script_run_ctx(suppress_warning=True)
+
+        def submit(runnable, run_config):
+            return _hedge_pool.submit(contextvars.copy_context().run, run_with_script_context,
+                                      script_ctx, runnable.invoke, input, run_config, **kwargs)
+
+        started = time.perf_counter()
+        futures = [submit(primary, config)]
+        done, _ = wait(futures, timeout=deadline)
+        if done or not self._may_hedge():
+            return futures[0].result()
+
+        self._log_hedge(deadline)
+        # O principal continua com os callbacks da requisição; os do reserva são gravados
+        # e só repassados se ele vencer, para não intercalar os dois textos no chat
+        recorder = _RecordingHandler()
+        futures.append(submit(backup, _backup_config(config, recorder)))
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self._record_winner(futures.index(future), started)
+                    for other in pending:
+                        # Uma chamada síncrona em andamento não pode ser interrompida:
+                        # o resultado do perdedor é apenas descartado
+                        other.cancel()
+                    if future is futures[1]:
+                        recorder.replay(config)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        hedge_stats.add(requests=1)
+        _get_budget().on_request()
+        deadline = self.deadline()
+        primary, backup = self.runnables
+
+        started = time.perf_counter()
+        tasks = [asyncio.ensure_future(primary.ainvoke(input, config, **kwargs))]
+        pending = set(tasks)
+        try:
+            done, _ = await asyncio.wait(pending, timeout=deadline)
+            if done or not self._may_hedge():
+                return await tasks[0]
+
+            self._log_hedge(deadline)
+            recorder = _RecordingHandler()
+            tasks.append(asyncio.ensure_future(backup.ainvoke(input, _backup_config(config, recorder), **kwargs)))
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self._record_winner(tasks.index(task), started)
+                        if task is tasks[1]:
+                            await recorder.areplay(config)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # O perdedor (ou tudo, se a execução for cancelada) é cancelado de fato
+            for task in pending:
+                task.cancel()
+
+    def _record_winner(self, index: int, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        if index == 1:
+            hedge_stats.add(backup_wins=1, backup_win_seconds=elapsed)
+            logger.info(f"Hedge won by {self.names[1]} after {elapsed:.1f}s; cancelled {self.names[0]}")
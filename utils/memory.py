@@ -1,15 +1,137 @@
 """
 Configuração de memória para o EDA Agent.
+
+O backend padrão (`TokenBudgetMemory`) limita o histórico enviado ao LLM por
+orçamento de tokens, e não por número de mensagens: as interações recentes são
+mantidas na íntegra, as mais antigas viram linhas de um resumo incremental e
+respostas longas (tabelas, saídas de ferramentas) ficam guardadas por
+referência, recuperáveis com a ferramenta `get_previous_answer`.
 """
 
+import re
 import streamlit as st
 import logging
+from typing import Any, Dict, List
 from langchain.memory import ConversationBufferWindowMemory
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, get_buffer_string
 from config.settings import settings
+from tools.formatting import estimate_tokens
 
 logger = logging.getLogger(__name__)
 
+_REFERENCE_MARKER = re.compile(r"\n?\[… \d+ tokens omitidos; .*?\]")
+
+
+def _shorten(text: str, max_chars: int) -> str:
+    """Primeiro trecho de texto corrido (sem tabelas e cabeçalhos markdown)."""
+    text = _REFERENCE_MARKER.sub("", text)
+    lines = [line.strip(" #*-") for line in text.splitlines()
+             if line.strip() and not line.lstrip().startswith("|") and not set(line.strip()) <= set("-=*")]
+    text = " ".join(" ".join(lines).split())
+    sentence_end = text.find(". ")
+    if 0 < sentence_end < max_chars:
+        text = text[:sentence_end + 1]
+    return text if len(text) <= max_chars else text[:max_chars - 1].rstrip() + "…"
+
+
+class TokenBudgetMemory(BaseChatMemory):
+    """
+    Memória limitada por tokens: interações recentes na íntegra e um resumo
+    das anteriores, com o total de tokens do histórico aproximadamente constante.
+    """
+
+    memory_key: str = "chat_history"
+    max_tokens: int = 1500
+    summary_max_tokens: int = 300
+    max_message_tokens: int = 300
+    max_references: int = 50
+    summary_lines: List[str] = []
+    dropped_turns: int = 0
+    references: Dict[int, str] = {}
+    next_reference: int = 1
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        messages = list(self.chat_memory.messages)
+        if self.summary_lines:
+            header = "Resumo das interações anteriores"
+            if self.dropped_turns:
+                header += f" (+{self.dropped_turns} mais antigas omitidas)"
+            summary = header + ":\n" + "\n".join(self.summary_lines)
+            messages = [SystemMessage(content=summary)] + messages
+        if self.return_messages:
+            return {self.memory_key: messages}
+        return {self.memory_key: get_buffer_string(messages)}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, Any]) -> None:
+        input_str, output_str = self._get_input_output(inputs, outputs)
+        self.chat_memory.add_messages([
+            HumanMessage(content=self._by_reference(str(input_str))),
+            AIMessage(content=self._by_reference(str(output_str)))
+        ])
+        self._fold()
+
+    async def asave_context(self, inputs: Dict[str, Any], outputs: Dict[str, Any]) -> None:
+        self.save_context(inputs, outputs)
+
+    def clear(self) -> None:
+        super().clear()
+        self.summary_lines = []
+        self.dropped_turns = 0
+        self.references = {}
+
+    def get_reference(self, reference: int) -> str:
+        """Texto completo de uma mensagem guardada por referência (ou None)."""
+        return self.references.get(reference)
+
+    def get_token_count(self) -> int:
+        """Tokens estimados do histórico enviado ao LLM (resumo + mensagens)."""
+        messages = self.load_memory_variables({})[self.memory_key]
+        if not self.return_messages:
+            return estimate_tokens(messages)
+        return sum(estimate_tokens(str(m.content)) for m in messages)
+
+    def _by_reference(self, text: str) -> str:
+        """Mensagens longas ficam com o início e uma referência ao texto completo."""
+        tokens = estimate_tokens(text)
+        if tokens <= self.max_message_tokens:
+            return text
+        reference = self.next_reference
+        self.next_reference += 1
+        self.references[reference] = text
+        while len(self.references) > self.max_references:
+            self.references.pop(min(self.references))
+        head = text[:self.max_message_tokens * 4].rstrip()
+        return (f"{head}\n[… {tokens - estimate_tokens(head)} tokens omitidos; "
+                f"texto completo: get_previous_answer(reference={reference})]")
+
+    def _fold(self) -> None:
+        """Move as interações mais antigas para o resumo até caber no orçamento."""
+        messages = self.chat_memory.messages
+
+        def size(items) -> int:
+            return sum(estimate_tokens(str(m.content)) for m in items)
+
+        summary_budget = min(self.summary_max_tokens, self.max_tokens // 2)
+        while len(messages) > 2 and size(messages) > self.max_tokens - summary_budget:
+            question, answer = messages[0], messages[1]
+            line = f"- P: {_shorten(str(question.content), 100)} → R: {_shorten(str(answer.content), 160)}"
+            references = re.findall(r"reference=(\d+)", str(answer.content))
+            if references:
+                line += f" (ref {references[0]})"
+            self.summary_lines.append(line)
+            messages = messages[2:]
+        self.chat_memory.messages = messages
+
+        while self.summary_lines and estimate_tokens("\n".join(self.summary_lines)) > summary_budget:
+            self.summary_lines.pop(0)
+            self.dropped_turns += 1
+
+
 def create_memory(llm):
     """
     Cria e configura a memória para o agente.
@@ -18,28 +140,44 @@ def create_memory(llm):
         llm: Instância do modelo de linguagem
         
     Returns:
-        ConversationBufferWindowMemory: Memória configurada
+        TokenBudgetMemory ou ConversationBufferWindowMemory (MEMORY_CONFIG["backend"])
     """
+    config = settings.MEMORY_CONFIG
     try:
-        # Usar ConversationBufferWindowMemory que mantém as últimas K mensagens
-        memory = ConversationBufferWindowMemory(
-            k=settings.MEMORY_CONFIG["window_size"],
-            return_messages=settings.MEMORY_CONFIG["return_messages"],
-            memory_key="chat_history",
-            output_key="output"  # Especificar a chave de saída para evitar warning
-        )
-        logger.info(f"Memory configured successfully with window size of {settings.MEMORY_CONFIG['window_size']}")
+        if config["backend"] == "token_budget":
+            # Histórico limitado por tokens, com resumo das interações antigas
+            memory = TokenBudgetMemory(
+                max_tokens=config["max_tokens"],
+                summary_max_tokens=config["summary_max_tokens"],
+                max_message_tokens=config["max_message_tokens"],
+                return_messages=config["return_messages"],
+                memory_key="chat_history",
+                output_key="output"
+            )
+            logger.info(f"Memory configured successfully with a budget of {config['max_tokens']} tokens")
+        else:
+            # Usar ConversationBufferWindowMemory que mantém as últimas K mensagens
+            memory = ConversationBufferWindowMemory(
+                k=config["window_size"],
+                return_messages=config["return_messages"],
+                memory_key="chat_history",
+                output_key="output"  # Especificar a chave de saída para evitar warning
+            )
+            logger.info(f"Memory configured successfully with window size of {config['window_size']}")
         
         # Carregar histórico existente se houver
         if 'chat_history' in st.session_state and st.session_state.chat_history:
             # Carregar apenas as últimas mensagens para não sobrecarregar
-            messages_to_load = st.session_state.chat_history[-(settings.MEMORY_CONFIG["window_size"] * 2):]
+            messages_to_load = st.session_state.chat_history[-(config["window_size"] * 2):]
             
+            question = None
             for msg in messages_to_load:
                 if isinstance(msg, HumanMessage):
-                    memory.chat_memory.add_user_message(msg.content)
-                elif isinstance(msg, AIMessage):
-                    memory.chat_memory.add_ai_message(msg.content)
+                    question = msg.content
+                elif isinstance(msg, AIMessage) and question is not None:
+                    # save_context aplica o orçamento (referências e resumo) também ao histórico carregado
+                    memory.save_context({"input": question}, {"output": msg.content})
+                    question = None
             
             logger.info(f"Loaded {len(messages_to_load)} messages into memory")
         
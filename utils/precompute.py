@@ -0,0 +1,171 @@
+"""
+Pré-cálculo em segundo plano das análises mais caras logo após o upload.
+
+Enquanto o usuário lê o preview e escreve a primeira pergunta, uma thread
+aquece no `dataset_cache` o perfil das colunas, os resumos por coluna (quantis
+e outliers), as estatísticas descritivas, a matriz de correlação (e a ordem do
+heatmap) e os bins dos histogramas. As ferramentas usam as mesmas chaves do
+cache, então a primeira pergunta sobre correlação ou outliers já encontra o
+resultado pronto. O trabalho é cancelado quando a sessão troca de dataset.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config.settings import settings
+from utils.dataset_cache import (
+    dataset_fingerprint,
+    get_column_summary,
+    get_correlation_matrix,
+    get_correlation_order,
+    get_histogram_bins
+)
+
+logger = logging.getLogger(__name__)
+
+
+class PrecomputeJob:
+    """Sequência de tarefas de aquecimento do cache para um dataset."""
+
+    def __init__(self, fingerprint: str, tasks: List[Tuple[str, Callable[[], Any]]]):
+        self.fingerprint = fingerprint
+        self.tasks = tasks
+        self.total = len(tasks)
+        self.done = 0
+        self.current: Optional[str] = None
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancelled = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name=f"precompute-{self.fingerprint[:8]}",
+                                        daemon=True)
+        self.status = "running"
+        self.started_at = time.time()
+        self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            for label, task in self.tasks:
+                if self._cancelled.is_set():
+                    break
+                self.current = label
+                task()
+                self.done += 1
+        except Exception as e:
+            logger.warning(f"Precompute of dataset {self.fingerprint[:10]} failed at '{self.current}': {e}")
+            self.error = str(e)
+            self.status = "error"
+        else:
+            self.status = "cancelled" if self._cancelled.is_set() else "done"
+        self.current = None
+        self.finished_at = time.time()
+        # Liberar as referências ao DataFrame mantidas pelas tarefas
+        self.tasks = []
+        logger.info(f"Precompute of dataset {self.fingerprint[:10]} {self.status}: "
+                    f"{self.done}/{self.total} tasks in {self.elapsed:.1f}s")
+
+    def cancel(self) -> None:
+        """Interrompe o trabalho antes da próxima tarefa (os resultados já calculados ficam no cache)."""
+        self._cancelled.set()
+
+    @property
+    def running(self) -> bool:
+        return self.status == "running"
+
+    @property
+    def progress(self) -> float:
+        return self.done / self.total if self.total else 1.0
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'status': self.status,
+            'done': self.done,
+            'total': self.total,
+            'progress': self.progress,
+            'current': self.current,
+            'elapsed': self.elapsed,
+            'error': self.error
+        }
+
+
+class PrecomputeWorker:
+    """Um trabalho de pré-cálculo por sessão; trocar de dataset cancela o anterior."""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = config or settings.PRECOMPUTE_CONFIG
+        self._jobs: Dict[str, PrecomputeJob] = {}
+        self._lock = threading.Lock()
+
+    def start(self, session_id: str, df: pd.DataFrame) -> Optional[PrecomputeJob]:
+        """
+        Inicia o pré-cálculo do dataset da sessão (sem efeito se já foi iniciado para ele).
+
+        Returns:
+            O trabalho da sessão, ou None se o pré-cálculo estiver desativado
+        """
+        if not self.config["enabled"]:
+            return None
+        fingerprint = dataset_fingerprint(df)
+        with self._lock:
+            current = self._jobs.get(session_id)
+            if current is not None and current.fingerprint == fingerprint:
+                return current
+            if current is not None:
+                logger.info(f"Dataset changed, cancelling precompute of {current.fingerprint[:10]}")
+                current.cancel()
+            job = PrecomputeJob(fingerprint, self._plan(df))
+            self._jobs[session_id] = job
+        job.start()
+        logger.info(f"Started precompute of dataset {fingerprint[:10]} ({job.total} tasks)")
+        return job
+
+    def cancel(self, session_id: str) -> None:
+        """Cancela e esquece o trabalho da sessão (ex.: arquivo removido)."""
+        with self._lock:
+            job = self._jobs.pop(session_id, None)
+        if job is not None:
+            job.cancel()
+
+    def get_job(self, session_id: str) -> Optional[PrecomputeJob]:
+        with self._lock:
+            return self._jobs.get(session_id)
+
+    def _plan(self, df: pd.DataFrame) -> List[Tuple[str, Callable[[], Any]]]:
+        """Tarefas em ordem de custo crescente, com as mesmas chaves de cache das ferramentas."""
+        from tools.data_analysis import _column_profile, _numeric_describe
+
+        viz = settings.VISUALIZATION_CONFIG
+        numeric_cols = list(df.select_dtypes(include=[np.number]).columns)
+        warmed = numeric_cols[:self.config["max_columns"]]
+
+        tasks = [("perfil das colunas", lambda: _column_profile(df))]
+        tasks += [(f"quantis e outliers de {col}", lambda col=col: get_column_summary(df, col))
+                  for col in warmed]
+        if numeric_cols:
+            tasks.append(("estatísticas descritivas", lambda: _numeric_describe(df)))
+        if len(numeric_cols) >= 2:
+            tasks.append(("matriz de correlação", lambda: get_correlation_matrix(df)))
+            if len(numeric_cols) >= viz["heatmap_cluster_min_columns"]:
+                tasks.append(("ordem do heatmap", lambda: get_correlation_order(df)))
+        tasks += [(f"histograma de {col}", lambda col=col: get_histogram_bins(df, col, viz["histogram_bins"]))
+                  for col in warmed]
+        return tasks
+
+
+# Instância global
+precompute_worker = PrecomputeWorker()
@@ -0,0 +1,120 @@
+"""
+Métricas de latência e erros por provider de LLM.
+
+Cada cliente do pool registra, por um callback, a latência total, o tempo até
+o primeiro token e os erros de cada chamada. As amostras ficam em uma janela
+deslizante (por quantidade e por idade) compartilhada por todas as sessões, e
+são usadas pelo roteamento do `LLMFallbackManager`.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler
+
+from config.settings_alternatives import alternative_settings
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderStats:
+    """Janela deslizante de amostras (latência, primeiro token, sucesso) de um provider."""
+
+    def __init__(self, window_size: int, window_seconds: float):
+        self.window_seconds = window_seconds
+        self._samples: deque = deque(maxlen=window_size)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ttft: Optional[float], ok: bool) -> None:
+        with self._lock:
+            self._samples.append((time.time(), latency, ttft, ok))
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Retorna samples, p50, p95, error_rate e ttft_p50 da janela atual."""
+        cutoff = time.time() - self.window_seconds
+        with self._lock:
+            samples = [s for s in self._samples if s[0] >= cutoff]
+        latencies = [s[1] for s in samples if s[3]]
+        ttfts = [s[2] for s in samples if s[3] and s[2] is not None]
+        return {
+            'samples': len(samples),
+            'p50': float(np.percentile(latencies, 50)) if latencies else None,
+            'p95': float(np.percentile(latencies, 95)) if latencies else None,
+            'error_rate': sum(not s[3] for s in samples) / len(samples) if samples else 0.0,
+            'ttft_p50': float(np.percentile(ttfts, 50)) if ttfts else None
+        }
+
+
+class ProviderMetricsHandler(BaseCallbackHandler):
+    """Callback associado ao cliente de um provider que registra cada chamada."""
+
+    run_inline = True
+
+    def __init__(self, provider: str, registry: "ProviderMetricsRegistry"):
+        self.provider = provider
+        self.registry = registry
+        self._runs: Dict[UUID, list] = {}
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs) -> None:
+        # [início, primeiro token]
+        self._runs[run_id] = [time.perf_counter(), None]
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs) -> None:
+        run = self._runs.get(run_id)
+        if run is not None and run[1] is None and token:
+            run[1] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs) -> None:
+        self._finish(run_id, ok=True)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        if isinstance(error, asyncio.CancelledError):
+            # Chamadas canceladas (ex.: perdedor de um hedge) não indicam falha do provider
+            self._runs.pop(run_id, None)
+            return
+        self._finish(run_id, ok=False)
+
+    def _finish(self, run_id: UUID, ok: bool) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        now = time.perf_counter()
+        self.registry.record(self.provider, now - run[0], run[1] - run[0] if run[1] else None, ok)
+
+
+class ProviderMetricsRegistry:
+    """Métricas de todos os providers do processo."""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = config or alternative_settings.ROUTING_CONFIG
+        self._stats: Dict[str, ProviderStats] = {}
+        self._lock = threading.Lock()
+
+    def _get_stats(self, provider: str) -> ProviderStats:
+        with self._lock:
+            stats = self._stats.get(provider)
+            if stats is None:
+                stats = self._stats[provider] = ProviderStats(
+                    self.config["window_size"], self.config["window_seconds"]
+                )
+            return stats
+
+    def record(self, provider: str, latency: float, ttft: Optional[float], ok: bool) -> None:
+        self._get_stats(provider).record(latency, ttft, ok)
+
+    def handler(self, provider: str) -> ProviderMetricsHandler:
+        """Cria o callback de métricas a ser associado ao cliente do provider."""
+        return ProviderMetricsHandler(provider, self)
+
+    def get_summary(self, provider: str) -> Dict[str, Any]:
+        return self._get_stats(provider).get_summary()
+
+
+# Instância global
+provider_metrics = ProviderMetricsRegistry()
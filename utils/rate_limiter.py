@@ -0,0 +1,179 @@
+"""
+Rate limiting local dos providers de LLM com token buckets.
+
+Implementa o `RATE_LIMIT_CONFIG` de `config/settings_alternatives.py` antes que o
+provider responda 429: cada provider tem um bucket por janela (minuto, hora e
+dia), compartilhado por todas as sessões do processo. Uma requisição aguarda na
+fila enquanto a espera couber em `max_wait_seconds`; acima disso o limitador
+levanta `RateLimitExceeded` para que o chamador use o próximo provider.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from langchain_core.rate_limiters import BaseRateLimiter
+
+from config.settings_alternatives import alternative_settings
+
+logger = logging.getLogger(__name__)
+
+# (rótulo, chave em RATE_LIMIT_CONFIG, duração da janela em segundos)
+_WINDOWS = (
+    ('minuto', 'requests_per_minute', 60),
+    ('hora', 'requests_per_hour', 3600),
+    ('dia', 'requests_per_day', 86400),
+)
+
+
+class RateLimitExceeded(Exception):
+    """O provider não tem orçamento disponível dentro do tempo máximo de espera."""
+
+    def __init__(self, provider: str, retry_after: float):
+        self.provider = provider
+        self.retry_after = retry_after
+        super().__init__(
+            f"Rate limit local atingido para {provider} (disponível em {retry_after:.0f}s)"
+        )
+
+
+class TokenBucket:
+    """Bucket com reposição contínua: `capacity` requisições a cada `period` segundos."""
+
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Segundos até haver uma requisição disponível (após `refill`)."""
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class ProviderRateLimiter(BaseRateLimiter):
+    """Limitador de um provider, aplicando todas as janelas configuradas."""
+
+    def __init__(self, provider: str, config: Dict[str, Any] = None):
+        """
+        Inicializa o limitador.
+
+        Args:
+            provider: Nome do provider (usado nas mensagens e no status)
+            config: Configuração no formato de RATE_LIMIT_CONFIG
+        """
+        config = config or alternative_settings.RATE_LIMIT_CONFIG
+        self.provider = provider
+        self.max_wait_seconds = config.get('max_wait_seconds', 20)
+        self._buckets = {
+            label: TokenBucket(config[key], period)
+            for label, key, period in _WINDOWS if config.get(key)
+        }
+        self._lock = threading.Lock()
+
+    def _try_acquire(self) -> float:
+        """Consome uma requisição se possível; senão retorna a espera necessária."""
+        with self._lock:
+            now = time.monotonic()
+            for bucket in self._buckets.values():
+                bucket.refill(now)
+            wait = max((b.wait_time() for b in self._buckets.values()), default=0.0)
+            if wait == 0:
+                for bucket in self._buckets.values():
+                    bucket.tokens -= 1
+            return wait
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        """
+        Reserva uma requisição, aguardando na fila se necessário.
+
+        O `ChatOpenAI` ignora o retorno de `acquire`, por isso uma espera acima de
+        `max_wait_seconds` é sinalizada com `RateLimitExceeded`.
+        """
+        deadline = time.monotonic() + self.max_wait_seconds
+        while True:
+            wait = self._try_acquire()
+            if wait == 0:
+                return True
+            if not blocking:
+                return False
+            if time.monotonic() + wait > deadline:
+                raise RateLimitExceeded(self.provider, wait)
+            logger.info(f"Throttling {self.provider}: waiting {wait:.1f}s for rate limit budget")
+            time.sleep(wait)
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        deadline = time.monotonic() + self.max_wait_seconds
+        while True:
+            wait = self._try_acquire()
+            if wait == 0:
+                return True
+            if not blocking:
+                return False
+            if time.monotonic() + wait > deadline:
+                raise RateLimitExceeded(self.provider, wait)
+            await asyncio.sleep(wait)
+
+    def retry_after(self) -> float:
+        """Segundos até a próxima requisição disponível (0 se houver orçamento)."""
+        with self._lock:
+            now = time.monotonic()
+            for bucket in self._buckets.values():
+                bucket.refill(now)
+            return max((b.wait_time() for b in self._buckets.values()), default=0.0)
+
+    def has_capacity(self) -> bool:
+        """Verifica se uma requisição seria atendida dentro da espera máxima."""
+        return self.retry_after() <= self.max_wait_seconds
+
+    def drain(self, window: Optional[str] = 'minuto') -> None:
+        """Zera o orçamento de uma janela (ou de todas) após um 429 real do provider."""
+        with self._lock:
+            for label, bucket in self._buckets.items():
+                if window is None or label == window:
+                    bucket.refill(time.monotonic())
+                    bucket.tokens = 0.0
+
+    def get_remaining(self) -> Dict[str, Dict[str, float]]:
+        """Retorna, por janela, as requisições restantes e a capacidade."""
+        with self._lock:
+            now = time.monotonic()
+            remaining = {}
+            for label, bucket in self._buckets.items():
+                bucket.refill(now)
+                remaining[label] = {'remaining': int(bucket.tokens), 'capacity': bucket.capacity}
+            return remaining
+
+
+class RateLimiterRegistry:
+    """Limitadores por provider, compartilhados por todas as sessões do processo."""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = config or alternative_settings.RATE_LIMIT_CONFIG
+        self.enabled = self.config.get('enabled', True)
+        self._limiters: Dict[str, ProviderRateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider: str) -> Optional[ProviderRateLimiter]:
+        """Retorna o limitador do provider (None se o rate limiting estiver desabilitado)."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            limiter = self._limiters.get(provider)
+            if limiter is None:
+                limiter = self._limiters[provider] = ProviderRateLimiter(provider, self.config)
+            return limiter
+
+    def get_remaining(self, provider: str) -> Dict[str, Dict[str, float]]:
+        limiter = self.get(provider)
+        return limiter.get_remaining() if limiter else {}
+
+
+# Instância global
+rate_limiter_registry = RateLimiterRegistry()
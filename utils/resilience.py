@@ -0,0 +1,225 @@
+"""
+Resiliência das chamadas aos providers de LLM.
+
+- `classify_error`: separa erros de rate limit, transitórios (rede, timeout,
+  5xx) e permanentes (requisição inválida, autenticação, etc.).
+- `backoff_delay`: espera exponencial com jitter entre novas tentativas.
+- `CircuitBreaker`: um por provider, compartilhado por todas as sessões do
+  processo. Após falhas consecutivas o circuito abre e as chamadas ao provider
+  falham imediatamente; passado o tempo de recuperação, uma chamada de teste
+  (meio-aberto) decide se ele volta a fechar.
+"""
+
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from config.settings_alternatives import alternative_settings
+from utils.rate_limiter import RateLimitExceeded
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT = "rate_limit"
+TRANSIENT = "transient"
+PERMANENT = "permanent"
+
+# Códigos HTTP que indicam falha temporária do provider
+_TRANSIENT_STATUS = {408, 409, 425, 500, 502, 503, 504, 520, 522, 524, 529}
+
+
+class CircuitOpenError(Exception):
+    """O circuito do provider está aberto: a chamada nem é enviada."""
+
+    def __init__(self, provider: str, retry_after: float):
+        self.provider = provider
+        self.retry_after = retry_after
+        super().__init__(
+            f"Circuito aberto para {provider} após falhas consecutivas "
+            f"(nova tentativa em {retry_after:.0f}s)"
+        )
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        response = getattr(error, 'response', None)
+        status = getattr(response, 'status_code', None)
+    return status if isinstance(status, int) else None
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    Classifica o erro de uma chamada ao LLM.
+
+    Returns:
+        RATE_LIMIT, TRANSIENT ou PERMANENT
+    """
+    if isinstance(error, RateLimitExceeded):
+        return RATE_LIMIT
+    if isinstance(error, CircuitOpenError):
+        return TRANSIENT
+
+    status = _status_code(error)
+    if status == 429:
+        return RATE_LIMIT
+    if status is not None:
+        return TRANSIENT if status in _TRANSIENT_STATUS else PERMANENT
+
+    import httpx
+    import openai
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError,
+                          httpx.TimeoutException, httpx.NetworkError, TimeoutError, ConnectionError)):
+        return TRANSIENT
+    return PERMANENT
+
+
+def is_context_overflow(error: BaseException) -> bool:
+    """Verifica se o provider recusou a requisição por exceder o contexto do modelo."""
+    text = str(error).lower()
+    return classify_error(error) == PERMANENT and any(
+        marker in text for marker in ('context_length', 'context length', 'maximum context', 'too many tokens')
+    )
+
+
+def retry_after_hint(error: BaseException) -> Optional[float]:
+    """Segundos de espera indicados pelo provider (cabeçalho Retry-After), se houver."""
+    if isinstance(error, (RateLimitExceeded, CircuitOpenError)):
+        return error.retry_after
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float, maximum: float, rng: random.Random = random) -> float:
+    """Espera antes da tentativa `attempt` (a partir de 0): jitter completo sobre base * 2^attempt."""
+    return rng.uniform(0, min(maximum, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """Circuito fechado / aberto / meio-aberto de um provider."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, recovery_seconds: float,
+                 half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    def _refresh(self, now: float) -> None:
+        if self._state == self.OPEN and now - self._opened_at >= self.recovery_seconds:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+            logger.info(f"Circuit for {self.name} is half-open; allowing a probe request")
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh(time.monotonic())
+            return self._state
+
+    def retry_after(self) -> float:
+        """Segundos até o circuito aceitar uma nova chamada (0 se aceita agora)."""
+        with self._lock:
+            now = time.monotonic()
+            self._refresh(now)
+            if self._state == self.OPEN:
+                return self.recovery_seconds - (now - self._opened_at)
+            if self._state == self.HALF_OPEN and self._half_open_calls >= self.half_open_max_calls:
+                return self.recovery_seconds
+            return 0.0
+
+    def is_available(self) -> bool:
+        """Verifica, sem reservar a chamada, se o provider aceitaria uma requisição."""
+        return self.retry_after() == 0
+
+    def allow_request(self) -> bool:
+        """Reserva uma chamada; no estado meio-aberto apenas as chamadas de teste passam."""
+        with self._lock:
+            self._refresh(time.monotonic())
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit for {self.name} closed after a successful request")
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._refresh(now)
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                    logger.warning(f"Circuit for {self.name} opened after {self._failures} "
+                                   f"consecutive failures; retrying in {self.recovery_seconds:.0f}s")
+                self._state = self.OPEN
+                self._opened_at = now
+
+    def release(self) -> None:
+        """Devolve uma chamada de teste que terminou sem indicar a saúde do provider."""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            self._refresh(now)
+            return {
+                'state': self._state,
+                'failures': self._failures,
+                'times_opened': self.times_opened,
+                'retry_after': (self.recovery_seconds - (now - self._opened_at)
+                                if self._state == self.OPEN else 0.0)
+            }
+
+
+class CircuitBreakerRegistry:
+    """Circuitos de todos os providers do processo."""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = config or alternative_settings.RESILIENCE_CONFIG
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(provider)
+            if breaker is None:
+                breaker = self._breakers[provider] = CircuitBreaker(
+                    provider,
+                    self.config["failure_threshold"],
+                    self.config["recovery_seconds"],
+                    self.config["half_open_max_calls"]
+                )
+            return breaker
+
+    def get_status(self, provider: str) -> Dict[str, Any]:
+        return self.get(provider).get_status()
+
+
+# Instância global
+circuit_breakers = CircuitBreakerRegistry()
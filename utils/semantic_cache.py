@@ -0,0 +1,211 @@
+"""
+Índice local de similaridade para perguntas quase duplicadas.
+
+Perguntas são representadas por vetores TF-IDF de n-gramas de caracteres
+(dentro de cada palavra, após remover acentos e palavras vazias), sem nenhum
+serviço externo de embeddings. Um índice invertido de n-gramas limita a
+comparação a poucos candidatos, de modo que a busca continua rápida com
+milhares de entradas. Para evitar falsos acertos, duas perguntas só são
+consideradas equivalentes se citarem exatamente as mesmas colunas e números.
+"""
+
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, List, Optional, Tuple
+
+# Palavras sem conteúdo analítico (sem acentos, pois o texto é normalizado antes)
+STOPWORDS = {
+    'a', 'o', 'as', 'os', 'de', 'da', 'do', 'das', 'dos', 'e', 'em', 'no', 'na', 'nos', 'nas',
+    'um', 'uma', 'uns', 'umas', 'para', 'pra', 'por', 'com', 'que', 'qual', 'quais', 'como',
+    'me', 'mostre', 'mostrar', 'mostra', 'exiba', 'exibir', 'gere', 'gerar', 'crie', 'criar',
+    'faca', 'fazer', 'calcule', 'calcular', 'ver', 'veja', 'favor', 'entre', 'sobre',
+    'sao', 'existe', 'existem', 'ha', 'tem', 'voce', 'pode', 'poderia', 'dados', 'dataset',
+    'coluna', 'colunas', 'variaveis', 'variavel', 'the', 'of', 'show', 'what', 'is', 'are',
+    'please', 'between'
+}
+
+_WORD_RE = re.compile(r'[a-z0-9_]+')
+_NUMBER_RE = re.compile(r'\b\d+(?:[.,]\d+)?\b')
+
+
+def fold_text(text: str) -> str:
+    """Remove acentos e converte para minúsculas."""
+    normalized = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(ch for ch in normalized if not unicodedata.combining(ch))
+
+
+def extract_entities(text: str, columns: Iterable[str] = ()) -> FrozenSet[str]:
+    """
+    Extrai as colunas do dataset e os números citados na pergunta.
+
+    Args:
+        text: Pergunta do usuário
+        columns: Nomes das colunas do dataset
+
+    Returns:
+        FrozenSet[str]: Entidades normalizadas
+    """
+    folded = fold_text(text)
+    words = set(_WORD_RE.findall(folded))
+    entities = {f"#{number.replace(',', '.')}" for number in _NUMBER_RE.findall(folded)}
+    for column in columns:
+        name = fold_text(str(column))
+        if name in words or (' ' in name and name in folded):
+            entities.add(name)
+    return frozenset(entities)
+
+
+def char_ngrams(text: str, ngram_range: Tuple[int, int] = (3, 5)) -> Counter:
+    """Conta os n-gramas de caracteres de cada palavra relevante (estilo 'char_wb')."""
+    grams = Counter()
+    low, high = ngram_range
+    for word in _WORD_RE.findall(fold_text(text)):
+        if word in STOPWORDS:
+            continue
+        padded = f" {word} "
+        for n in range(low, high + 1):
+            for i in range(max(len(padded) - n + 1, 1)):
+                grams[padded[i:i + n]] += 1
+    return grams
+
+
+class SemanticQueryIndex:
+    """Índice TF-IDF incremental de perguntas, particionado por dataset/modelo."""
+
+    def __init__(self, threshold: float = 0.8, ngram_range: Tuple[int, int] = (3, 5),
+                 probe_grams: int = 12, max_candidates: int = 50):
+        """
+        Inicializa o índice.
+
+        Args:
+            threshold: Similaridade de cosseno mínima para considerar um acerto
+            ngram_range: Tamanhos mínimo e máximo dos n-gramas
+            probe_grams: N-gramas mais raros da pergunta usados para buscar candidatos
+            max_candidates: Candidatos comparados por busca
+        """
+        self.threshold = threshold
+        self.ngram_range = ngram_range
+        self.probe_grams = probe_grams
+        self.max_candidates = max_candidates
+        self._docs: Dict[Hashable, Tuple[Hashable, Counter, FrozenSet[str]]] = {}
+        self._postings: Dict[Tuple[Hashable, str], set] = defaultdict(set)
+        self._doc_freq: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _idf(self, gram: str) -> float:
+        return math.log((1 + len(self._docs)) / (1 + self._doc_freq[gram])) + 1
+
+    def _norm(self, grams: Counter) -> float:
+        return math.sqrt(sum((tf * self._idf(g)) ** 2 for g, tf in grams.items())) or 1.0
+
+    def add(self, key: Hashable, text: str, partition: Hashable, entities: FrozenSet[str] = frozenset()) -> None:
+        """Indexa uma pergunta sob a chave informada (substitui a existente)."""
+        grams = char_ngrams(text, self.ngram_range)
+        with self._lock:
+            self._remove_locked(key)
+            self._docs[key] = (partition, grams, entities)
+            for gram in grams:
+                self._doc_freq[gram] += 1
+                self._postings[(partition, gram)].add(key)
+
+    def remove(self, key: Hashable) -> None:
+        with self._lock:
+            self._remove_locked(key)
+
+    def _remove_locked(self, key: Hashable) -> None:
+        entry = self._docs.pop(key, None)
+        if entry is None:
+            return
+        partition, grams, _ = entry
+        for gram in grams:
+            self._doc_freq[gram] -= 1
+            if self._doc_freq[gram] <= 0:
+                del self._doc_freq[gram]
+            postings = self._postings.get((partition, gram))
+            if postings is not None:
+                postings.discard(key)
+                if not postings:
+                    del self._postings[(partition, gram)]
+
+    def query(self, text: str, partition: Hashable,
+              entities: FrozenSet[str] = frozenset()) -> Optional[Tuple[Hashable, float]]:
+        """
+        Procura a pergunta indexada mais parecida na mesma partição.
+
+        Returns:
+            Tupla (chave, similaridade) acima do limiar, ou None
+        """
+        grams = char_ngrams(text, self.ngram_range)
+        if not grams:
+            return None
+        with self._lock:
+            # Candidatos: documentos que compartilham os n-gramas indexados mais raros da pergunta
+            known = [gram for gram in grams if gram in self._doc_freq]
+            probes = sorted(known, key=self._idf, reverse=True)[:self.probe_grams]
+            overlap = Counter()
+            for gram in probes:
+                overlap.update(self._postings.get((partition, gram), ()))
+            if not overlap:
+                return None
+
+            query_norm = self._norm(grams)
+            best = None
+            for key, _ in overlap.most_common(self.max_candidates):
+                _, doc_grams, doc_entities = self._docs[key]
+                if doc_entities != entities:
+                    continue
+                dot = sum(tf * doc_grams[g] * self._idf(g) ** 2
+                          for g, tf in grams.items() if g in doc_grams)
+                score = dot / (query_norm * self._norm(doc_grams))
+                if best is None or score > best[1]:
+                    best = (key, score)
+        if best is not None and best[1] >= self.threshold:
+            return best
+        return None
+
+
+def measure_false_hits(pairs: List[Tuple[str, str, bool]], threshold: float = 0.8,
+                       columns: Iterable[str] = ()) -> Dict[str, Any]:
+    """
+    Mede acertos e falsos acertos do índice em pares rotulados.
+
+    Args:
+        pairs: Lista de (pergunta em cache, nova pergunta, são equivalentes?)
+        threshold: Limiar de similaridade avaliado
+        columns: Colunas do dataset usadas na extração de entidades
+
+    Returns:
+        Dict com hits, false_hits, false_hit_rate (falsos/acertos), recall e
+        latência média de busca em milissegundos
+    """
+    columns = list(columns)
+    hits = false_hits = true_positives = positives = 0
+    elapsed = 0.0
+    for cached, new, equivalent in pairs:
+        index = SemanticQueryIndex(threshold=threshold)
+        index.add('cached', cached, 'p', extract_entities(cached, columns))
+        started = time.perf_counter()
+        match = index.query(new, 'p', extract_entities(new, columns))
+        elapsed += time.perf_counter() - started
+        positives += equivalent
+        if match is not None:
+            hits += 1
+            if equivalent:
+                true_positives += 1
+            else:
+                false_hits += 1
+    return {
+        'threshold': threshold,
+        'hits': hits,
+        'false_hits': false_hits,
+        'false_hit_rate': false_hits / hits if hits else 0.0,
+        'recall': true_positives / positives if positives else 0.0,
+        'avg_query_ms': elapsed / max(len(pairs), 1) * 1000
+    }
@@ -0,0 +1,307 @@
+"""
+Execução especulativa das análises de acompanhamento mais prováveis.
+
+Depois de uma pergunta sobre uma coluna, a próxima é bem previsível ("e o
+boxplot dela?", "com o que ela se correlaciona?"). Enquanto o usuário lê a
+resposta, o agendador executa em uma thread ociosa as ferramentas seguintes
+mais prováveis para as colunas discutidas, dentro de um orçamento de CPU por
+resposta. Os resultados ficam guardados por alguns minutos; quando a ferramenta
+é chamada com os mesmos argumentos (pelo LLM, pelo roteador ou pelo modo
+offline), o resultado especulado é entregue sem recalcular. Acertos e trabalho
+desperdiçado (resultados descartados sem uso) são contabilizados.
+"""
+
+import functools
+import inspect
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config.settings import settings
+from tools.context import DataContext, current_data_context, use_data_context
+from tools.formatting import full_detail, is_compact
+from utils.dataset_cache import dataset_cache, dataset_fingerprint, get_correlation_matrix
+
+logger = logging.getLogger(__name__)
+
+# Ferramentas seguintes mais prováveis após cada ferramenta, em ordem de probabilidade
+FOLLOW_UPS = {
+    'plot_histogram': ('plot_boxplot', 'get_descriptive_statistics', 'plot_scatter'),
+    'plot_boxplot': ('plot_histogram', 'get_descriptive_statistics', 'plot_scatter'),
+    'get_descriptive_statistics': ('plot_histogram', 'plot_boxplot', 'plot_scatter'),
+    'plot_scatter': ('plot_histogram', 'plot_boxplot'),
+    'plot_correlation_heatmap': ('plot_scatter',),
+    'get_data_description': ('get_descriptive_statistics', 'plot_correlation_heatmap', 'plot_histograms_grid'),
+    'plot_histograms_grid': ('plot_multiple_boxplots', 'plot_correlation_heatmap'),
+    'plot_multiple_boxplots': ('plot_correlation_heatmap', 'plot_histograms_grid'),
+}
+
+# Ferramentas de uma coluna (especuladas para cada coluna discutida)
+COLUMN_TOOLS = ('plot_histogram', 'plot_boxplot', 'get_descriptive_statistics')
+
+# Ferramentas cuja saída muda entre o modo compacto (LLM) e o completo (exibição direta)
+DETAIL_SENSITIVE_TOOLS = ('get_data_description', 'get_descriptive_statistics')
+
+_MISS = object()
+
+
+class SpeculativeScheduler:
+    """Agenda, executa e entrega resultados especulados de ferramentas."""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = config or settings.SPECULATION_CONFIG
+        self._executor = ThreadPoolExecutor(max_workers=self.config["max_workers"],
+                                            thread_name_prefix="speculation")
+        self._results: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._in_flight: Dict[tuple, Future] = {}
+        self._generations: Dict[str, int] = {}
+        self._tool_seconds: Dict[str, float] = {}  # Custo médio (CPU) por ferramenta
+        self._lock = threading.Lock()
+        self._tools = None
+        self.stats = {'scheduled': 0, 'completed': 0, 'hits': 0, 'wasted': 0, 'skipped_budget': 0,
+                      'cancelled': 0, 'compute_seconds': 0.0, 'saved_seconds': 0.0, 'wasted_seconds': 0.0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.config["enabled"]
+
+    def _get_tools(self) -> Dict[str, Any]:
+        if self._tools is None:
+            from tools import ALL_TOOLS
+            self._tools = {tool.name: tool for tool in ALL_TOOLS}
+        return self._tools
+
+    def _key(self, fingerprint: str, tool_name: str, params: Dict[str, Any], compact: bool) -> Optional[tuple]:
+        """Chave do resultado: argumentos completos (com padrões) e, se relevante, o modo de detalhe."""
+        tool = self._get_tools().get(tool_name)
+        if tool is None or getattr(tool, 'func', None) is None:
+            return None
+        try:
+            bound = inspect.signature(tool.func).bind(**params)
+        except TypeError:
+            return None
+        bound.apply_defaults()
+        detail = compact if tool_name in DETAIL_SENSITIVE_TOOLS else None
+        return (fingerprint, tool_name, tuple(sorted(bound.arguments.items(), key=lambda item: item[0])), detail)
+
+    # ------------------------------------------------------------------ previsão
+
+    def predict(self, df: pd.DataFrame, tool_name: str, params: Dict[str, Any],
+                columns: List[Any]) -> List[Tuple[str, Dict[str, Any]]]:
+        """Chamadas seguintes mais prováveis, em ordem, para as colunas discutidas."""
+        numeric = set(df.select_dtypes(include=[np.number]).columns)
+        discussed = [col for col in dict.fromkeys(
+            [params.get('column'), params.get('x_column'), params.get('y_column'), *columns]
+        ) if col in numeric][:2]
+
+        calls = []
+        for follow_up in FOLLOW_UPS.get(tool_name, ()):
+            if follow_up in COLUMN_TOOLS and discussed:
+                calls.extend((follow_up, {'column': col}) for col in discussed)
+            elif follow_up == 'plot_scatter':
+                pair = self._scatter_pair(df, discussed)
+                if pair is not None:
+                    calls.append((follow_up, {'x_column': pair[0], 'y_column': pair[1]}))
+            elif follow_up not in COLUMN_TOOLS or follow_up == 'get_descriptive_statistics':
+                calls.append((follow_up, {}))
+        # A chamada que acabou de ser respondida não precisa ser especulada
+        return [call for call in calls if call != (tool_name, params)][:self.config["max_tasks"]]
+
+    @staticmethod
+    def _scatter_pair(df: pd.DataFrame, discussed: List[Any]) -> Optional[Tuple[Any, Any]]:
+        """
+        Par do scatter provável: a coluna discutida e a mais correlacionada com ela (ou o par mais forte).
+
+        A matriz de correlação só é usada se já estiver em cache (pré-cálculo ou heatmap):
+        calculá-la aqui, em datasets largos, custaria mais que as próprias especulações.
+        """
+        if len(discussed) == 2:
+            return discussed[0], discussed[1]
+        if not dataset_cache.contains(df, ('correlation',)):
+            return None
+        corr = get_correlation_matrix(df)
+        if len(corr.columns) < 2:
+            return None
+        strength = corr.abs().where(~np.eye(len(corr), dtype=bool))
+        if discussed:
+            partners = strength[discussed[0]].dropna()
+            return (discussed[0], partners.idxmax()) if len(partners) else None
+        stacked = strength.stack()
+        return tuple(stacked.idxmax()) if len(stacked) else None
+
+    # ------------------------------------------------------------------ agendamento
+
+    def schedule(self, session_id: str, df: pd.DataFrame, tool_name: str, params: Dict[str, Any],
+                 columns: List[Any] = (), compact: bool = True) -> None:
+        """
+        Agenda as chamadas seguintes prováveis após uma resposta (a previsão também roda em segundo plano).
+
+        Args:
+            session_id: Sessão (uma nova pergunta cancela as tarefas pendentes dela)
+            df: Dataset da sessão
+            tool_name: Ferramenta usada na resposta
+            params: Parâmetros dessa ferramenta
+            columns: Colunas citadas na pergunta
+            compact: Modo em que a próxima resposta deve usar as ferramentas
+        """
+        if not self.enabled or df is None:
+            return
+        with self._lock:
+            generation = self._generations.get(session_id, 0) + 1
+            self._generations[session_id] = generation
+        self._executor.submit(self._start_round, session_id, generation, df, tool_name, dict(params),
+                              list(columns), compact)
+
+    def _start_round(self, session_id: str, generation: int, df: pd.DataFrame,
+                     tool_name: str, params: Dict[str, Any], columns: List[Any], compact: bool) -> None:
+        started = time.thread_time()
+        try:
+            calls = self.predict(df, tool_name, params, columns)
+        except Exception as e:
+            logger.debug(f"Speculation prediction after {tool_name} failed: {e}")
+            return
+        fingerprint = dataset_fingerprint(df)
+        # A previsão também é trabalho especulativo: conta no orçamento da rodada
+        budget = {'remaining': self.config["cpu_budget_seconds"] - (time.thread_time() - started)}
+        scheduled = 0
+        with self._lock:
+            if self._generations.get(session_id) != generation:
+                return
+            for call_tool, call_params in calls:
+                key = self._key(fingerprint, call_tool, call_params, compact)
+                if key is None or key in self._results or key in self._in_flight:
+                    continue
+                future = self._executor.submit(self._run, session_id, generation, df, key,
+                                               call_tool, call_params, compact, budget)
+                self._in_flight[key] = future
+                future.add_done_callback(lambda _, key=key: self._forget(key))
+                scheduled += 1
+            self.stats['scheduled'] += scheduled
+        if scheduled:
+            logger.info(f"Scheduled {scheduled} speculative tool calls after {tool_name}")
+
+    def cancel_pending(self, session_id: str) -> None:
+        """Nova pergunta da sessão: tarefas ainda não iniciadas deixam de rodar."""
+        with self._lock:
+            self._generations[session_id] = self._generations.get(session_id, 0) + 1
+
+    def _forget(self, key: tuple) -> None:
+        with self._lock:
+            self._in_flight.pop(key, None)
+
+    def _run(self, session_id: str, generation: int, df: pd.DataFrame, key: tuple, tool_name: str,
+             params: Dict[str, Any], compact: bool, budget: Dict[str, float]) -> Any:
+        with self._lock:
+            if self._generations.get(session_id) != generation:
+                self.stats['cancelled'] += 1
+                return _MISS
+            expected = self._tool_seconds.get(tool_name, 0.0)
+            if budget['remaining'] <= 0 or expected > budget['remaining']:
+                self.stats['skipped_budget'] += 1
+                return _MISS
+
+        started = time.thread_time()
+        try:
+            func = self._get_tools()[tool_name].func
+            # As ferramentas analisam o dataset da rodada, sem depender da sessão do Streamlit
+            with use_data_context(DataContext(df=df)):
+                if compact:
+                    result = func(**params)
+                else:
+                    with full_detail():
+                        result = func(**params)
+        except Exception as e:
+            logger.debug(f"Speculative {tool_name}({params}) failed: {e}")
+            return _MISS
+        seconds = time.thread_time() - started
+
+        with self._lock:
+            budget['remaining'] -= seconds
+            previous = self._tool_seconds.get(tool_name)
+            self._tool_seconds[tool_name] = seconds if previous is None else 0.7 * previous + 0.3 * seconds
+            self.stats['completed'] += 1
+            self.stats['compute_seconds'] += seconds
+            self._results[key] = {'result': result, 'seconds': seconds, 'created': time.time()}
+            self._evict()
+        return result
+
+    def _evict(self) -> None:
+        """Descarta resultados expirados ou excedentes (contados como desperdício). Chamar com o lock."""
+        now = time.time()
+        for key in [k for k, entry in self._results.items()
+                    if now - entry['created'] > self.config["ttl_seconds"]]:
+            self._waste(key)
+        while len(self._results) > self.config["max_results"]:
+            self._waste(next(iter(self._results)))
+
+    def _waste(self, key: tuple) -> None:
+        entry = self._results.pop(key)
+        self.stats['wasted'] += 1
+        self.stats['wasted_seconds'] += entry['seconds']
+
+    # ------------------------------------------------------------------ consumo
+
+    def take(self, df: Optional[pd.DataFrame], tool_name: str, params: Dict[str, Any]) -> Any:
+        """
+        Entrega o resultado especulado da chamada, se houver (aguarda se ainda está em cálculo).
+
+        Returns:
+            O resultado, ou `_MISS`
+        """
+        if not self.enabled or df is None:
+            return _MISS
+        key = self._key(dataset_fingerprint(df), tool_name, params, is_compact())
+        if key is None:
+            return _MISS
+        with self._lock:
+            self._evict()
+            future = self._in_flight.get(key)
+        if future is not None and future.running():
+            # Já em cálculo: esperar custa menos que recalcular
+            future.result()
+        with self._lock:
+            entry = self._results.pop(key, None)
+            if entry is None:
+                return _MISS
+            self.stats['hits'] += 1
+            self.stats['saved_seconds'] += entry['seconds']
+        logger.info(f"Speculative hit for {tool_name} (saved {entry['seconds'] * 1000:.0f} ms)")
+        return entry['result']
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['pending_results'] = len(self._results)
+        # Resultados ainda guardados contam como não usados
+        stats['hit_rate'] = stats['hits'] / stats['completed'] if stats['completed'] else 0.0
+        return stats
+
+
+def with_speculation(tools: list) -> list:
+    """
+    Retorna cópias das ferramentas que consultam os resultados especulados antes
+    de executar. Aplicar antes de `with_async_support`, que usa `tool.func`.
+    """
+    return [tool.model_copy(update={'func': _speculative_func(tool.name, tool.func)})
+            if getattr(tool, 'func', None) else tool for tool in tools]
+
+
+def _speculative_func(tool_name: str, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not args and speculative_scheduler.enabled:
+            result = speculative_scheduler.take(current_data_context().df, tool_name, kwargs)
+            if result is not _MISS:
+                return result
+        return func(*args, **kwargs)
+    return wrapper
+
+
+# Instância global
+speculative_scheduler = SpeculativeScheduler()